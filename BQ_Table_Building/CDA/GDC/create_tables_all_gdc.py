@@ -0,0 +1,160 @@
+"""
+Copyright 2025, Institute for Systems Biology
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import os
+import subprocess
+import sys
+import time
+
+from cda_bq_etl.bq_helpers.query_ledger import log_query_ledger_summary, read_query_ledger
+from cda_bq_etl.data_helpers import initialize_logging
+from cda_bq_etl.scheduler import make_step, run_steps
+from cda_bq_etl.utils import load_config, format_seconds
+
+PARAMS = dict()
+YAML_HEADERS = ('params', 'steps')
+
+CDA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# GDC dev table build scripts, with the tables each reads and writes. 'raw_tables' are the tables created by
+# extract_from_tsv (including its helper tables, e.g. case_project_program).
+GDC_SCRIPTS = {
+    'extract_from_tsv': {
+        'script': os.path.join(CDA_DIR, 'extract_from_tsv.py'),
+        'config_file': 'CDAExtractFromTSVGDC.yaml',
+        'inputs': [],
+        'outputs': ['raw_tables']
+    },
+    'create_tables_project_disease_type': {
+        'script': os.path.join(CDA_DIR, 'GDC', 'create_tables_project_disease_type_gdc.py'),
+        'config_file': 'CDACreateTablesProjectDiseaseTypeGDC.yaml',
+        'inputs': ['raw_tables'],
+        'outputs': ['project_disease_types_merged']
+    },
+    'create_tables_case_metadata': {
+        'script': os.path.join(CDA_DIR, 'GDC', 'create_tables_case_metadata_gdc.py'),
+        'config_file': 'CDACreateTablesCaseGDC.yaml',
+        'inputs': ['raw_tables', 'project_disease_types_merged'],
+        'outputs': ['caseData']
+    },
+    'create_tables_aliquot_case_map': {
+        'script': os.path.join(CDA_DIR, 'GDC', 'create_tables_aliquot_case_map_gdc.py'),
+        'config_file': 'CDACreateTablesAliquotCaseMapGDC.yaml',
+        'inputs': ['raw_tables'],
+        'outputs': ['aliquot2caseIDmap']
+    },
+    'create_tables_slide_case_map': {
+        'script': os.path.join(CDA_DIR, 'GDC', 'create_tables_slide_case_map_gdc.py'),
+        'config_file': 'CDACreateTablesSlideCaseMapGDC.yaml',
+        'inputs': ['raw_tables'],
+        'outputs': ['slide2caseIDmap']
+    },
+    'create_tables_file_metadata': {
+        'script': os.path.join(CDA_DIR, 'GDC', 'create_tables_file_metadata_gdc.py'),
+        'config_file': 'CDACreateTablesFileGDC.yaml',
+        'inputs': ['raw_tables', 'project_disease_types_merged'],
+        'outputs': ['fileData_active']
+    },
+    'create_tables_per_sample_file': {
+        'script': os.path.join(CDA_DIR, 'GDC', 'create_tables_per_sample_file_gdc.py'),
+        'config_file': 'CDACreateTablesPerSampleFileGDC.yaml',
+        'inputs': ['raw_tables', 'caseData', 'fileData_active', 'aliquot2caseIDmap', 'slide2caseIDmap'],
+        'outputs': ['per_sample_file_metadata']
+    },
+    'create_tables_clinical': {
+        'script': os.path.join(CDA_DIR, 'GDC', 'create_tables_clinical_gdc.py'),
+        'config_file': 'CDACreateTablesClinicalGDC.yaml',
+        'inputs': ['raw_tables'],
+        'outputs': ['clinical']
+    }
+}
+
+
+def make_run_script_function(step_name: str, shared_config_fp: str, log_file_time: str):
+    """
+    Make function which runs a GDC build script in a separate process. The script's console output is written to
+    <LOGFILE_PATH>.<log_file_time>.<step_name>.out (each script also writes its own log file).
+    :param step_name: step name (key in GDC_SCRIPTS)
+    :param shared_config_fp: path to shared GDC yaml config file
+    :param log_file_time: timestamp used in output file name
+    :return: function which runs the script, raising CalledProcessError if the script fails
+    """
+    def run_script():
+        script_fp = GDC_SCRIPTS[step_name]['script']
+        config_fp = os.path.join(PARAMS['CONFIG_DIR'], GDC_SCRIPTS[step_name]['config_file'])
+        output_fp = f"{PARAMS['LOGFILE_PATH']}.{log_file_time}.{step_name}.out"
+
+        with open(output_fp, mode='w') as output_file:
+            subprocess.run([sys.executable, script_fp, shared_config_fp, config_fp],
+                           stdout=output_file,
+                           stderr=subprocess.STDOUT,
+                           check=True)
+
+    return run_script
+
+
+def main(args):
+    try:
+        start_time = time.time()
+
+        global PARAMS
+        PARAMS, steps = load_config(args, YAML_HEADERS)
+    except ValueError as err:
+        sys.exit(err)
+
+    log_file_time = time.strftime('%Y.%m.%d-%H.%M.%S', time.localtime())
+    log_filepath = f"{PARAMS['LOGFILE_PATH']}.{log_file_time}"
+    logger = initialize_logging(log_filepath)
+
+    estimated_seconds = PARAMS['STEP_ESTIMATED_SECONDS'] if 'STEP_ESTIMATED_SECONDS' in PARAMS else dict()
+
+    scheduled_steps = list()
+
+    # scripts keep their sequential order; steps excluded from the yaml config are assumed to be complete already
+    for step_name, script_dict in GDC_SCRIPTS.items():
+        if step_name not in steps:
+            continue
+
+        scheduled_steps.append(make_step(name=step_name,
+                                         function=make_run_script_function(step_name, args[1], log_file_time),
+                                         inputs=script_dict['inputs'],
+                                         outputs=script_dict['outputs'],
+                                         estimated_seconds=estimated_seconds[step_name]
+                                         if step_name in estimated_seconds else 1.0))
+
+    if 'QUERY_LEDGER_PATH' in PARAMS and PARAMS['QUERY_LEDGER_PATH']:
+        # scripts inherit these environment variables, so each records its BigQuery jobs in the shared ledger
+        os.environ['CDA_BQ_ETL_QUERY_LEDGER'] = PARAMS['QUERY_LEDGER_PATH']
+        os.environ['CDA_BQ_ETL_QUERY_LEDGER_RUN_ID'] = f"create_tables_all_gdc.{log_file_time}"
+
+    run_steps(scheduled_steps, max_workers=PARAMS['MAX_CONCURRENT_STEPS'], dry_run=PARAMS['DRY_RUN'])
+
+    if 'QUERY_LEDGER_PATH' in PARAMS and PARAMS['QUERY_LEDGER_PATH']:
+        log_query_ledger_summary(read_query_ledger(PARAMS['QUERY_LEDGER_PATH'],
+                                                   run_id=os.environ['CDA_BQ_ETL_QUERY_LEDGER_RUN_ID']))
+
+    end_time = time.time()
+
+    logger.info(f"Script completed in: {format_seconds(end_time - start_time)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
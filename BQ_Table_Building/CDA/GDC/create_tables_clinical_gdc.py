@@ -26,9 +26,11 @@ from typing import Any
 
 from cda_bq_etl.data_helpers import initialize_logging
 from cda_bq_etl.utils import create_dev_table_id, load_config, format_seconds, create_clinical_table_id
+from cda_bq_etl.bq_helpers.catalog import enable_dataset_catalog
 from cda_bq_etl.bq_helpers.lookup import query_and_retrieve_result, get_gdc_program_list, find_missing_columns
 from cda_bq_etl.bq_helpers.schema import get_program_schema_tags_gdc
-from cda_bq_etl.bq_helpers.create_modify import create_table_from_query, update_table_schema_from_generic
+from cda_bq_etl.bq_helpers.create_modify import create_tables_from_queries, update_table_schema_from_generic
+from cda_bq_etl.bq_helpers.query_ledger import set_query_ledger_step
 
 PARAMS = dict()
 YAML_HEADERS = ('params', 'steps')
@@ -88,9 +90,9 @@ def find_program_tables() -> dict[str, set[str]]:
     return tables_per_program_dict
 
 
-def create_clinical_tables(program: str, stand_alone_tables: set[str]):
+def make_clinical_table_queries(program: str, stand_alone_tables: set[str]) -> dict[str, dict[str, str]]:
     """
-    Create GDC clinical tables by analyzing available data as follows:
+    Make GDC clinical table queries by analyzing available data as follows:
         - Find non-null columns for each field group, using column lists in TABLE_PARAMS
         - For base clinical and supplemental tables, determine whether mapping or count columns need to be appended.
             - Mapping columns provide id linkages to ancestor tables, if any (e.g. case_id for diagnosis table)
@@ -105,10 +107,12 @@ def create_clinical_tables(program: str, stand_alone_tables: set[str]):
           and diagnosis tables exist, treatment columns are appended to diagnosis. If only clinical exists,
           treatment columns are appended to that table.
     Then, construct a dict to store components of SQL query.
-    Parse the contents of dict into a SQL query string, and use to create new BQ table.
+    Parse the contents of dict into a SQL query string, used to create new BQ table.
     :param program: Program for which create tables
     :param stand_alone_tables: list of supplemental tables to create (those which can't be flattened
                                into clinical or parent table)
+    :return: dict in the form { <clinical-table-id>: {'query': <sql>, 'program_name_original': <program name>,
+                                                       'friendly_name_suffix': <suffix>} }
     """
     def get_mapping_and_count_columns() -> dict[str, dict[str, list[Any]]]:
         column_dict = dict()
@@ -412,6 +416,8 @@ def create_clinical_tables(program: str, stand_alone_tables: set[str]):
     logger.info(f" - Getting insert locations")
     table_insert_locations = get_table_column_insert_locations()
 
+    clinical_table_queries = dict()
+
     for table in stand_alone_tables:
         # used to construct a sql query that creates one of the program tables
         table_sql_dict[table] = {
@@ -532,20 +538,13 @@ def create_clinical_tables(program: str, stand_alone_tables: set[str]):
 
         clinical_table_id = create_clinical_table_id(PARAMS, f"{program_name}_{table_name}")
 
-        create_table_from_query(PARAMS, table_id=clinical_table_id, query=sql_query)
-
-        schema_tags = get_program_schema_tags_gdc(params=PARAMS, program_name=program_name_original)
-
-        if 'program-label' in schema_tags:
-            metadata_file = PARAMS['METADATA_FILE_SINGLE_PROGRAM']
-        else:
-            metadata_file = PARAMS['METADATA_FILE_MULTI_PROGRAM']
+        clinical_table_queries[clinical_table_id] = {
+            'query': sql_query,
+            'program_name_original': program_name_original,
+            'friendly_name_suffix': friendly_name_suffix
+        }
 
-        update_table_schema_from_generic(params=PARAMS,
-                                         table_id=clinical_table_id,
-                                         schema_tags=schema_tags,
-                                         friendly_name_suffix=friendly_name_suffix,
-                                         metadata_file=metadata_file)
+    return clinical_table_queries
 
 
 def main(args):
@@ -561,16 +560,48 @@ def main(args):
     log_filepath = f"{PARAMS['LOGFILE_PATH']}.{log_file_time}"
     logger = initialize_logging(log_filepath)
 
+    if 'ENABLE_DATASET_CATALOG' in PARAMS and PARAMS['ENABLE_DATASET_CATALOG']:
+        # answer table existence and column lookups from a catalog fetched once per dataset
+        enable_dataset_catalog()
+
     if 'find_missing_fields' in steps:
+        set_query_ledger_step('find_missing_fields')
         # Find discrepancies in field lists in yaml config and CDA data
         find_missing_columns(PARAMS)
+        set_query_ledger_step(None)
 
     if 'create_tables' in steps:
+        set_query_ledger_step('create_tables')
         # create dict of programs : base/supplemental tables to be created
         tables_per_program_dict = find_program_tables()
 
+        clinical_table_queries = dict()
+
         for program, stand_alone_tables in tables_per_program_dict.items():
-            create_clinical_tables(program, stand_alone_tables)
+            clinical_table_queries.update(make_clinical_table_queries(program, stand_alone_tables))
+
+        # clinical tables are independent, so their query jobs are run concurrently
+        max_concurrent_jobs = PARAMS['MAX_CONCURRENT_JOBS'] if 'MAX_CONCURRENT_JOBS' in PARAMS else 4
+        create_tables_from_queries(params=PARAMS,
+                                   table_queries={table_id: table_query['query']
+                                                  for table_id, table_query in clinical_table_queries.items()},
+                                   max_workers=max_concurrent_jobs)
+
+        for clinical_table_id, table_query in clinical_table_queries.items():
+            schema_tags = get_program_schema_tags_gdc(params=PARAMS,
+                                                      program_name=table_query['program_name_original'])
+
+            if 'program-label' in schema_tags:
+                metadata_file = PARAMS['METADATA_FILE_SINGLE_PROGRAM']
+            else:
+                metadata_file = PARAMS['METADATA_FILE_MULTI_PROGRAM']
+
+            update_table_schema_from_generic(params=PARAMS,
+                                             table_id=clinical_table_id,
+                                             schema_tags=schema_tags,
+                                             friendly_name_suffix=table_query['friendly_name_suffix'],
+                                             metadata_file=metadata_file)
+        set_query_ledger_step(None)
 
     end_time = time.time()
     logger.info(f"Script completed in: {format_seconds(end_time - start_time)}")
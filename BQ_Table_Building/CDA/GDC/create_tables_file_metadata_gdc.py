@@ -26,11 +26,13 @@ from typing import Any, Union, Optional
 
 from google.cloud.bigquery.table import RowIterator, _EmptyRowIterator
 
-from cda_bq_etl.bq_helpers.lookup import query_and_retrieve_result
-from cda_bq_etl.bq_helpers.schema import create_and_upload_schema_for_json, retrieve_bq_schema_object
+from cda_bq_etl.bq_helpers.lookup import query_and_stream_records
+from cda_bq_etl.bq_helpers.schema import create_and_upload_schema_from_object_structure, retrieve_bq_schema_object
 from cda_bq_etl.bq_helpers.create_modify import create_and_load_table_from_jsonl, update_table_schema_from_generic
 from cda_bq_etl.utils import format_seconds, load_config, create_dev_table_id, create_metadata_table_id
 from cda_bq_etl.data_helpers import normalize_flat_json_values, write_list_to_jsonl_and_upload, initialize_logging
+from cda_bq_etl.profiling import profiled
+from cda_bq_etl.bq_helpers.query_ledger import set_query_ledger_step
 
 PARAMS = dict()
 YAML_HEADERS = ('params', 'steps')
@@ -75,6 +77,7 @@ def convert_concat_to_multi(value_string: str, max_length: int = 8, filter_dupli
         return value_string
 
 
+@profiled(rows_from_result=len)
 def create_file_metadata_dict() -> JSONList:
     """
     Create list of dicts containing file metadata, using successive queries.
@@ -270,7 +273,7 @@ def create_file_metadata_dict() -> JSONList:
         # bq harness with result
         # manipulate and insert all fields in concat list
         # insert all fields in insert list
-        _query_result: BQQueryResult = query_and_retrieve_result(sql=sql)
+        _query_result, _ = query_and_stream_records(sql=sql)
 
         for _record in _query_result:
             _file_id = _record.get('file_gdc_id')
@@ -284,7 +287,10 @@ def create_file_metadata_dict() -> JSONList:
     logger = logging.getLogger('base_script')
     logger.info("Creating base file metadata record objects")
 
-    file_record_result: BQQueryResult = query_and_retrieve_result(sql=make_base_file_metadata_sql())
+    # results are streamed as Arrow record batches (in parallel, if the BigQuery Storage API is available) and
+    # consumed as dicts, rather than paged through the REST API as Row objects
+    file_record_result, file_record_count = query_and_stream_records(sql=make_base_file_metadata_sql())
+    logger.info(f"Streaming {file_record_count} base file metadata records")
 
     file_records: dict[str, dict[str, Optional[Any]]] = dict()
 
@@ -384,7 +390,7 @@ def create_file_metadata_dict() -> JSONList:
                                                         'associated_entities__entity_gdc_id',
                                                         'associated_entities__entity_submitter_id']
 
-    query_result: BQQueryResult = query_and_retrieve_result(sql=make_associated_entities_sql())
+    query_result, _ = query_and_stream_records(sql=make_associated_entities_sql())
 
     for record in query_result:
         file_id = record.get('file_gdc_id')
@@ -402,7 +408,7 @@ def create_file_metadata_dict() -> JSONList:
     # Add case, project, program fields to file records
     logger.info("Adding case, project, program fields to file records")
 
-    case_project_program_result: BQQueryResult = query_and_retrieve_result(sql=make_case_project_program_sql())
+    case_project_program_result, _ = query_and_stream_records(sql=make_case_project_program_sql())
 
     for row in case_project_program_result:
         file_gdc_id = row.get('file_gdc_id')
@@ -423,7 +429,7 @@ def create_file_metadata_dict() -> JSONList:
     # Add index files to file records
     logger.info("Adding index files to file records")
 
-    index_file_result: BQQueryResult = query_and_retrieve_result(sql=make_index_file_sql())
+    index_file_result, _ = query_and_stream_records(sql=make_index_file_sql())
 
     for row in index_file_result:
         file_gdc_id = row.get('file_gdc_id')
@@ -449,24 +455,30 @@ def main(args):
 
     log_file_time = time.strftime('%Y.%m.%d-%H.%M.%S', time.localtime())
     log_filepath = f"{PARAMS['LOGFILE_PATH']}.{log_file_time}"
-    logger = initialize_logging(log_filepath)
+    logger = initialize_logging(log_filepath, profile='ENABLE_PROFILING' in PARAMS and PARAMS['ENABLE_PROFILING'])
 
     if 'create_and_upload_file_metadata_jsonl' in steps:
+        set_query_ledger_step('create_and_upload_file_metadata_jsonl')
         logger.info("Entering create_and_upload_file_metadata_jsonl")
 
         file_record_list = create_file_metadata_dict()
 
         normalized_file_record_list = normalize_flat_json_values(file_record_list)
 
-        write_list_to_jsonl_and_upload(PARAMS, 'file', normalized_file_record_list)
+        # detect the object structure while writing the jsonl file, rather than traversing the records again
+        data_types_dict = dict()
+
+        write_list_to_jsonl_and_upload(PARAMS, 'file', normalized_file_record_list, data_types_dict=data_types_dict)
         write_list_to_jsonl_and_upload(PARAMS, 'file_raw', file_record_list)
 
-        create_and_upload_schema_for_json(PARAMS,
-                                          record_list=normalized_file_record_list,
-                                          table_name='file',
-                                          include_release=True)
+        create_and_upload_schema_from_object_structure(PARAMS,
+                                                       data_types_dict=data_types_dict,
+                                                       table_name='file',
+                                                       include_release=True)
+        set_query_ledger_step(None)
 
     if 'create_table' in steps:
+        set_query_ledger_step('create_table')
         logger.info("Entering create_table")
 
         # Download schema file from Google Cloud bucket
@@ -479,6 +491,7 @@ def main(args):
                                          schema=table_schema)
 
         update_table_schema_from_generic(params=PARAMS, table_id=create_metadata_table_id(PARAMS, PARAMS['TABLE_NAME']))
+        set_query_ledger_step(None)
 
     end_time = time.time()
 
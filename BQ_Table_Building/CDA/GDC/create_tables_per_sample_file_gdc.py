@@ -27,7 +27,8 @@ from cda_bq_etl.utils import load_config, format_seconds, create_metadata_table_
     create_dev_table_id
 from cda_bq_etl.bq_helpers.lookup import get_gdc_program_list
 from cda_bq_etl.bq_helpers.schema import get_program_schema_tags_gdc
-from cda_bq_etl.bq_helpers.create_modify import create_table_from_query, delete_bq_table, update_table_schema_from_generic
+from cda_bq_etl.bq_helpers.create_modify import create_tables_from_queries, delete_bq_table, update_table_schema_from_generic
+from cda_bq_etl.bq_helpers.query_ledger import set_query_ledger_step
 
 PARAMS = dict()
 YAML_HEADERS = ('params', 'steps')
@@ -317,6 +318,9 @@ def main(args):
 
     program_list = get_gdc_program_list(PARAMS)
 
+    # {program_name_original: (no_url_table_id, table_id)}
+    program_table_ids = dict()
+
     for program_name in program_list:
         if program_name == "BEATAML1_0":
             program_name_original = "BEATAML1.0"
@@ -328,24 +332,39 @@ def main(args):
         no_url_table_id = create_per_sample_table_id(PARAMS, f"{program_name}_{PARAMS['TABLE_NAME']}_no_url")
         table_id = create_per_sample_table_id(PARAMS, f"{program_name}_{PARAMS['TABLE_NAME']}")
 
-        if 'create_program_tables_no_url' in steps:
-            logger.info(f"Creating base table for {program_name_original}!\n")
+        program_table_ids[program_name_original] = (no_url_table_id, table_id)
+
+    # per-program tables are independent, so their query jobs are run concurrently
+    max_concurrent_jobs = PARAMS['MAX_CONCURRENT_JOBS'] if 'MAX_CONCURRENT_JOBS' in PARAMS else 4
+
+    if 'create_program_tables_no_url' in steps:
+        set_query_ledger_step('create_program_tables_no_url')
+        logger.info(f"Creating base tables for {len(program_table_ids)} programs!\n")
+
+        # create tables with everything but file uris from manifest
+        no_url_table_queries = {no_url_table_id: make_merged_sql_query(program_name_original)
+                                for program_name_original, (no_url_table_id, _) in program_table_ids.items()}
+
+        create_tables_from_queries(params=PARAMS,
+                                   table_queries=no_url_table_queries,
+                                   max_workers=max_concurrent_jobs)
+        set_query_ledger_step(None)
 
-            # create table with everything but file uris from manifest
-            create_table_from_query(params=PARAMS,
-                                    table_id=no_url_table_id,
-                                    query=make_merged_sql_query(program_name_original))
+    if 'add_url_to_program_tables' in steps:
+        set_query_ledger_step('add_url_to_program_tables')
+        logger.info(f"Creating tables with added uris for {len(program_table_ids)} programs!\n")
 
-        if 'add_url_to_program_tables' in steps:
-            logger.info(f"Creating table with added uris for {program_name_original}!\n")
+        drs_uri_table_id = PARAMS['DRS_URI_TABLE_ID']
 
-            drs_uri_table_id = PARAMS['DRS_URI_TABLE_ID']
+        # add index file size and file/index file keys to finish populating the tables
+        table_queries = {table_id: make_add_uris_and_index_file_sql_query(no_url_table_id, drs_uri_table_id)
+                         for no_url_table_id, table_id in program_table_ids.values()}
 
-            # add index file size and file/index file keys to finish populating the table
-            create_table_from_query(params=PARAMS,
-                                    table_id=table_id,
-                                    query=make_add_uris_and_index_file_sql_query(no_url_table_id, drs_uri_table_id))
+        create_tables_from_queries(params=PARAMS,
+                                   table_queries=table_queries,
+                                   max_workers=max_concurrent_jobs)
 
+        for program_name_original, (no_url_table_id, table_id) in program_table_ids.items():
             schema_tags = get_program_schema_tags_gdc(params=PARAMS, program_name=program_name_original)
 
             if 'program-label' in schema_tags:
@@ -359,6 +378,7 @@ def main(args):
                                              metadata_file=metadata_file)
 
             delete_bq_table(no_url_table_id)
+        set_query_ledger_step(None)
 
     end_time = time.time()
 
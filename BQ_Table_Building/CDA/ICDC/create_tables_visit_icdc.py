@@ -5,10 +5,11 @@ from typing import Any
 
 from cda_bq_etl.data_helpers import initialize_logging, write_list_to_jsonl_and_upload
 from cda_bq_etl.utils import (load_config, create_dev_table_id, format_seconds, create_clinical_table_id)
-from cda_bq_etl.bq_helpers.lookup import query_and_retrieve_result
+from cda_bq_etl.bq_helpers.lookup import query_and_retrieve_result, query_and_stream_records
 from cda_bq_etl.bq_helpers.schema import create_and_upload_schema_for_json, retrieve_bq_schema_object, \
     get_program_schema_tags_icdc
 from cda_bq_etl.bq_helpers.create_modify import create_and_load_table_from_jsonl, update_table_schema_from_generic
+from cda_bq_etl.bq_helpers.query_ledger import set_query_ledger_step
 
 PARAMS = dict()
 YAML_HEADERS = ('params', 'steps')
@@ -87,9 +88,10 @@ def create_child_field_dict(visit_case_mapping: dict[str, str],
                             exclude_columns: list[str] = None) -> dict[str, list] | None:
     logger = logging.getLogger('base_script')
 
-    child_table_result = query_and_retrieve_result(make_child_table_sql(program, table_type))
+    # rows are streamed as Arrow record batches and consumed as dicts, rather than paged through as Row objects
+    child_table_records, child_table_row_count = query_and_stream_records(make_child_table_sql(program, table_type))
 
-    if child_table_result.total_rows == 0:
+    if child_table_row_count == 0:
         logger.info(f"No rows found for {table_type} in {program}, skipping.")
         return None
     else:
@@ -97,7 +99,7 @@ def create_child_field_dict(visit_case_mapping: dict[str, str],
 
     visit_child_row_dict = dict()
 
-    for row in child_table_result:
+    for row in child_table_records:
         visit_id = row['visit_id']
 
         # confirm visit_id is non-null and that it can be mapped to a case_id
@@ -142,12 +144,14 @@ def main(args):
         program = row['program_acronym']
 
         if 'retrieve_visit_data_and_build_jsonl' in steps:
+            set_query_ledger_step('retrieve_visit_data_and_build_jsonl')
             logger.info("Entering retrieve_visit_data_and_build_jsonl")
 
             visit_result = query_and_retrieve_result(make_visit_sql(program))
 
             if visit_result.total_rows == 0:
                 logger.info(f"No visit data found for {program}. No table will be created.")
+                set_query_ledger_step(None)
                 continue
             else:
                 logger.info(f"Creating table for {program}!")
@@ -226,8 +230,10 @@ def main(args):
                                               table_name=file_prefix,
                                               include_release=True,
                                               reorder_nesting=True)
+            set_query_ledger_step(None)
 
         if 'create_table' in steps:
+            set_query_ledger_step('create_table')
             file_prefix = f"{program}_{PARAMS['TABLE_NAME']}"
 
             # Download schema file from Google Cloud bucket
@@ -236,6 +242,7 @@ def main(args):
             # if there's no schema, this
             if not table_schema:
                 logger.info(f"No table schema found for {program}, skipping table creation.")
+                set_query_ledger_step(None)
                 continue
 
             visit_table_id = create_clinical_table_id(PARAMS, table_name=file_prefix)
@@ -249,6 +256,7 @@ def main(args):
             schema_tags = get_program_schema_tags_icdc(program)
 
             update_table_schema_from_generic(params=PARAMS, table_id=visit_table_id, schema_tags=schema_tags)
+            set_query_ledger_step(None)
 
     end_time = time.time()
     logger.info(f"Script completed in: {format_seconds(end_time - start_time)}")
@@ -25,9 +25,11 @@ import time
 from cda_bq_etl.data_helpers import initialize_logging
 from cda_bq_etl.utils import (load_config, create_dev_table_id, format_seconds, create_clinical_table_id,
                               create_metadata_table_id)
+from cda_bq_etl.bq_helpers.catalog import enable_dataset_catalog
 from cda_bq_etl.bq_helpers.lookup import query_and_retrieve_result, get_pdc_project_metadata, find_missing_columns
 from cda_bq_etl.bq_helpers.schema import get_project_level_schema_tags
 from cda_bq_etl.bq_helpers.create_modify import create_table_from_query, update_table_schema_from_generic
+from cda_bq_etl.bq_helpers.query_ledger import set_query_ledger_step
 
 PARAMS = dict()
 YAML_HEADERS = ('params', 'steps')
@@ -240,12 +242,19 @@ def main(args):
     log_filepath = f"{PARAMS['LOGFILE_PATH']}.{log_file_time}"
     logger = initialize_logging(log_filepath)
 
+    if 'ENABLE_DATASET_CATALOG' in PARAMS and PARAMS['ENABLE_DATASET_CATALOG']:
+        # answer table existence and column lookups from a catalog fetched once per dataset
+        enable_dataset_catalog()
+
     projects_list = get_pdc_project_metadata(PARAMS)
 
     if 'find_missing_fields' in steps:
+        set_query_ledger_step('find_missing_fields')
         logger.info("Finding missing columns")
         find_missing_columns(PARAMS)
+        set_query_ledger_step(None)
     if 'create_project_tables' in steps:
+        set_query_ledger_step('create_project_tables')
         logger.info("Entering create_project_tables")
 
         for project in projects_list:
@@ -307,6 +316,7 @@ def main(args):
                                                  schema_tags=schema_tags,
                                                  friendly_name_suffix=friendly_name_suffix,
                                                  metadata_file=generic_table_metadata_file)
+        set_query_ledger_step(None)
 
     end_time = time.time()
 
@@ -24,10 +24,11 @@ import time
 
 from cda_bq_etl.bq_helpers.lookup import get_pdc_project_metadata
 from cda_bq_etl.bq_helpers.schema import get_project_level_schema_tags
-from cda_bq_etl.bq_helpers.create_modify import create_table_from_query, update_table_schema_from_generic
+from cda_bq_etl.bq_helpers.create_modify import create_tables_from_queries, update_table_schema_from_generic
 from cda_bq_etl.data_helpers import initialize_logging
 from cda_bq_etl.utils import (load_config, create_dev_table_id, format_seconds, create_per_sample_table_id,
                               create_metadata_table_id)
+from cda_bq_etl.bq_helpers.query_ledger import set_query_ledger_step
 
 PARAMS = dict()
 YAML_HEADERS = ('params', 'steps')
@@ -95,17 +96,28 @@ def main(args):
     projects_list = get_pdc_project_metadata(PARAMS)
 
     if 'create_project_tables' in steps:
+        set_query_ledger_step('create_project_tables')
         logger.info("Entering create_project_tables")
 
+        project_table_ids = dict()
+        project_table_queries = dict()
+
         for project in projects_list:
             project_table_base_name = f"{project['project_short_name']}_{PARAMS['TABLE_NAME']}"
             project_table_id = create_per_sample_table_id(PARAMS, project_table_base_name)
 
-            create_table_from_query(params=PARAMS,
-                                    table_id=project_table_id,
-                                    query=make_project_per_sample_file_query(project['project_submitter_id']))
+            project_table_ids[project['project_submitter_id']] = project_table_id
+            project_table_queries[project_table_id] = make_project_per_sample_file_query(
+                project['project_submitter_id'])
+
+        # per-project tables are independent, so their query jobs are run concurrently
+        max_concurrent_jobs = PARAMS['MAX_CONCURRENT_JOBS'] if 'MAX_CONCURRENT_JOBS' in PARAMS else 4
+        create_tables_from_queries(params=PARAMS,
+                                   table_queries=project_table_queries,
+                                   max_workers=max_concurrent_jobs)
 
-            schema_tags = get_project_level_schema_tags(PARAMS, project['project_submitter_id'])
+        for project_submitter_id, project_table_id in project_table_ids.items():
+            schema_tags = get_project_level_schema_tags(PARAMS, project_submitter_id)
 
             if 'program-name-1-lower' in schema_tags:
                 generic_table_metadata_file = PARAMS['GENERIC_TABLE_METADATA_FILE_2_PROGRAM']
@@ -116,6 +128,7 @@ def main(args):
                                              table_id=project_table_id,
                                              schema_tags=schema_tags,
                                              metadata_file=generic_table_metadata_file)
+        set_query_ledger_step(None)
 
     end_time = time.time()
 
@@ -35,12 +35,15 @@ from cda_bq_etl.gcs_helpers import upload_to_bucket, download_from_bucket
 from cda_bq_etl.pdc_helpers import build_obj_from_pdc_api, get_graphql_api_response
 from cda_bq_etl.utils import (load_config, format_seconds, create_dev_table_id, create_metadata_table_id,
                               create_quant_table_id, make_string_bq_friendly, get_scratch_fp, construct_table_name)
+from cda_bq_etl.bq_helpers.catalog import enable_dataset_catalog
 from cda_bq_etl.bq_helpers.lookup import exists_bq_table, query_and_retrieve_result
 from cda_bq_etl.bq_helpers.schema import create_and_upload_schema_for_tsv, create_and_upload_schema_for_json, \
     retrieve_bq_schema_object, get_uniprot_schema_tags, get_gene_info_schema_tags
 from cda_bq_etl.bq_helpers.create_modify import create_and_load_table_from_tsv, create_and_load_table_from_jsonl, \
     create_table_from_query, delete_bq_table, update_table_schema_from_generic
 from cda_bq_etl.data_helpers import initialize_logging, write_list_to_jsonl_and_upload, create_tsv_row
+from cda_bq_etl.profiling import profiled
+from cda_bq_etl.bq_helpers.query_ledger import set_query_ledger_step
 
 PARAMS = dict()
 YAML_HEADERS = ('params', 'steps')
@@ -499,6 +502,7 @@ def get_quant_table_name(study: dict[str, str], is_final: bool):
     return table_name
 
 
+@profiled(rows_from_result=lambda lines_written: lines_written)
 def build_quant_tsv(study_id_dict: dict[str, str], data_type: str, tsv_fp: str, header: list[str]) -> int:
     """
     Output quant data rows in tsv format, for future BQ ingestion.
@@ -673,11 +677,16 @@ def main(args):
 
     log_file_time = time.strftime('%Y.%m.%d-%H.%M.%S', time.localtime())
     log_filepath = f"{PARAMS['LOGFILE_PATH']}.{log_file_time}"
-    logger = initialize_logging(log_filepath)
+    logger = initialize_logging(log_filepath, profile='ENABLE_PROFILING' in PARAMS and PARAMS['ENABLE_PROFILING'])
+
+    if 'ENABLE_DATASET_CATALOG' in PARAMS and PARAMS['ENABLE_DATASET_CATALOG']:
+        # answer table existence and column lookups from a catalog fetched once per dataset
+        enable_dataset_catalog()
 
     studies_list = get_study_list()
 
     if 'build_and_upload_refseq_uniprot_jsonl' in steps:
+        set_query_ledger_step('build_and_upload_refseq_uniprot_jsonl')
         logger.info("Retrieving RefSeq records from UniProtKB")
         refseq_jsonl_list = query_uniprot_kb_and_create_jsonl_list()
 
@@ -690,8 +699,10 @@ def main(args):
                                           record_list=refseq_jsonl_list,
                                           table_name=PARAMS['UNFILTERED_REFSEQ_TABLE_NAME'],
                                           release=PARAMS['UNIPROT_RELEASE'])
+        set_query_ledger_step(None)
 
     if 'create_refseq_uniprot_table' in steps:
+        set_query_ledger_step('create_refseq_uniprot_table')
         logger.info("Building RefSeq -> UniProt mapping table")
 
         unfiltered_refseq_table_id = create_metadata_table_id(PARAMS,
@@ -729,8 +740,10 @@ def main(args):
             # delete the unfiltered intermediate table
             logger.info("Deleting unfiltered RefSeq -> UniProt mapping table")
             delete_bq_table(unfiltered_refseq_table_id)
+        set_query_ledger_step(None)
 
     if 'build_gene_jsonl' in steps:
+        set_query_ledger_step('build_gene_jsonl')
         gene_table_base_name = PARAMS['ENDPOINT_SETTINGS']['getPaginatedGenes']['output_name']
 
         gene_record_list = get_gene_record_list()
@@ -743,8 +756,10 @@ def main(args):
                                           record_list=gene_record_list,
                                           table_name=gene_table_base_name,
                                           include_release=True)
+        set_query_ledger_step(None)
 
     if 'build_gene_table' in steps:
+        set_query_ledger_step('build_gene_table')
         logger.info("Building gene info table!")
         gene_table_base_name = PARAMS['ENDPOINT_SETTINGS']['getPaginatedGenes']['output_name']
         gene_jsonl_filename = f"{gene_table_base_name}_{PARAMS['RELEASE']}.jsonl"
@@ -767,8 +782,10 @@ def main(args):
                                          table_id=gene_table_id,
                                          schema_tags=schema_tags,
                                          metadata_file=PARAMS['GENERIC_GENE_TABLE_METADATA_FILE'])
+        set_query_ledger_step(None)
 
     if 'build_and_upload_quant_tsvs' in steps:
+        set_query_ledger_step('build_and_upload_quant_tsvs')
         logger.info("Building and uploading quant tsvs and schemas!")
         quant_file_list = list()
 
@@ -806,8 +823,10 @@ def main(args):
 
         quant_file_list_path = write_file_list(quant_file_list)
         upload_to_bucket(PARAMS, quant_file_list_path, delete_local=True, verbose=False)
+        set_query_ledger_step(None)
 
     if 'build_raw_quant_tables' in steps:
+        set_query_ledger_step('build_raw_quant_tables')
         logger.info("Building raw quant tables!")
 
         quant_file_list_name = f"{PARAMS['QUANT_FILE_LIST_BASE_NAME']}_{PARAMS['RELEASE']}.txt"
@@ -855,7 +874,9 @@ def main(args):
         for analytical_fraction in built_table_counts.keys():
             logger.info(f" - {analytical_fraction}: {built_table_counts[analytical_fraction]}")
         """
+        set_query_ledger_step(None)
     if 'build_final_quant_tables' in steps:
+        set_query_ledger_step('build_final_quant_tables')
         logger.info("Building final quant tables!")
 
         for study_id_dict in studies_list:
@@ -902,6 +923,7 @@ def main(args):
                                                  table_id=final_quant_table_id,
                                                  schema_tags=schema_tags,
                                                  metadata_file=PARAMS['GENERIC_TABLE_METADATA_FILE_2_PROGRAM'])
+        set_query_ledger_step(None)
 
     end_time = time.time()
 
@@ -19,24 +19,36 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import concurrent.futures
 import logging
+import queue
 import tarfile
 import sys
 import os
 import csv
 import shutil
+import threading
 import time
 
 from typing import Union
 
 from cda_bq_etl.gcs_helpers import upload_to_bucket, download_from_bucket, download_from_external_bucket
 from cda_bq_etl.utils import get_scratch_fp, load_config, get_filepath, format_seconds, create_dev_table_id
-from cda_bq_etl.data_helpers import create_normalized_tsv, initialize_logging
-from cda_bq_etl.bq_helpers.schema import create_and_upload_schema_for_tsv, retrieve_bq_schema_object
-from cda_bq_etl.bq_helpers.create_modify import create_and_load_table_from_tsv, create_table_from_query
+from cda_bq_etl.data_helpers import (create_normalized_tsv, create_normalized_tsv_and_profile, initialize_logging,
+                                     enable_value_cache, log_value_cache_stats,
+                                     collect_value_cache_stats, merge_value_cache_stats)
+from cda_bq_etl.bq_helpers.schema import (create_and_upload_schema_for_tsv, create_and_upload_schema_from_column_types,
+                                          retrieve_bq_schema_object)
+from cda_bq_etl.bq_helpers.jobs import log_job_completion_stats
+from cda_bq_etl.bq_helpers.query_ledger import set_query_ledger_step
+from cda_bq_etl.profiling import collect_profile_records, merge_profile_records
+from cda_bq_etl.bq_helpers.create_modify import (create_and_load_table_from_tsv, create_and_load_table_from_parquet,
+                                                 create_table_from_query)
 
 PARAMS = dict()
 YAML_HEADERS = ('params', 'steps')
+# schema fields created while normalizing, keyed by schema file name; reused by create_tables in the same run
+CREATED_SCHEMAS = dict()
 
 ParamsDict = dict[str, Union[str, int, dict, list]]
 
@@ -233,19 +245,107 @@ def get_normalized_file_names(unarchived_dir: str) -> list[str]:
     return normalized_file_names
 
 
+def normalize_tsv_file(raw_tsv_path: str, normalized_tsv_path: str, num_processes: int, create_schemas: bool) -> dict:
+    """
+    Create normalized tsv file from raw tsv file. Runs in a normalizer worker process (see normalize_files).
+    :param str raw_tsv_path: Raw tsv file path
+    :param str normalized_tsv_path: Normalized tsv file path
+    :param int num_processes: Number of processes used to normalize the file
+    :param bool create_schemas: If True, also aggregate column types for schema creation
+    :return: Dict containing column_headers and data_types_dict (None unless create_schemas is True),
+        normalize_seconds, profile_records (profiles recorded in the worker process, see collect_profile_records) and
+        value_cache_stats (value cache lookups made in the worker process, see collect_value_cache_stats)
+    :rtype: dict
+    """
+    start_time = time.time()
+    column_headers = None
+    data_types_dict = None
+
+    if create_schemas:
+        column_headers, data_types_dict = create_normalized_tsv_and_profile(raw_tsv_path,
+                                                                            normalized_tsv_path,
+                                                                            num_processes=num_processes)
+    else:
+        create_normalized_tsv(raw_tsv_path, normalized_tsv_path, num_processes=num_processes)
+
+    return {
+        'column_headers': column_headers,
+        'data_types_dict': data_types_dict,
+        'normalize_seconds': time.time() - start_time,
+        # worker processes are reused, so hand back (and clear) the profiles recorded for this file
+        'profile_records': collect_profile_records(reset=True),
+        'value_cache_stats': collect_value_cache_stats(reset=True)
+    }
+
+
 def normalize_files(file_list: list[str], dest_path: str) -> list[str]:
     """
     Create new file containing normalized data from raw data file. Cast ints, convert to null and boolean
-    where possible.
+    where possible. If CREATE_SCHEMAS_WHILE_NORMALIZING is set, column types are aggregated while normalizing and
+    each file's schema is created and uploaded at the same time (and kept in CREATED_SCHEMAS for create_tables).
+    Files are processed as a pipeline: a pool of NORMALIZE_WORKERS processes normalizes files, while UPLOAD_WORKERS
+    threads upload the raw and normalized files (and schemas) already completed. Completed files wait in a queue of
+    at most MAX_PENDING_UPLOADS files; when it's full, normalization pauses, which bounds local disk use.
     :param list[str] file_list: List of files to normalize
     :param str dest_path: Destination path for normalized file creation
     :return: List of normalized file names
     :rtype: list[str]
     """
-    normalized_file_names = list()
+    def upload_files():
+        while True:
+            tsv_job = upload_queue.get()
+
+            if tsv_job is None:
+                return
+
+            try:
+                upload_start_time = time.time()
+
+                if create_schemas:
+                    schema_file_path = get_scratch_fp(PARAMS, get_schema_filename(tsv_job['normalized_tsv_file']))
+
+                    schema_object = create_and_upload_schema_from_column_types(
+                        PARAMS,
+                        column_headers=tsv_job['column_headers'],
+                        data_types_dict=tsv_job['data_types_dict'],
+                        schema_fp=schema_file_path,
+                        delete_local=True
+                    )
+
+                    with stats_lock:
+                        CREATED_SCHEMAS[get_schema_filename(tsv_job['normalized_tsv_file'])] = schema_object
+
+                upload_bytes = os.path.getsize(tsv_job['raw_tsv_path']) + \
+                    os.path.getsize(tsv_job['normalized_tsv_path'])
+
+                # upload raw and normalized tsv files to google cloud storage
+                upload_to_bucket(PARAMS, tsv_job['raw_tsv_path'], delete_local=True, verbose=False)
+                upload_to_bucket(PARAMS, tsv_job['normalized_tsv_path'], delete_local=True, verbose=False,
+                                 compress=compress_staging_files())
+
+                with stats_lock:
+                    stage_stats['upload']['files'] += 1
+                    stage_stats['upload']['bytes'] += upload_bytes
+                    stage_stats['upload']['seconds'] += time.time() - upload_start_time
+
+                logger.info(f"Successfully uploaded raw and normalized {tsv_job['normalized_tsv_file']} files to "
+                            f"bucket.")
+            # upload_to_bucket exits on failure; record it and keep draining the queue, so the producer never blocks
+            except BaseException as err:
+                with stats_lock:
+                    upload_errors[tsv_job['normalized_tsv_file']] = err
 
     logger = logging.getLogger('base_script')
 
+    num_processes = PARAMS['NORMALIZE_PROCESSES'] if 'NORMALIZE_PROCESSES' in PARAMS else 1
+    create_schemas = 'CREATE_SCHEMAS_WHILE_NORMALIZING' in PARAMS and PARAMS['CREATE_SCHEMAS_WHILE_NORMALIZING']
+    normalize_workers = PARAMS['NORMALIZE_WORKERS'] if 'NORMALIZE_WORKERS' in PARAMS else 1
+    upload_workers = PARAMS['UPLOAD_WORKERS'] if 'UPLOAD_WORKERS' in PARAMS else 2
+    max_pending_uploads = PARAMS['MAX_PENDING_UPLOADS'] if 'MAX_PENDING_UPLOADS' in PARAMS else upload_workers
+
+    normalized_file_names = list()
+    tsv_jobs = list()
+
     for tsv_file in file_list:
         file_type = tsv_file.split(".")[-1]
 
@@ -260,24 +360,104 @@ def normalize_files(file_list: list[str], dest_path: str) -> list[str]:
         os.rename(src=original_tsv_path, dst=raw_tsv_path)
 
         normalized_tsv_file = f"{PARAMS['RELEASE']}_{tsv_file}"
-        normalized_tsv_path = f"{dest_path}/{normalized_tsv_file}"
 
         # add file to list, used to generate txt list of files for later table creation
         normalized_file_names.append(f"{normalized_tsv_file}\n")
 
-        # create normalized file list
-        logger.info(f"Normalizing {tsv_file}")
-        create_normalized_tsv(raw_tsv_path, normalized_tsv_path)
+        tsv_jobs.append({
+            'tsv_file': tsv_file,
+            'raw_tsv_path': raw_tsv_path,
+            'normalized_tsv_file': normalized_tsv_file,
+            'normalized_tsv_path': f"{dest_path}/{normalized_tsv_file}"
+        })
+
+    stage_stats = {
+        'normalize': {'files': 0, 'bytes': 0, 'seconds': 0.0},
+        'upload': {'files': 0, 'bytes': 0, 'seconds': 0.0}
+    }
+    stats_lock = threading.Lock()
+    upload_errors = dict()
+    # seconds normalization spent paused, waiting for space in the upload queue
+    backpressure_seconds = 0.0
+    pipeline_start_time = time.time()
+
+    upload_queue = queue.Queue(maxsize=max(1, max_pending_uploads))
+    upload_threads = [threading.Thread(target=upload_files, name=f"uploader_{idx}") for idx in range(upload_workers)]
+
+    for upload_thread in upload_threads:
+        upload_thread.start()
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=normalize_workers) as executor:
+            pending_jobs = tsv_jobs.copy()
+            running_futures = dict()
+
+            while pending_jobs or running_futures:
+                while pending_jobs and len(running_futures) < normalize_workers and not upload_errors:
+                    tsv_job = pending_jobs.pop(0)
+                    logger.info(f"Normalizing {tsv_job['tsv_file']}")
+                    future = executor.submit(normalize_tsv_file,
+                                             tsv_job['raw_tsv_path'],
+                                             tsv_job['normalized_tsv_path'],
+                                             num_processes,
+                                             create_schemas)
+                    running_futures[future] = tsv_job
+
+                if not running_futures:
+                    break
+
+                done_futures, _ = concurrent.futures.wait(running_futures,
+                                                          return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in done_futures:
+                    tsv_job = running_futures.pop(future)
+                    tsv_job.update(future.result())
+                    merge_profile_records(tsv_job.pop('profile_records'))
+                    merge_value_cache_stats(tsv_job.pop('value_cache_stats'))
+
+                    stage_stats['normalize']['files'] += 1
+                    stage_stats['normalize']['bytes'] += os.path.getsize(tsv_job['raw_tsv_path'])
+                    stage_stats['normalize']['seconds'] += tsv_job['normalize_seconds']
+
+                    put_start_time = time.time()
+                    upload_queue.put(tsv_job)
+                    backpressure_seconds += time.time() - put_start_time
+    finally:
+        for _ in upload_threads:
+            upload_queue.put(None)
+        for upload_thread in upload_threads:
+            upload_thread.join()
+
+    if upload_errors:
+        for normalized_tsv_file, err in upload_errors.items():
+            logger.critical(f"Failed to upload {normalized_tsv_file}: {err!r}")
+        logger.critical("Exiting.")
+        sys.exit(-1)
+
+    pipeline_seconds = time.time() - pipeline_start_time
+
+    for stage_name, stats in stage_stats.items():
+        megabytes = stats['bytes'] / (1024 * 1024)
+        throughput = megabytes / stats['seconds'] if stats['seconds'] else 0.0
 
-        # upload raw and normalized tsv files to google cloud storage
-        upload_to_bucket(PARAMS, raw_tsv_path, delete_local=True, verbose=False)
-        upload_to_bucket(PARAMS, normalized_tsv_path, delete_local=True, verbose=False)
+        logger.info(f"{stage_name.capitalize()} stage: {stats['files']} files, {megabytes:.1f} MB, "
+                    f"{format_seconds(stats['seconds'])} busy ({throughput:.1f} MB/s per worker)")
 
-        logger.info(f"Successfully uploaded raw and normalized {normalized_tsv_file} files to bucket.")
+    logger.info(f"Pipeline completed in {format_seconds(pipeline_seconds)} "
+                f"(normalization waited {format_seconds(backpressure_seconds)} for uploads)")
 
     return normalized_file_names
 
 
+def compress_staging_files() -> bool:
+    """
+    Whether normalized tsv files are gzip-compressed while being staged in the working bucket.
+    :return: True if COMPRESS_STAGING_FILES is set in yaml config
+    :rtype: bool
+    """
+    return 'COMPRESS_STAGING_FILES' in PARAMS and PARAMS['COMPRESS_STAGING_FILES']
+
+
 def get_schema_filename(tsv_file_name: str) -> str:
     """
     Create schema file name based on tsv file name.
@@ -405,7 +585,10 @@ def main(args):
 
     log_file_time = time.strftime('%Y.%m.%d-%H.%M.%S', time.localtime())
     log_filepath = f"{PARAMS['LOGFILE_PATH']}.{log_file_time}"
-    logger = initialize_logging(log_filepath)
+    logger = initialize_logging(log_filepath, profile='ENABLE_PROFILING' in PARAMS and PARAMS['ENABLE_PROFILING'])
+
+    if 'VALUE_CACHE_SIZE' in PARAMS:
+        enable_value_cache(max_size=PARAMS['VALUE_CACHE_SIZE'])
 
     index_txt_file_name = f"{PARAMS['RELEASE']}_{PARAMS['NODE']}_file_index.txt"
 
@@ -443,7 +626,10 @@ def main(args):
 
         upload_to_bucket(PARAMS, index_txt_file_name, delete_local=True)
 
-    if "create_schemas" in steps:
+    if "create_schemas" in steps and 'CREATE_SCHEMAS_WHILE_NORMALIZING' in PARAMS \
+            and PARAMS['CREATE_SCHEMAS_WHILE_NORMALIZING']:
+        logger.info("*** Skipping create_schemas, schemas were created during normalization.")
+    elif "create_schemas" in steps:
         logger.info("*** Creating schemas!")
         # download index file
         download_from_bucket(PARAMS, index_txt_file_name)
@@ -453,9 +639,11 @@ def main(args):
 
             file_names.sort()
 
+            sample_size = PARAMS['SCHEMA_SAMPLE_SIZE'] if 'SCHEMA_SAMPLE_SIZE' in PARAMS else None
+
             for tsv_file_name in file_names:
                 tsv_file_name = tsv_file_name.strip()
-                download_from_bucket(PARAMS, tsv_file_name)
+                download_from_bucket(PARAMS, tsv_file_name, decompress=compress_staging_files())
 
                 schema_file_name = get_schema_filename(tsv_file_name)
                 schema_file_path = get_scratch_fp(PARAMS, schema_file_name)
@@ -466,10 +654,12 @@ def main(args):
                                                  header_row=0,
                                                  skip_rows=1,
                                                  schema_fp=schema_file_path,
-                                                 delete_local=True)
+                                                 delete_local=True,
+                                                 sample_size=sample_size)
                 os.remove(local_file_path)
 
     if "create_tables" in steps:
+        set_query_ledger_step('create_tables')
         logger.info("*** Creating tables!")
         download_from_bucket(PARAMS, index_txt_file_name)
 
@@ -481,31 +671,72 @@ def main(args):
             for tsv_file_name in file_names:
                 tsv_file_name = tsv_file_name.strip()
                 tsv_file_path = get_scratch_fp(PARAMS, tsv_file_name)
-                download_from_bucket(PARAMS, tsv_file_name)
+                download_from_bucket(PARAMS, tsv_file_name, decompress=compress_staging_files())
 
                 schema_file_name = get_schema_filename(tsv_file_name)
-                schema_object = retrieve_bq_schema_object(PARAMS, schema_filename=schema_file_name)
+
+                if schema_file_name in CREATED_SCHEMAS:
+                    # created while normalizing in this run, no need to download it again
+                    schema_object = CREATED_SCHEMAS.pop(schema_file_name)
+                else:
+                    schema_object = retrieve_bq_schema_object(PARAMS, schema_filename=schema_file_name)
 
                 table_name = create_table_name(tsv_file_name)
                 table_id = f"{PARAMS['DEV_PROJECT']}.{PARAMS['DEV_RAW_DATASET']}.{table_name}"
 
                 if get_data_row_count(f"{tsv_file_path}") >= 1:
-                    create_and_load_table_from_tsv(PARAMS,
-                                                   tsv_file=tsv_file_name,
-                                                   table_id=table_id,
-                                                   num_header_rows=1,
-                                                   schema=schema_object)
+                    staged_as_parquet = False
+
+                    if 'STAGING_FORMAT' in PARAMS and PARAMS['STAGING_FORMAT'] == 'parquet':
+                        # pyarrow is only required when staging as parquet
+                        from cda_bq_etl.parquet_helpers import convert_tsv_to_parquet
+
+                        parquet_file_name = f"{tsv_file_name.rsplit('.', 1)[0]}.parquet"
+                        parquet_file_path = get_scratch_fp(PARAMS, parquet_file_name)
+
+                        try:
+                            convert_tsv_to_parquet(tsv_file_path, parquet_file_path, schema=schema_object,
+                                                   skip_rows=1, exit_on_error=False)
+                            staged_as_parquet = True
+                        except ValueError as err:
+                            # e.g. a time zone which can't be parsed locally--let BigQuery load the tsv file instead
+                            logger.warning(f"{err}; loading {tsv_file_name} from tsv instead of parquet")
+
+                            if os.path.exists(parquet_file_path):
+                                os.remove(parquet_file_path)
+
+                    if staged_as_parquet:
+                        upload_to_bucket(PARAMS, parquet_file_path, delete_local=True, verbose=False)
+
+                        create_and_load_table_from_parquet(PARAMS,
+                                                           parquet_file=parquet_file_name,
+                                                           table_id=table_id)
+                    else:
+                        create_and_load_table_from_tsv(PARAMS,
+                                                       tsv_file=tsv_file_name,
+                                                       table_id=table_id,
+                                                       num_header_rows=1,
+                                                       schema=schema_object,
+                                                       compressed=compress_staging_files())
                 else:
                     logger.info(f"No rows found, table not created: {table_id}")
 
                 os.remove(tsv_file_path)
 
         os.remove(get_scratch_fp(PARAMS, index_txt_file_name))
+        set_query_ledger_step(None)
 
     if "create_helper_tables" in steps:
+        set_query_ledger_step('create_helper_tables')
+
         if PARAMS['NODE'] == 'gdc':
             create_gdc_helper_tables()
 
+        set_query_ledger_step(None)
+
+    log_value_cache_stats()
+    log_job_completion_stats()
+
     end_time = time.time()
 
     logger.info(f"Script completed in: {format_seconds(end_time - start_time)}")
@@ -24,7 +24,7 @@ from typing import Union
 
 from google.cloud.bigquery.table import RowIterator
 
-from cda_bq_etl.bq_helpers.lookup import query_and_retrieve_result
+from cda_bq_etl.bq_helpers.lookup import query_and_retrieve_result, query_and_stream_records
 from common_etl.utils import has_fatal_error
 
 BQQueryResult = Union[None, RowIterator]
@@ -219,11 +219,12 @@ def compare_concat_columns(left_table_id: str,
         """
 
     def make_records_dict(query: str) -> dict[str, dict[str, str]]:
-        result = query_and_retrieve_result(sql=query)
+        # rows are streamed as Arrow record batches and consumed as dicts, rather than paged through as Row objects
+        records, total_rows = query_and_stream_records(sql=query)
 
         records_dict = dict()
 
-        for record_count, record in enumerate(result):
+        for record_count, record in enumerate(records):
             primary_key_id = record.get(primary_key)
             records_dict_key = primary_key_id
 
@@ -238,7 +239,7 @@ def compare_concat_columns(left_table_id: str,
             records_dict[records_dict_key] = record_dict
 
             if record_count % 100000 == 0 and record_count > 0:
-                print(f"{record_count}/{result.total_rows} records added to dict!")
+                print(f"{record_count}/{total_rows} records added to dict!")
 
         return records_dict
 
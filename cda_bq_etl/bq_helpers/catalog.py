@@ -0,0 +1,173 @@
+# Copyright 2023-2025, Institute for Systems Biology
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Per-run catalog of BigQuery dataset table and column metadata."""
+
+import datetime
+import logging
+import os
+import threading
+from typing import Any, Optional
+
+from google.cloud import bigquery
+
+from cda_bq_etl.bq_helpers.jobs import wait_for_job
+from cda_bq_etl.client_helpers import get_bigquery_client
+
+# __TABLES__ type codes
+TABLE_TYPES = {1: 'TABLE', 2: 'VIEW', 3: 'EXTERNAL'}
+
+# {project_dataset_id: {table_name: table metadata dict}}
+_dataset_catalogs: dict[str, dict[str, dict[str, Any]]] = dict()
+_dataset_catalogs_lock = threading.Lock()
+# catalog is opt-in: it's only valid while this process is the only writer to the datasets it describes. Enable with
+# enable_dataset_catalog() or by setting CDA_BQ_ETL_ENABLE_DATASET_CATALOG=1.
+_dataset_catalog_enabled = os.environ.get('CDA_BQ_ETL_ENABLE_DATASET_CATALOG', '').lower() in ('1', 'true', 'yes')
+
+
+def enable_dataset_catalog(enabled: bool = True):
+    """
+    Enable or disable the dataset catalog. When enabled, table existence, table list and column lookups (see lookup
+    module) are answered from a catalog fetched once per dataset, rather than by separate queries or API calls.
+    Tables created, copied or deleted through create_modify invalidate their dataset's catalog; changes made by other
+    processes aren't seen.
+
+    :param enabled: if True, use catalog; defaults to True
+    :type enabled: bool
+    """
+    global _dataset_catalog_enabled
+
+    _dataset_catalog_enabled = enabled
+
+    if not enabled:
+        invalidate_dataset_catalog()
+
+
+def is_dataset_catalog_enabled() -> bool:
+    """
+    Determine whether the dataset catalog is enabled.
+
+    :return: True if enabled, False otherwise
+    :rtype: bool
+    """
+    return _dataset_catalog_enabled
+
+
+def get_dataset_catalog(project_dataset_id: str) -> Optional[dict[str, dict[str, Any]]]:
+    """
+    Get catalog of tables in dataset, fetching it if it isn't already stored. Table names, types, row counts, last
+    modified times and column lists are retrieved by a single query.
+
+    :param project_dataset_id: dataset id in standard SQL format
+    :type project_dataset_id: str
+    :return: dict of table names and metadata dicts (table_type, row_count, last_modified, columns), or None if the
+        catalog couldn't be retrieved (e.g. dataset doesn't exist)
+    :rtype: Optional[dict[str, dict[str, Any]]]
+    """
+    with _dataset_catalogs_lock:
+        if project_dataset_id in _dataset_catalogs:
+            return _dataset_catalogs[project_dataset_id]
+
+    dataset_catalog = fetch_dataset_catalog(project_dataset_id)
+
+    if dataset_catalog is not None:
+        with _dataset_catalogs_lock:
+            _dataset_catalogs[project_dataset_id] = dataset_catalog
+
+    return dataset_catalog
+
+
+def fetch_dataset_catalog(project_dataset_id: str) -> Optional[dict[str, dict[str, Any]]]:
+    """
+    Query table and column metadata for all tables in dataset.
+
+    :param project_dataset_id: dataset id in standard SQL format
+    :type project_dataset_id: str
+    :return: dict of table names and metadata dicts (table_type, row_count, last_modified, columns), or None if the
+        query failed
+    :rtype: Optional[dict[str, dict[str, Any]]]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.catalog')
+
+    sql = f"""
+        SELECT t.table_id AS table_name,
+            t.type AS table_type,
+            t.row_count,
+            t.last_modified_time,
+            c.column_name
+        FROM `{project_dataset_id}.__TABLES__` t
+        LEFT JOIN `{project_dataset_id}`.INFORMATION_SCHEMA.COLUMNS c
+            ON c.table_name = t.table_id
+        ORDER BY t.table_id, c.ordinal_position
+    """
+
+    client = get_bigquery_client()
+    query_job = client.query(query=sql, location='US', job_config=bigquery.QueryJobConfig())
+    query_job = wait_for_job(query_job)
+
+    if query_job.error_result is not None:
+        logger.warning(f"Couldn't retrieve catalog for {project_dataset_id}: {query_job.error_result['message']}")
+        return None
+
+    dataset_catalog = dict()
+
+    for row in query_job.result():
+        if row['table_name'] not in dataset_catalog:
+            dataset_catalog[row['table_name']] = {
+                'table_type': TABLE_TYPES[row['table_type']] if row['table_type'] in TABLE_TYPES else None,
+                'row_count': row['row_count'],
+                'last_modified': datetime.datetime.fromtimestamp(row['last_modified_time'] / 1000,
+                                                                 tz=datetime.timezone.utc),
+                'columns': list()
+            }
+
+        if row['column_name'] is not None:
+            dataset_catalog[row['table_name']]['columns'].append(row['column_name'])
+
+    logger.debug(f"Retrieved catalog for {project_dataset_id} ({len(dataset_catalog)} tables)")
+
+    return dataset_catalog
+
+
+def get_catalog_table_metadata(table_id: str) -> Optional[dict[str, Any]]:
+    """
+    Get table's metadata from its dataset's catalog.
+
+    :param table_id: table id in standard SQL format
+    :type table_id: str
+    :return: metadata dict (table_type, row_count, last_modified, columns), or None if table isn't in catalog
+    :rtype: Optional[dict[str, Any]]
+    """
+    project_dataset_id, table_name = table_id.rsplit('.', 1)
+    dataset_catalog = get_dataset_catalog(project_dataset_id)
+
+    if dataset_catalog is None or table_name not in dataset_catalog:
+        return None
+
+    return dataset_catalog[table_name]
+
+
+def invalidate_dataset_catalog(project_dataset_id: Optional[str] = None):
+    """
+    Discard stored dataset catalog, so that it's fetched again when next needed.
+
+    :param project_dataset_id: dataset id for which to discard catalog; defaults to None (discard all catalogs)
+    :type project_dataset_id: Optional[str]
+    """
+    with _dataset_catalogs_lock:
+        if project_dataset_id is None:
+            _dataset_catalogs.clear()
+        else:
+            _dataset_catalogs.pop(project_dataset_id, None)
@@ -15,18 +15,24 @@
 
 """Create or modify BigQuery tables."""
 
+import concurrent.futures
 import json
 import logging
 import sys
-import time
 import os
+import time
 from typing import Optional, Any, Sequence, Mapping
 
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 from google.cloud.bigquery import SchemaField, Client, LoadJobConfig, QueryJob
 
-from cda_bq_etl.bq_helpers.lookup import exists_bq_dataset, exists_bq_table, table_has_new_data, table_has_new_data_supports_nans
+from cda_bq_etl.bq_helpers.lookup import exists_bq_dataset, exists_bq_table, table_has_new_data, table_has_new_data_supports_nans, \
+    clear_cached_dataset_metadata
+from cda_bq_etl.bq_helpers.jobs import wait_for_job
+from cda_bq_etl.bq_helpers.query_ledger import (estimate_query_bytes, get_ledger_step_name, is_query_ledger_enabled,
+                                                record_job_submission)
+from cda_bq_etl.client_helpers import get_bigquery_client
 from cda_bq_etl.custom_typing import Params
 from cda_bq_etl.utils import (get_filepath, input_with_timeout)
 
@@ -57,6 +63,7 @@ def load_create_table_job(params: Params, data_file: str, client: Client, table_
 
         logger.info(f' - Inserting into {table_id}... ')
         await_insert_job(params, client, table_id, load_job)
+        clear_cached_dataset_metadata(table_id.rsplit('.', 1)[0])
 
     except TypeError as err:
         logger.critical(err)
@@ -76,25 +83,9 @@ def await_job(params: Params, client: Client, bq_job: QueryJob) -> bool:
     :return: True if job successfully executes; otherwise throws a critical error and exits
     :rtype: bool
     """
-    last_report_time = time.time()
-    location = params['LOCATION']
-    job_state = "NOT_STARTED"
-
     logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.create_modify')
 
-    while job_state != 'DONE':
-        bq_job = client.get_job(bq_job.job_id, location=location)
-
-        if time.time() - last_report_time > 30:
-            logger.info(f'\tcurrent job state: {bq_job.state}...\t')
-            last_report_time = time.time()
-
-        job_state = bq_job.state
-
-        if job_state != 'DONE':
-            time.sleep(2)
-
-    bq_job = client.get_job(bq_job.job_id, location=location)
+    bq_job = wait_for_job(bq_job)
 
     if bq_job.error_result is not None:
         err_res = bq_job.error_result
@@ -139,7 +130,8 @@ def create_and_load_table_from_tsv(params: Params,
                                    table_id: str,
                                    num_header_rows: int,
                                    schema: Optional[list[SchemaField]] = None,
-                                   null_marker: Optional[str] = None):
+                                   null_marker: Optional[str] = None,
+                                   compressed: bool = False):
     """
     Create new BigQuery table and populate rows using rows of tsv file.
 
@@ -155,8 +147,12 @@ def create_and_load_table_from_tsv(params: Params,
     :type num_header_rows: int
     :param null_marker: null_marker character, optional (defaults to empty string for tsv/csv in bigquery)
     :type null_marker: Optional[str]
+    :param compressed: if True, load gzip-compressed {tsv_file}.gz (see upload_to_bucket's compress option). Note that
+                       BigQuery can't split compressed files between load workers, and limits them to 4 GB; defaults
+                       to False
+    :type compressed: bool
     """
-    client = bigquery.Client()
+    client = get_bigquery_client()
     job_config = bigquery.LoadJobConfig()
 
     if schema:
@@ -172,13 +168,17 @@ def create_and_load_table_from_tsv(params: Params,
     if null_marker:
         job_config.null_marker = null_marker
 
+    if compressed:
+        tsv_file = f"{tsv_file}.gz"
+
     load_create_table_job(params, tsv_file, client, table_id, job_config)
 
 
 def create_and_load_table_from_jsonl(params: Params,
                                      jsonl_file: str,
                                      table_id: str,
-                                     schema: Optional[list[SchemaField]] = None):
+                                     schema: Optional[list[SchemaField]] = None,
+                                     compressed: bool = False):
     """
     Create new BigQuery table and populate with jsonl file contents.
 
@@ -190,8 +190,12 @@ def create_and_load_table_from_jsonl(params: Params,
     :type table_id: str
     :param schema: list of SchemaField objects; if None, attempt to autodetect schema using BigQuery's native autodetect
     :type schema: Optional[list[SchemaField]]
+    :param compressed: if True, load gzip-compressed {jsonl_file}.gz (see upload_to_bucket's compress option). Note
+                       that BigQuery can't split compressed files between load workers, and limits them to 4 GB;
+                       defaults to False
+    :type compressed: bool
     """
-    client = bigquery.Client()
+    client = get_bigquery_client()
     job_config = bigquery.LoadJobConfig()
 
     logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.create_modify')
@@ -205,8 +209,37 @@ def create_and_load_table_from_jsonl(params: Params,
     job_config.source_format = bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
     job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
 
+    if compressed:
+        jsonl_file = f"{jsonl_file}.gz"
+
     load_create_table_job(params, jsonl_file, client, table_id, job_config)
 
+
+def create_and_load_table_from_parquet(params: Params, parquet_file: str, table_id: str):
+    """
+    Create new BigQuery table and populate with Parquet file contents (see cda_bq_etl.parquet_helpers). Parquet files
+    are self-describing, so the table schema is taken from the file's typed columns.
+
+    :param params: params supplied in yaml config
+    :type params: Params
+    :param parquet_file: Parquet file containing rows to be loaded into table
+    :type parquet_file: str
+    :param table_id: target table id
+    :type table_id: str
+    """
+    client = get_bigquery_client()
+    job_config = bigquery.LoadJobConfig()
+
+    job_config.source_format = bigquery.SourceFormat.PARQUET
+    job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+
+    # load Parquet lists as REPEATED fields, rather than as RECORDs containing a repeated "list.element" field
+    parquet_options = bigquery.format_options.ParquetOptions()
+    parquet_options.enable_list_inference = True
+    job_config.parquet_options = parquet_options
+
+    load_create_table_job(params, parquet_file, client, table_id, job_config)
+
 def publish_table(params: Params, table_ids: dict[str, str]):
     """
     Publish production BigQuery tables using source_table_id. Update versioned table friendly name.
@@ -288,21 +321,168 @@ def create_table_from_query(params: Params, table_id: str, query: str):
     :param query: data selection query, used to populate a new BigQuery table
     :type query: str
     """
-    client = bigquery.Client()
+    client = get_bigquery_client()
     job_config = bigquery.QueryJobConfig(destination=table_id)
     job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
 
     logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.create_modify')
 
+    estimated_bytes = estimate_query_bytes(query) if is_query_ledger_enabled() else None
+
     try:
         query_job = client.query(query, job_config=job_config)
+        record_job_submission(query_job, estimated_bytes)
         logger.info(f' - Inserting into {table_id}... ')
         await_insert_job(params, client, table_id, query_job)
+        clear_cached_dataset_metadata(table_id.rsplit('.', 1)[0])
     except TypeError as err:
         logger.critical(err)
         sys.exit(-1)
 
 
+def create_tables_from_queries(params: Params,
+                               table_queries: dict[str, str],
+                               max_workers: int = 4) -> dict[str, dict[str, Any]]:
+    """
+    Create new BigQuery tables using the result output of several independent BigQuery SQL queries, running up to
+    max_workers query jobs concurrently (see submit_create_table_queries). Waits for every job to finish, then logs
+    each job's errors, if any, and exits.
+
+    :param params: params supplied in yaml config
+    :type params: Params
+    :param table_queries: dict of target table ids and their data selection queries
+    :type table_queries: dict[str, str]
+    :param max_workers: maximum number of query jobs to run at once; defaults to 4
+    :type max_workers: int
+    :return: dict of table ids and their job stats (see run_create_table_query_job)
+    :rtype: dict[str, dict[str, Any]]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.create_modify')
+
+    futures = submit_create_table_queries(params, table_queries, max_workers)
+    table_job_stats = dict()
+
+    for future in concurrent.futures.as_completed(futures.values()):
+        job_stats = future.result()
+        table_job_stats[job_stats['table_id']] = job_stats
+
+        if not job_stats['error']:
+            logger.info(f" - {job_stats['table_id']} done. {job_stats['num_rows']} rows inserted "
+                        f"({job_stats['elapsed_seconds']:.1f}s).")
+
+    failed_job_stats = [job_stats for job_stats in table_job_stats.values() if job_stats['error']]
+
+    if failed_job_stats:
+        for job_stats in failed_job_stats:
+            logger.critical(f"Failed to create {job_stats['table_id']}: {job_stats['error']}")
+
+        logger.critical(f"{len(failed_job_stats)} of {len(table_queries)} table creation jobs failed. Exiting.")
+        sys.exit(-1)
+
+    return {table_id: table_job_stats[table_id] for table_id in table_queries}
+
+
+def submit_create_table_queries(params: Params,
+                                table_queries: dict[str, str],
+                                max_workers: int = 4) -> dict[str, concurrent.futures.Future]:
+    """
+    Submit several independent table creation queries (see create_table_from_query), running up to max_workers query
+    jobs concurrently. Returns immediately.
+
+    :param params: params supplied in yaml config
+    :type params: Params
+    :param table_queries: dict of target table ids and their data selection queries
+    :type table_queries: dict[str, str]
+    :param max_workers: maximum number of query jobs to run at once; defaults to 4
+    :type max_workers: int
+    :return: dict of table ids and futures; each future's result is the job's stats dict (see
+        run_create_table_query_job). Job failures are recorded in the stats dict, rather than raised.
+    :rtype: dict[str, concurrent.futures.Future]
+    """
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                                     thread_name_prefix='create_table_from_query')
+
+    # jobs are submitted from worker threads, so tag their ledger entries with the caller's step
+    step_name = get_ledger_step_name()
+
+    futures = {table_id: executor.submit(run_create_table_query_job, params, table_id, query, step_name)
+               for table_id, query in table_queries.items()}
+
+    # worker threads exit once the submitted jobs are complete
+    executor.shutdown(wait=False)
+
+    return futures
+
+
+def run_create_table_query_job(params: Params,
+                               table_id: str,
+                               query: str,
+                               step_name: Optional[str] = None) -> dict[str, Any]:
+    """
+    Create new BigQuery table using result output of BigQuery SQL query, and wait for the job to finish. Unlike
+    create_table_from_query, errors are returned rather than causing an exit, so that they can be aggregated.
+
+    :param params: params supplied in yaml config
+    :type params: Params
+    :param table_id: target table id
+    :type table_id: str
+    :param query: data selection query, used to populate a new BigQuery table
+    :type query: str
+    :param step_name: query ledger step name tag; defaults to None (see get_ledger_step_name)
+    :type step_name: Optional[str]
+    :return: job stats dict: table_id, job_id, num_rows, total_bytes_processed, slot_millis, elapsed_seconds and error
+        (None if job succeeded)
+    :rtype: dict[str, Any]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.create_modify')
+
+    job_stats = {
+        'table_id': table_id,
+        'job_id': None,
+        'num_rows': None,
+        'total_bytes_processed': None,
+        'slot_millis': None,
+        'elapsed_seconds': None,
+        'error': None
+    }
+
+    start_time = time.time()
+
+    try:
+        client = get_bigquery_client()
+        job_config = bigquery.QueryJobConfig(destination=table_id)
+        job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+
+        estimated_bytes = estimate_query_bytes(query) if is_query_ledger_enabled() else None
+
+        query_job = client.query(query, job_config=job_config)
+        record_job_submission(query_job, estimated_bytes, step_name)
+        job_stats['job_id'] = query_job.job_id
+        logger.info(f' - Inserting into {table_id}... ')
+
+        query_job = wait_for_job(query_job)
+        clear_cached_dataset_metadata(table_id.rsplit('.', 1)[0])
+
+        job_stats['total_bytes_processed'] = query_job.total_bytes_processed
+        job_stats['slot_millis'] = query_job.slot_millis
+
+        if query_job.error_result is not None:
+            job_stats['error'] = f"{query_job.error_result}\n{query_job.errors}"
+        else:
+            job_stats['num_rows'] = client.get_table(table_id).num_rows
+
+            if job_stats['num_rows'] == 0:
+                job_stats['error'] = "Insert job inserted 0 rows."
+    except Exception as err:
+        # record any error (including unexpected ones), so that one failed job doesn't prevent the others' errors
+        # from being reported
+        job_stats['error'] = f"{type(err).__name__}: {err}"
+
+    job_stats['elapsed_seconds'] = time.time() - start_time
+
+    return job_stats
+
+
 def create_view_from_query(view_id: str | Any, view_query: str):
     """
     Create BigQuery view using a SQL query.
@@ -312,7 +492,7 @@ def create_view_from_query(view_id: str | Any, view_query: str):
     :param view_query: query from which to construct the view
     :type view_query: str
     """
-    client = bigquery.Client()
+    client = get_bigquery_client()
     view = bigquery.Table(view_id)
 
     logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.create_modify')
@@ -328,6 +508,7 @@ def create_view_from_query(view_id: str | Any, view_query: str):
 
     view.view_query = view_query
     view = client.create_table(view)
+    clear_cached_dataset_metadata(str(view_id).rsplit('.', 1)[0])
 
     if not exists_bq_table(view_id):
         logger.critical(f"View {view_id} not created, exiting.")
@@ -345,8 +526,9 @@ def delete_bq_table(table_id: str):
     """
     logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.create_modify')
 
-    client = bigquery.Client()
+    client = get_bigquery_client()
     client.delete_table(table=table_id, not_found_ok=True)
+    clear_cached_dataset_metadata(table_id.rsplit('.', 1)[0])
 
     if exists_bq_table(table_id):
         logger.error(f"Table {table_id} not deleted.")
@@ -365,7 +547,7 @@ def copy_bq_table(params: Params, src_table: str, dest_table: str, replace_table
     :param replace_table: Replace existing table, if one exists; defaults to False
     :type replace_table: bool
     """
-    client = bigquery.Client()
+    client = get_bigquery_client()
     job_config = bigquery.CopyJobConfig()
 
     logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.create_modify')
@@ -376,6 +558,7 @@ def copy_bq_table(params: Params, src_table: str, dest_table: str, replace_table
     bq_job = client.copy_table(src_table, dest_table, job_config=job_config)
 
     if await_job(params, client, bq_job):
+        clear_cached_dataset_metadata(dest_table.rsplit('.', 1)[0])
         logger.info(f"Successfully copied {src_table} -> ")
         logger.info(f"\t\t\t{dest_table}")
 
@@ -399,7 +582,7 @@ def create_bq_dataset(params: Params, project_id: str, dataset_name: str):
         logger.info(f"Dataset {dataset_id} already exists, returning")
         return
 
-    client = bigquery.Client(project=project_id)
+    client = get_bigquery_client(project=project_id)
 
     # bigquery accepts a string input here, so don't worry about the typechecker warning
     # noinspection PyTypeChecker
@@ -425,7 +608,7 @@ def update_friendly_name(params: Params, table_id: str, custom_name: Optional[st
         else append the following to the versioned table friendly name: api_params['RELEASE'] + ' VERSIONED'"
     :type custom_name: Optional[str]
     """
-    client = bigquery.Client()
+    client = get_bigquery_client()
 
     if not exists_bq_table(table_id):
         return None
@@ -462,7 +645,7 @@ def update_table_labels(table_id: str, label_dict: dict[str, str]):
     logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.create_modify')
     label, value = None, None
     try:
-        client = bigquery.Client()
+        client = get_bigquery_client()
         table_obj = client.get_table(table_id)
 
         for label, value in label_dict.items():
@@ -501,7 +684,7 @@ def update_table_description(table_ids: list[str], description: str):
 
     try:
         for table_id in table_ids:
-            client = bigquery.Client()
+            client = get_bigquery_client()
             table_obj = client.get_table(table_id)
             table_obj.description = description
 
@@ -573,7 +756,7 @@ def update_table_schema_from_generic(params: Params,
 
     def update_table_metadata(metadata: dict[str, str]):
         """Modify an existing BigQuery table's metadata (labels, friendly name, description)."""
-        client = bigquery.Client()
+        client = get_bigquery_client()
         table = client.get_table(table_id)
 
         table.labels = metadata['labels']
@@ -620,7 +803,7 @@ def update_table_schema_from_generic(params: Params,
         with open(column_desc_fp) as column_output:
             descriptions = json.load(column_output)
 
-        client = bigquery.Client()
+        client = get_bigquery_client()
         table = client.get_table(table_id)
 
         new_schema = []
@@ -670,7 +853,7 @@ def update_table_schema_from_generic(params: Params,
 
             return new_schema
 
-        client = bigquery.Client()
+        client = get_bigquery_client()
         table = client.get_table(table_id)
         table.schema = update_nested_schema(table.schema, list())
 
@@ -719,7 +902,7 @@ def change_status_to_archived(archived_table_id: str):
     :type archived_table_id: str
     """
     try:
-        client = bigquery.Client()
+        client = get_bigquery_client()
         prev_table = client.get_table(archived_table_id)
         prev_table.labels['status'] = 'archived'
         client.update_table(prev_table, ["labels"])
@@ -0,0 +1,182 @@
+# Copyright 2023-2025, Institute for Systems Biology
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Wait for BigQuery jobs to complete."""
+
+import logging
+import statistics
+import threading
+import time
+from typing import Iterable, Iterator
+
+from google.cloud.bigquery import QueryJob, LoadJob, CopyJob, ExtractJob
+
+from cda_bq_etl.bq_helpers.query_ledger import record_job_in_ledger
+
+BigQueryJob = QueryJob | LoadJob | CopyJob | ExtractJob
+
+# first poll happens quickly, so that short metadata queries aren't held up; the interval then grows by
+# POLL_BACKOFF_FACTOR per poll, up to MAX_POLL_INTERVAL, for long-running jobs
+INITIAL_POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 5.0
+POLL_BACKOFF_FACTOR = 1.5
+
+# seconds between "current job state" log messages
+PROGRESS_REPORT_INTERVAL = 30
+
+# time-to-completion (in seconds) of each job awaited by this process
+_job_completion_times: list[float] = list()
+_job_completion_times_lock = threading.Lock()
+
+
+def wait_for_job(bq_job: BigQueryJob,
+                 initial_interval: float = INITIAL_POLL_INTERVAL,
+                 max_interval: float = MAX_POLL_INTERVAL) -> BigQueryJob:
+    """
+    Wait for a BigQuery job (QueryJob, LoadJob, CopyJob, etc.) to complete, polling its state with adaptive backoff.
+    Errors aren't raised; check the returned job's error_result.
+
+    :param bq_job: BigQuery job object
+    :type bq_job: BigQueryJob
+    :param initial_interval: initial seconds between polls (the first poll is immediate); defaults to
+        INITIAL_POLL_INTERVAL
+    :type initial_interval: float
+    :param max_interval: maximum seconds to wait between polls; defaults to MAX_POLL_INTERVAL
+    :type max_interval: float
+    :return: completed job object
+    :rtype: BigQueryJob
+    """
+    for completed_job in wait_for_jobs([bq_job], initial_interval, max_interval):
+        return completed_job
+
+
+def wait_for_jobs(bq_jobs: Iterable[BigQueryJob],
+                  initial_interval: float = INITIAL_POLL_INTERVAL,
+                  max_interval: float = MAX_POLL_INTERVAL) -> Iterator[BigQueryJob]:
+    """
+    Wait for several BigQuery jobs to complete, yielding each job as soon as it's done (in completion order, rather
+    than submission order). Every pending job is polled once per interval; the interval grows from initial_interval
+    to max_interval, and is reset whenever a job completes. Errors aren't raised; check each yielded job's
+    error_result. Completed jobs are recorded in the query ledger, if enabled.
+
+    :param bq_jobs: BigQuery job objects
+    :type bq_jobs: Iterable[BigQueryJob]
+    :param initial_interval: initial seconds between polls (the first poll is immediate); defaults to
+        INITIAL_POLL_INTERVAL
+    :type initial_interval: float
+    :param max_interval: maximum seconds to wait between polls; defaults to MAX_POLL_INTERVAL
+    :type max_interval: float
+    :return: iterator yielding completed jobs
+    :rtype: Iterator[BigQueryJob]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.jobs')
+
+    pending_jobs = list(bq_jobs)
+    wait_start_time = time.time()
+    last_report_time = wait_start_time
+    interval = initial_interval
+
+    while pending_jobs:
+        still_pending_jobs = list()
+
+        for bq_job in pending_jobs:
+            if bq_job.state != 'DONE':
+                bq_job.reload()
+
+            if bq_job.state == 'DONE':
+                record_job_completion_time(bq_job, wait_start_time)
+                record_job_in_ledger(bq_job)
+                interval = initial_interval
+                yield bq_job
+            else:
+                still_pending_jobs.append(bq_job)
+
+        pending_jobs = still_pending_jobs
+
+        if not pending_jobs:
+            break
+
+        if time.time() - last_report_time > PROGRESS_REPORT_INTERVAL:
+            if len(pending_jobs) == 1:
+                logger.info(f'\tcurrent job state: {pending_jobs[0].state}...\t')
+            else:
+                logger.info(f'\twaiting for {len(pending_jobs)} jobs...\t')
+            last_report_time = time.time()
+
+        time.sleep(interval)
+        interval = min(interval * POLL_BACKOFF_FACTOR, max_interval)
+
+
+def record_job_completion_time(bq_job: BigQueryJob, wait_start_time: float):
+    """
+    Record a completed job's time-to-completion, using the job's server-side creation and end times if available
+    (otherwise, the time spent waiting for the job).
+
+    :param bq_job: completed BigQuery job object
+    :type bq_job: BigQueryJob
+    :param wait_start_time: time at which waiting for the job began
+    :type wait_start_time: float
+    """
+    if bq_job.created and bq_job.ended:
+        completion_time = (bq_job.ended - bq_job.created).total_seconds()
+    else:
+        completion_time = time.time() - wait_start_time
+
+    with _job_completion_times_lock:
+        _job_completion_times.append(completion_time)
+
+
+def get_job_completion_stats() -> dict[str, float]:
+    """
+    Get time-to-completion statistics (in seconds) for the jobs awaited by this process.
+
+    :return: dict containing job count and total, mean, median and max completion times
+    :rtype: dict[str, float]
+    """
+    with _job_completion_times_lock:
+        completion_times = list(_job_completion_times)
+
+    if not completion_times:
+        return {'count': 0, 'total': 0.0, 'mean': 0.0, 'median': 0.0, 'max': 0.0}
+
+    return {
+        'count': len(completion_times),
+        'total': sum(completion_times),
+        'mean': statistics.mean(completion_times),
+        'median': statistics.median(completion_times),
+        'max': max(completion_times)
+    }
+
+
+def log_job_completion_stats():
+    """
+    Log time-to-completion statistics for the jobs awaited by this process.
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.jobs')
+
+    stats = get_job_completion_stats()
+
+    if stats['count']:
+        logger.info(f"BigQuery jobs: {stats['count']} completed, {stats['total']:.1f}s total; "
+                    f"completion time mean {stats['mean']:.1f}s, median {stats['median']:.1f}s, "
+                    f"max {stats['max']:.1f}s")
+
+
+def reset_job_completion_stats():
+    """
+    Discard recorded job time-to-completion statistics.
+    """
+    with _job_completion_times_lock:
+        _job_completion_times.clear()
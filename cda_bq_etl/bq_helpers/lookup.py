@@ -15,17 +15,30 @@
 
 """Look up and/or retrieve data stored in BigQuery."""
 
+import datetime
 import logging
+import re
 import sys
-import time
-from typing import Optional
+import threading
+from typing import Any, Iterator, Optional
 
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
-
-from cda_bq_etl.custom_typing import BQQueryResult, Params, _EmptyRowIterator
+from google.cloud.bigquery.table import Row
+
+from cda_bq_etl.bq_helpers.catalog import get_dataset_catalog, invalidate_dataset_catalog, is_dataset_catalog_enabled
+from cda_bq_etl.bq_helpers.jobs import wait_for_job
+from cda_bq_etl.bq_helpers.query_cache import make_query_cache_key, read_cached_query_result, write_cached_query_result
+from cda_bq_etl.bq_helpers.query_ledger import estimate_query_bytes, is_query_ledger_enabled, record_job_submission
+from cda_bq_etl.client_helpers import get_bigquery_client, get_bigquery_storage_client
+from cda_bq_etl.custom_typing import BQQueryResult, Params, RowDict, _EmptyRowIterator
 from cda_bq_etl.utils import (create_dev_table_id, create_metadata_table_id)
 
+# {project_dataset_id: {table_name: creation time}}. Published table lookups search the same versioned datasets
+# repeatedly, so each dataset is listed once (see get_dataset_table_creation_times).
+_dataset_table_listings: dict[str, dict[str, datetime.datetime]] = dict()
+_dataset_table_listings_lock = threading.Lock()
+
 
 def exists_bq_dataset(dataset_id: str) -> bool:
     """
@@ -36,7 +49,7 @@ def exists_bq_dataset(dataset_id: str) -> bool:
     :return: True if dataset exists, False otherwise
     :rtype: bool
     """
-    client = bigquery.Client()
+    client = get_bigquery_client()
 
     try:
         client.get_dataset(dataset_id)
@@ -54,7 +67,14 @@ def exists_bq_table(table_id: str) -> bool:
     :return: True if exists, False otherwise
     :rtype: bool
     """
-    client = bigquery.Client()
+    if is_dataset_catalog_enabled():
+        project_dataset_id, table_name = table_id.rsplit('.', 1)
+        dataset_catalog = get_dataset_catalog(project_dataset_id)
+
+        if dataset_catalog is not None:
+            return table_name in dataset_catalog
+
+    client = get_bigquery_client()
 
     try:
         client.get_table(table_id)
@@ -75,6 +95,18 @@ def list_tables_in_dataset(project_dataset_id: str, filter_terms: Optional[str |
     :return: list of filtered table names
     :rtype: list[str]
     """
+    if is_dataset_catalog_enabled():
+        dataset_catalog = get_dataset_catalog(project_dataset_id)
+
+        if dataset_catalog is not None:
+            if isinstance(filter_terms, str):
+                filter_terms = [filter_terms]
+
+            regexes = [convert_like_pattern_to_regex(f"%{filter_term}%") for filter_term in filter_terms or list()]
+
+            return [table_name for table_name in dataset_catalog
+                    if all(regex.fullmatch(table_name) for regex in regexes)]
+
     where_clause = ''
     if filter_terms:
         if isinstance(filter_terms, str):
@@ -112,6 +144,12 @@ def get_columns_in_table(table_id: str) -> list[str]:
     dataset_id = ".".join(table_id.split(".")[0:-1])
     table_name = table_id.split(".")[-1]
 
+    if is_dataset_catalog_enabled():
+        dataset_catalog = get_dataset_catalog(dataset_id)
+
+        if dataset_catalog is not None:
+            return list(dataset_catalog[table_name]['columns']) if table_name in dataset_catalog else list()
+
     sql = f"""
         SELECT column_name
         FROM `{dataset_id}`.INFORMATION_SCHEMA.COLUMNS
@@ -128,37 +166,118 @@ def get_columns_in_table(table_id: str) -> list[str]:
     return column_list
 
 
-def query_and_retrieve_result(sql: str) -> BQQueryResult | None:
+def query_and_retrieve_result(sql: str, use_cache: bool = False) -> BQQueryResult | list[Row] | None:
     """
     Create and execute a BQ QueryJob; await and return query result.
 
     :param sql: the query for which to execute and return results
     :type sql: str
+    :param use_cache: if True, return the locally cached result of an identical query, provided that the tables it
+        references haven't been modified since (see query_cache.make_query_cache_key); otherwise, run the query and
+        cache its result. Cached results are returned as a list of rows. Defaults to False
+    :type use_cache: bool
     :return: query result, or None if query fails
-    :rtype: BQQueryResult | None
+    :rtype: BQQueryResult | list[Row] | None
     """
-    client = bigquery.Client()
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.lookup')
+
+    cache_key = make_query_cache_key(sql) if use_cache else None
+
+    if cache_key:
+        cached_result = read_cached_query_result(cache_key)
+
+        if cached_result is not None:
+            logger.debug(f"Query result retrieved from cache ({len(cached_result)} rows).")
+            return cached_result
+
+    client = get_bigquery_client()
     job_config = bigquery.QueryJobConfig()
     location = 'US'
 
-    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.lookup')
+    estimated_bytes = estimate_query_bytes(sql) if is_query_ledger_enabled() else None
 
     # Initialize QueryJob
     query_job = client.query(query=sql, location=location, job_config=job_config)
+    record_job_submission(query_job, estimated_bytes)
+
+    query_job = wait_for_job(query_job)
+
+    if query_job.error_result is not None:
+        logger.warning(f"Query failed: {query_job.error_result['message']}")
+        return None
 
-    while query_job.state != 'DONE':
-        query_job = client.get_job(job_id=query_job.job_id, location=location)
+    if cache_key:
+        result = query_job.result()
+        # the row iterator can only be consumed once, so materialize it for both the cache and the caller
+        rows = list(result)
+        write_cached_query_result(cache_key, [field.name for field in result.schema], rows)
+        return rows
 
-        if query_job.state != 'DONE':
-            time.sleep(3)
+    return query_job.result()
 
-    query_job = client.get_job(job_id=query_job.job_id, location=location)
+
+def query_and_stream_arrow_batches(sql: str, use_storage_api: bool = True) -> tuple[Iterator[Any], int] | None:
+    """
+    Create and execute a BQ QueryJob; await result and stream it as Arrow record batches, for columnar access (e.g.
+    batch.column('file_gdc_id')). If google-cloud-bigquery-storage is installed, large results are downloaded via the
+    Storage Read API, using several parallel streams; otherwise, result pages are downloaded via the REST API and
+    converted to Arrow. Much faster than iterating over a RowIterator for large results. Requires pyarrow.
+
+    :param sql: the query for which to execute and return results
+    :type sql: str
+    :param use_storage_api: if True, use the Storage Read API when available; defaults to True
+    :type use_storage_api: bool
+    :return: tuple containing an iterator of pyarrow.RecordBatch objects and the result's total row count (as given
+        by RowIterator.total_rows), or None if query fails
+    :rtype: tuple[Iterator[pyarrow.RecordBatch], int] | None
+    """
+    client = get_bigquery_client()
+    job_config = bigquery.QueryJobConfig()
+    location = 'US'
+
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.lookup')
+
+    # Initialize QueryJob
+    query_job = client.query(query=sql, location=location, job_config=job_config)
+
+    query_job = wait_for_job(query_job)
 
     if query_job.error_result is not None:
         logger.warning(f"Query failed: {query_job.error_result['message']}")
         return None
 
-    return query_job.result()
+    bqstorage_client = get_bigquery_storage_client() if use_storage_api else None
+    result = query_job.result()
+
+    return result.to_arrow_iterable(bqstorage_client=bqstorage_client), result.total_rows or 0
+
+
+def query_and_stream_records(sql: str, use_storage_api: bool = True) -> tuple[Iterator[RowDict], int] | None:
+    """
+    Create and execute a BQ QueryJob; await result and stream its rows as dicts, converted from Arrow record batches
+    (see query_and_stream_arrow_batches). A faster alternative to iterating over query_and_retrieve_result's
+    RowIterator for large results. Requires pyarrow.
+
+    :param sql: the query for which to execute and return results
+    :type sql: str
+    :param use_storage_api: if True, use the Storage Read API when available; defaults to True
+    :type use_storage_api: bool
+    :return: tuple containing an iterator of row dicts and the result's total row count, or None if query fails
+    :rtype: tuple[Iterator[RowDict], int] | None
+    """
+    streamed_result = query_and_stream_arrow_batches(sql, use_storage_api=use_storage_api)
+
+    if streamed_result is None:
+        return None
+
+    record_batches, total_rows = streamed_result
+
+    def iterate_records() -> Iterator[RowDict]:
+        for record_batch in record_batches:
+            # converts the whole batch at once, in C, rather than constructing a Row object per row
+            yield from record_batch.to_pylist()
+
+    return iterate_records(), total_rows
 
 
 def query_and_return_row_count(sql: str) -> int | None:
@@ -170,7 +289,7 @@ def query_and_return_row_count(sql: str) -> int | None:
     :return: number of rows affected, or None if query fails
     :rtype: int | None
     """
-    client = bigquery.Client()
+    client = get_bigquery_client()
     job_config = bigquery.QueryJobConfig()
     location = 'US'
 
@@ -179,13 +298,7 @@ def query_and_return_row_count(sql: str) -> int | None:
     # Initialize QueryJob
     query_job = client.query(query=sql, location=location, job_config=job_config)
 
-    while query_job.state != 'DONE':
-        query_job = client.get_job(job_id=query_job.job_id, location=location)
-
-        if query_job.state != 'DONE':
-            time.sleep(3)
-
-    query_job = client.get_job(job_id=query_job.job_id, location=location)
+    query_job = wait_for_job(query_job)
 
     if query_job.error_result is not None:
         logger.warning(f"Query failed: {query_job.error_result['message']}")
@@ -225,7 +338,7 @@ def find_most_recent_published_table_id(params: Params,
             # if release is 271, shifts to 27.1, giving r27p1, which is legal for BQ table naming
             previous_release = params['RELEASE'][0] + str(float(release) / 10).replace('.', 'p').replace('p0', '')
             prev_release_table_id = f"{table_id_without_release}{previous_release}"
-            if exists_bq_table(prev_release_table_id):
+            if exists_in_dataset_table_listing(prev_release_table_id):
                 # found last release table, stop iterating
                 return prev_release_table_id
 
@@ -291,7 +404,7 @@ def find_most_recent_published_refseq_table_id(params: Params, versioned_table_i
 
         prev_release_table_id = f"{table_id_no_release}_{last_year}_{last_month_str}"
 
-        if exists_bq_table(prev_release_table_id):
+        if exists_in_dataset_table_listing(prev_release_table_id):
             return prev_release_table_id
 
 
@@ -313,29 +426,19 @@ def get_most_recent_published_table_id_pdc(params: Params,
     :return: last published table id, if any; otherwise None
     :rtype: str | None
     """
+    # table name must contain table_filter_str (and node name, for non-metadata tables)
+    like_patterns = [f"%{table_filter_str}%"]
 
-    if is_metadata:
-        node_table_name_clause = ""
-    else:
-        node_table_name_clause = f"AND table_name LIKE '%{params['NODE']}%'"
-
-    def make_program_tables_query() -> str:
-        return f"""
-            SELECT table_name 
-            FROM `{params['PROD_PROJECT']}.{dataset}_versioned`.INFORMATION_SCHEMA.TABLES
-            WHERE table_name LIKE '%{table_filter_str}%'
-                {node_table_name_clause}
-            ORDER BY creation_time DESC
-            LIMIT 1
-        """
+    if not is_metadata:
+        like_patterns.append(f"%{params['NODE']}%")
 
-    previous_versioned_table_name_result = query_and_retrieve_result(make_program_tables_query())
+    versioned_dataset_id = f"{params['PROD_PROJECT']}.{dataset}_versioned"
+    table_name = find_most_recent_table_name(versioned_dataset_id, like_patterns)
 
-    if previous_versioned_table_name_result is None:
+    if table_name is None:
         return None
-    for previous_versioned_table_name in previous_versioned_table_name_result:
-        table_name = previous_versioned_table_name[0]
-        return f"{params['PROD_PROJECT']}.{dataset}_versioned.{table_name}"
+
+    return f"{versioned_dataset_id}.{table_name}"
 
 
 def get_most_recent_published_table_id_dcf(params: Params,
@@ -351,22 +454,142 @@ def get_most_recent_published_table_id_dcf(params: Params,
     :param table_filter_str: String used to filter table id results
     :type table_filter_str: str
     """
-    def make_program_tables_query() -> str:
-        return f"""
-            SELECT table_name 
-            FROM `{params['PROD_PROJECT']}.{dataset}_versioned`.INFORMATION_SCHEMA.TABLES
-            WHERE table_name LIKE '%{table_filter_str}%'
-            ORDER BY creation_time DESC
-            LIMIT 1
-        """
+    versioned_dataset_id = f"{params['PROD_PROJECT']}.{dataset}_versioned"
+    table_name = find_most_recent_table_name(versioned_dataset_id, [f"%{table_filter_str}%"])
+
+    if table_name is None:
+        return None
+
+    return f"{versioned_dataset_id}.{table_name}"
+
+
+def get_dataset_table_creation_times(project_dataset_id: str, refresh: bool = False) -> dict[str, datetime.datetime]:
+    """
+    List the tables in a dataset, along with their creation times. The dataset is listed once (a single, paginated
+    API call, rather than a query or a get_table call per table); subsequent calls are answered from memory.
+
+    :param project_dataset_id: dataset id in standard SQL format
+    :type project_dataset_id: str
+    :param refresh: if True, list the dataset again rather than using the stored listing; defaults to False
+    :type refresh: bool
+    :return: dict of table names and creation times (empty if dataset doesn't exist)
+    :rtype: dict[str, datetime.datetime]
+    """
+    with _dataset_table_listings_lock:
+        if not refresh and project_dataset_id in _dataset_table_listings:
+            return _dataset_table_listings[project_dataset_id]
+
+    client = get_bigquery_client()
+
+    try:
+        table_creation_times = {table_item.table_id: table_item.created
+                                for table_item in client.list_tables(project_dataset_id)}
+    except NotFound:
+        table_creation_times = dict()
+
+    with _dataset_table_listings_lock:
+        _dataset_table_listings[project_dataset_id] = table_creation_times
 
-    previous_versioned_table_name_result = query_and_retrieve_result(make_program_tables_query())
+    return table_creation_times
 
-    if previous_versioned_table_name_result is None:
+
+def clear_dataset_table_listings(project_dataset_id: Optional[str] = None):
+    """
+    Discard stored dataset listings (see get_dataset_table_creation_times), e.g. after a table is created or deleted.
+
+    :param project_dataset_id: dataset id for which to discard listing; defaults to None (discard all listings)
+    :type project_dataset_id: Optional[str]
+    """
+    with _dataset_table_listings_lock:
+        if project_dataset_id is None:
+            _dataset_table_listings.clear()
+        else:
+            _dataset_table_listings.pop(project_dataset_id, None)
+
+
+def clear_cached_dataset_metadata(project_dataset_id: str):
+    """
+    Discard all stored metadata for dataset (table listing and catalog), after one of its tables is created, modified
+    or deleted.
+
+    :param project_dataset_id: dataset id in standard SQL format
+    :type project_dataset_id: str
+    """
+    clear_dataset_table_listings(project_dataset_id)
+    invalidate_dataset_catalog(project_dataset_id)
+
+
+def exists_in_dataset_table_listing(table_id: str) -> bool:
+    """
+    Determine whether a table exists, using its dataset's stored listing (see get_dataset_table_creation_times).
+    Faster than exists_bq_table when checking many tables in the same dataset.
+
+    :param table_id: table id in standard SQL format
+    :type table_id: str
+    :return: True if exists, False otherwise
+    :rtype: bool
+    """
+    project_dataset_id, table_name = table_id.rsplit('.', 1)
+
+    return table_name in get_dataset_table_creation_times(project_dataset_id)
+
+
+def convert_like_pattern_to_regex(like_pattern: str) -> re.Pattern:
+    """
+    Convert a SQL LIKE pattern to an equivalent regular expression (% matches any string, _ matches any single
+    character, and a backslash matches the following character literally, e.g. \\_ or \\%; matching is
+    case-sensitive, as in BigQuery).
+
+    :param like_pattern: SQL LIKE pattern
+    :type like_pattern: str
+    :return: compiled regular expression, which must match the full string
+    :rtype: re.Pattern
+    """
+    regex_parts = list()
+    escaped = False
+
+    for char in like_pattern:
+        if escaped:
+            regex_parts.append(re.escape(char))
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '%':
+            regex_parts.append('.*')
+        elif char == '_':
+            regex_parts.append('.')
+        else:
+            regex_parts.append(re.escape(char))
+
+    if escaped:
+        # a trailing backslash has nothing to escape; match it literally
+        regex_parts.append(re.escape('\\'))
+
+    return re.compile("".join(regex_parts), re.DOTALL)
+
+
+def find_most_recent_table_name(project_dataset_id: str, like_patterns: list[str]) -> str | None:
+    """
+    Find the most recently created table in dataset whose name matches all like_patterns, using the dataset's stored
+    listing (see get_dataset_table_creation_times).
+
+    :param project_dataset_id: dataset id in standard SQL format
+    :type project_dataset_id: str
+    :param like_patterns: SQL LIKE patterns, all of which the table name must match
+    :type like_patterns: list[str]
+    :return: most recently created matching table name, if any; otherwise None
+    :rtype: str | None
+    """
+    regexes = [convert_like_pattern_to_regex(like_pattern) for like_pattern in like_patterns]
+
+    matching_tables = [(created, table_name)
+                       for table_name, created in get_dataset_table_creation_times(project_dataset_id).items()
+                       if all(regex.fullmatch(table_name) for regex in regexes)]
+
+    if not matching_tables:
         return None
-    for previous_versioned_table_name in previous_versioned_table_name_result:
-        table_name = previous_versioned_table_name[0]
-        return f"{params['PROD_PROJECT']}.{dataset}_versioned.{table_name}"
+
+    return max(matching_tables)[1]
 
 
 def get_pdc_per_project_dataset(params: Params, project_short_name: str) -> str:
@@ -455,7 +678,8 @@ def get_pdc_project_metadata(params: Params, project_submitter_id: Optional[str]
             {where_clause}
         """
 
-    projects_result = query_and_retrieve_result(make_study_query())
+    use_cache = params['ENABLE_QUERY_CACHE'] if 'ENABLE_QUERY_CACHE' in params else False
+    projects_result = query_and_retrieve_result(make_study_query(), use_cache=use_cache)
 
     projects_list = list()
 
@@ -492,7 +716,8 @@ def get_gdc_program_list(params: Params, rename_programs: bool = True) -> list[s
                 ORDER BY program_name
             """
 
-        result = query_and_retrieve_result(sql=make_program_name_set_query())
+        use_cache = params['ENABLE_QUERY_CACHE'] if 'ENABLE_QUERY_CACHE' in params else False
+        result = query_and_retrieve_result(sql=make_program_name_set_query(), use_cache=use_cache)
         program_name_set = set()
 
         for row in result:
@@ -531,7 +756,8 @@ def get_pdc_projects_metadata_list(params: Params) -> list[dict[str, str]]:
             FROM `{studies_table_id}`
         """
 
-    projects_result = query_and_retrieve_result(make_all_studies_query())
+    use_cache = params['ENABLE_QUERY_CACHE'] if 'ENABLE_QUERY_CACHE' in params else False
+    projects_result = query_and_retrieve_result(make_all_studies_query(), use_cache=use_cache)
 
     projects_list = list()
 
@@ -553,15 +779,6 @@ def find_missing_columns(params: Params, include_trivial_columns: bool = False):
     :type include_trivial_columns: bool
     """
 
-    def make_column_query():
-        full_table_name = create_dev_table_id(params, table_name).split('.')[2]
-
-        return f"""
-            SELECT column_name
-            FROM {params['DEV_PROJECT']}.{params['DEV_RAW_DATASET']}.INFORMATION_SCHEMA.COLUMNS
-            WHERE table_name = '{full_table_name}' 
-        """
-
     def make_column_values_query():
         return f"""
             SELECT DISTINCT {column}
@@ -576,12 +793,10 @@ def find_missing_columns(params: Params, include_trivial_columns: bool = False):
 
     for table_name in params['TABLE_PARAMS'].keys():
         # get list of columns from raw CDA tables
-        result = query_and_retrieve_result(make_column_query())
+        full_table_name = create_dev_table_id(params, table_name).split('.')[2]
+        raw_table_id = f"{params['DEV_PROJECT']}.{params['DEV_RAW_DATASET']}.{full_table_name}"
 
-        cda_columns_set = set()
-
-        for row in result:
-            cda_columns_set.add(row[0])
+        cda_columns_set = set(get_columns_in_table(raw_table_id))
 
         excluded_columns_set = set()
 
@@ -709,6 +924,10 @@ def table_has_new_data_supports_nans(previous_table_id: str, current_table_id: s
     if not previous_table_id:
         return True
 
+    if tables_have_matching_fingerprints(previous_table_id, current_table_id, nan_column):
+        # identical row counts and fingerprints, tables match--skip the (much more expensive) full comparison
+        return False
+
     query_logger.info(f"Query to find any difference in table data")
     # WJRL 12/18/25 Since NaN != NaN, you cannot use the raw table to compare if it has a column holding NaNs:
     sql_stmt = compare_two_tables_sql() if nan_column is None else compare_two_nan_tables_sql(nan_column)
@@ -725,3 +944,62 @@ def table_has_new_data_supports_nans(previous_table_id: str, current_table_id: s
 
     for row in compare_result:
         return True if row else False
+
+
+def tables_have_matching_fingerprints(previous_table_id: str,
+                                      current_table_id: str,
+                                      nan_column: Optional[str] = None) -> bool:
+    """
+    Compare row counts and order-independent fingerprints of two tables' rows. Each row is fingerprinted using
+    FARM_FINGERPRINT(TO_JSON_STRING(row)) (JSON renders NaN as a string, so NaNs compare equal); the fingerprints are
+    combined using both BIT_XOR and SUM, since XOR alone cancels out duplicate rows. This aggregates each table in a
+    single pass, rather than comparing every row pair, so it's a cheap test for unchanged tables. A mismatch doesn't
+    prove tables differ (e.g. one may include duplicate rows), so use table_has_new_data_supports_nans to confirm.
+
+    :param previous_table_id: table id for existing published table
+    :type previous_table_id: str
+    :param current_table_id: table id for new table
+    :type current_table_id: str
+    :param nan_column: optional column holding NaNs, cast to string for comparison (as in
+        table_has_new_data_supports_nans); defaults to None
+    :type nan_column: Optional[str]
+    :return: True if row counts and fingerprints match, False if they don't (or the query failed)
+    :rtype: bool
+    """
+    def make_table_select(table_id: str) -> str:
+        if nan_column is None:
+            return f"SELECT * FROM `{table_id}`"
+
+        return f"SELECT * EXCEPT ({nan_column}), CAST({nan_column} AS STRING) AS nan_string FROM `{table_id}`"
+
+    def make_fingerprint_sql(table_version: str, table_id: str) -> str:
+        return f"""
+            SELECT '{table_version}' AS table_version,
+                COUNT(*) AS row_count,
+                BIT_XOR(row_fingerprint) AS xor_fingerprint,
+                SUM(CAST(row_fingerprint AS BIGNUMERIC)) AS sum_fingerprint
+            FROM (
+                SELECT FARM_FINGERPRINT(TO_JSON_STRING(t)) AS row_fingerprint
+                FROM ({make_table_select(table_id)}) t
+            )
+        """
+
+    query_logger = logging.getLogger('query_logger')
+    query_logger.info("Query to compare table row fingerprints")
+
+    fingerprint_result = query_and_retrieve_result(sql=f"""
+        {make_fingerprint_sql('previous', previous_table_id)}
+        UNION ALL
+        {make_fingerprint_sql('current', current_table_id)}
+    """)
+
+    if fingerprint_result is None:
+        return False
+
+    fingerprints = {row['table_version']: (row['row_count'], row['xor_fingerprint'], row['sum_fingerprint'])
+                    for row in fingerprint_result}
+
+    if 'previous' not in fingerprints or 'current' not in fingerprints:
+        return False
+
+    return fingerprints['previous'] == fingerprints['current']
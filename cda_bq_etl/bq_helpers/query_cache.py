@@ -0,0 +1,236 @@
+# Copyright 2023-2025, Institute for Systems Biology
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Cache BigQuery query results on local disk, keyed by query and source table freshness. Requires pyarrow."""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from typing import Any, Iterable, Optional
+
+from google.api_core.exceptions import GoogleAPICallError
+from google.cloud.bigquery.table import Row
+
+from cda_bq_etl.client_helpers import get_bigquery_client
+
+# set CDA_BQ_ETL_QUERY_CACHE_DIR to change the cache location
+QUERY_CACHE_DIR = os.environ.get('CDA_BQ_ETL_QUERY_CACHE_DIR',
+                                 os.path.join(os.path.expanduser('~'), '.cache', 'cda_bq_etl', 'query_cache'))
+
+# table references following FROM or JOIN, with or without backticks, e.g. `project.dataset.table`, dataset.table,
+# a CTE name or a wildcard table; table functions such as UNNEST(...) and subqueries aren't matched
+TABLE_REFERENCE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+([`A-Za-z0-9_\-.$*]+)(?=[\s,);]|$)", re.IGNORECASE)
+# comma (cross) joins, e.g. FROM a.b.c t, a.b.d u -- only the first table would be found by TABLE_REFERENCE_PATTERN
+COMMA_JOIN_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+[`A-Za-z0-9_\-.$*]+(?:\s+(?:AS\s+)?[A-Za-z0-9_]+)?\s*,",
+                                re.IGNORECASE)
+# common table expression names, e.g. WITH cte_name AS (...), other_cte AS (...)
+CTE_NAME_PATTERN = re.compile(r"(?:\bWITH(?:\s+RECURSIVE)?|,)\s+([A-Za-z0-9_]+)\s+AS\s*\(", re.IGNORECASE)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalize SQL whitespace, so that reformatted (e.g. re-indented) queries share a cache entry. Case is
+    preserved, since string literals are case-sensitive.
+
+    :param sql: SQL query
+    :type sql: str
+    :return: normalized SQL query
+    :rtype: str
+    """
+    return " ".join(sql.split())
+
+
+def find_table_references(sql: str) -> list[str]:
+    """
+    Find table references (with backticks removed) in a query's FROM and JOIN clauses, excluding the query's common
+    table expression names.
+
+    :param sql: SQL query
+    :type sql: str
+    :return: sorted list of distinct table references
+    :rtype: list[str]
+    """
+    cte_names = {cte_name.lower() for cte_name in CTE_NAME_PATTERN.findall(sql)}
+    table_references = {table_reference.replace('`', '') for table_reference in TABLE_REFERENCE_PATTERN.findall(sql)}
+
+    return sorted(table_reference for table_reference in table_references if table_reference.lower() not in cte_names)
+
+
+def is_fully_qualified_table_id(table_reference: str) -> bool:
+    """
+    Determine whether table reference is a fully qualified (project.dataset.table) id for a single table.
+
+    :param table_reference: table reference (see find_table_references)
+    :type table_reference: str
+    :return: True if reference is a fully qualified table id, False if it's partially qualified or a wildcard
+    :rtype: bool
+    """
+    return len(table_reference.split('.')) == 3 and all(table_reference.split('.')) and '*' not in table_reference
+
+
+def find_referenced_table_ids(sql: str) -> list[str]:
+    """
+    Find fully qualified table ids referenced in a query's FROM and JOIN clauses. Partially qualified references,
+    wildcard tables and tables after the first in a comma join aren't included (see make_query_cache_key).
+
+    :param sql: SQL query
+    :type sql: str
+    :return: sorted list of distinct table ids
+    :rtype: list[str]
+    """
+    return [table_reference for table_reference in find_table_references(sql)
+            if is_fully_qualified_table_id(table_reference)]
+
+
+def make_query_cache_key(sql: str) -> Optional[str]:
+    """
+    Make cache key from the normalized query and the last modified time of each table it references, so that
+    entries become stale as soon as a source table changes. Returns None if the query's freshness can't be
+    determined: if it references no tables, a table which isn't fully qualified (e.g. dataset.table), a wildcard
+    table, a view, INFORMATION_SCHEMA or a table that can't be retrieved, or if it contains a comma join (whose
+    tables aren't all found).
+
+    :param sql: SQL query
+    :type sql: str
+    :return: cache key, or None if query result shouldn't be cached
+    :rtype: Optional[str]
+    """
+    if 'INFORMATION_SCHEMA' in sql.upper() or COMMA_JOIN_PATTERN.search(sql):
+        return None
+
+    table_ids = find_table_references(sql)
+
+    if not table_ids or not all(is_fully_qualified_table_id(table_id) for table_id in table_ids):
+        return None
+
+    client = get_bigquery_client()
+    key_components = [normalize_sql(sql)]
+
+    for table_id in table_ids:
+        try:
+            table = client.get_table(table_id)
+        except (GoogleAPICallError, ValueError):
+            return None
+
+        # a view's modified time reflects its definition, not the data in its underlying tables
+        if table.table_type != 'TABLE' or table.modified is None:
+            return None
+
+        key_components.append(f"{table_id}@{table.modified.isoformat()}")
+
+    return hashlib.sha256("\n".join(key_components).encode('utf-8')).hexdigest()
+
+
+def get_query_cache_fp(cache_key: str) -> str:
+    """
+    Get file path for a cache entry.
+
+    :param cache_key: cache key (see make_query_cache_key)
+    :type cache_key: str
+    :return: cache file path
+    :rtype: str
+    """
+    return os.path.join(QUERY_CACHE_DIR, f"{cache_key}.arrow")
+
+
+def read_cached_query_result(cache_key: str) -> Optional[list[Row]]:
+    """
+    Read cached query result.
+
+    :param cache_key: cache key (see make_query_cache_key)
+    :type cache_key: str
+    :return: list of result rows, or None if query isn't cached
+    :rtype: Optional[list[Row]]
+    """
+    cache_fp = get_query_cache_fp(cache_key)
+
+    if not os.path.exists(cache_fp):
+        return None
+
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        return None
+
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.query_cache')
+
+    try:
+        result_table = feather.read_table(cache_fp)
+    except (OSError, ValueError) as err:
+        logger.warning(f"Couldn't read query cache file {cache_fp}, ignoring: {err}")
+        return None
+
+    field_to_index = {column_name: idx for idx, column_name in enumerate(result_table.column_names)}
+    column_values = [column.to_pylist() for column in result_table.columns]
+
+    return [Row(row_values, field_to_index) for row_values in zip(*column_values)]
+
+
+def write_cached_query_result(cache_key: str, column_names: list[str], rows: Iterable[Row]):
+    """
+    Write query result to cache, as an Arrow (Feather) file. Results which can't be represented in Arrow aren't
+    cached.
+
+    :param cache_key: cache key (see make_query_cache_key)
+    :type cache_key: str
+    :param column_names: result column names
+    :type column_names: list[str]
+    :param rows: result rows
+    :type rows: Iterable[Row]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.query_cache')
+
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        logger.warning("pyarrow isn't installed; query results won't be cached.")
+        return
+
+    rows = list(rows)
+    column_values: list[list[Any]] = [[row[idx] for row in rows] for idx in range(len(column_names))]
+
+    try:
+        result_table = pa.table([pa.array(values) for values in column_values], names=column_names)
+    except (pa.ArrowException, TypeError, ValueError) as err:
+        logger.warning(f"Query result couldn't be converted to Arrow; not cached: {err}")
+        return
+
+    os.makedirs(QUERY_CACHE_DIR, exist_ok=True)
+
+    # write to a temporary file, then rename, so that concurrent readers never see a partial entry
+    temp_fd, temp_fp = tempfile.mkstemp(dir=QUERY_CACHE_DIR, suffix='.tmp')
+    os.close(temp_fd)
+
+    try:
+        feather.write_feather(result_table, temp_fp, compression='zstd')
+        os.replace(temp_fp, get_query_cache_fp(cache_key))
+    finally:
+        if os.path.exists(temp_fp):
+            os.remove(temp_fp)
+
+
+def clear_query_cache():
+    """
+    Delete all cached query results.
+    """
+    if not os.path.exists(QUERY_CACHE_DIR):
+        return
+
+    for file_name in os.listdir(QUERY_CACHE_DIR):
+        if file_name.endswith('.arrow'):
+            os.remove(os.path.join(QUERY_CACHE_DIR, file_name))
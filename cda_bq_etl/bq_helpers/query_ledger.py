@@ -0,0 +1,335 @@
+# Copyright 2023-2025, Institute for Systems Biology
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Record the cost and duration of each BigQuery job in a local JSONL ledger."""
+
+import atexit
+import datetime
+import json
+import logging
+import os
+import sys
+import threading
+import uuid
+from typing import Any, Optional
+
+from google.api_core.exceptions import GoogleAPICallError
+from google.cloud import bigquery
+
+from cda_bq_etl.client_helpers import get_bigquery_client
+
+# maximum number of query characters stored with each ledger entry
+MAX_QUERY_SNIPPET_LENGTH = 500
+
+# ledger is opt-in: enable with enable_query_ledger() or by setting CDA_BQ_ETL_QUERY_LEDGER to the ledger file path.
+# Processes sharing a ledger file (e.g. the scripts run by create_tables_all_gdc) can group their entries by setting
+# CDA_BQ_ETL_QUERY_LEDGER_RUN_ID.
+_ledger_fp: Optional[str] = os.environ.get('CDA_BQ_ETL_QUERY_LEDGER') or None
+_ledger_run_id: str = os.environ.get('CDA_BQ_ETL_QUERY_LEDGER_RUN_ID') or uuid.uuid4().hex
+_ledger_step: Optional[str] = None
+# entries recorded by this process, used for the run summary
+_ledger_entries: list[dict[str, Any]] = list()
+# {job id: dry run estimate of bytes processed}
+_dry_run_estimates: dict[str, int] = dict()
+# {job id: step name at the time the job was submitted}
+_job_steps: dict[str, str] = dict()
+_ledger_lock = threading.Lock()
+
+
+def enable_query_ledger(ledger_fp: Optional[str], run_id: Optional[str] = None):
+    """
+    Enable or disable the query ledger. When enabled, every BigQuery job awaited by wait_for_job(s) is appended to
+    the ledger file, tagged with run id, script and step name (see set_query_ledger_step).
+
+    :param ledger_fp: ledger file path, or None to disable the ledger
+    :type ledger_fp: Optional[str]
+    :param run_id: id used to group ledger entries; defaults to None (keep current run id)
+    :type run_id: Optional[str]
+    """
+    global _ledger_fp, _ledger_run_id
+
+    _ledger_fp = ledger_fp
+
+    if run_id:
+        _ledger_run_id = run_id
+
+
+def is_query_ledger_enabled() -> bool:
+    """
+    Determine whether the query ledger is enabled.
+
+    :return: True if enabled, False otherwise
+    :rtype: bool
+    """
+    return _ledger_fp is not None
+
+
+def set_query_ledger_step(step_name: Optional[str]):
+    """
+    Set step name used to tag subsequent ledger entries. If no step is set, entries are tagged with the name of the
+    script function which started the job.
+
+    :param step_name: step name (e.g. yaml step), or None to clear
+    :type step_name: Optional[str]
+    """
+    global _ledger_step
+
+    _ledger_step = step_name
+
+
+def get_caller_step_name() -> str:
+    """
+    Find the innermost function of the running script (the __main__ module) in the call stack.
+
+    :return: function name, or 'main' if the job wasn't started from a script function
+    :rtype: str
+    """
+    main_module = sys.modules['__main__'] if '__main__' in sys.modules else None
+    main_fp = getattr(main_module, '__file__', None)
+    frame = sys._getframe(1)
+
+    while frame is not None:
+        if main_fp and frame.f_code.co_filename == main_fp and frame.f_code.co_name != '<module>':
+            return frame.f_code.co_name
+        frame = frame.f_back
+
+    return 'main'
+
+
+def get_ledger_step_name() -> str:
+    """
+    Get step name used to tag ledger entries for jobs submitted now: the step set by set_query_ledger_step, if any,
+    otherwise the script function in the call stack.
+
+    :return: step name
+    :rtype: str
+    """
+    return _ledger_step if _ledger_step else get_caller_step_name()
+
+
+def estimate_query_bytes(sql: str) -> Optional[int]:
+    """
+    Estimate bytes processed by query, using a dry run (dry runs are free, and don't use the query cache).
+
+    :param sql: SQL query
+    :type sql: str
+    :return: estimated bytes processed, or None if the dry run failed
+    :rtype: Optional[int]
+    """
+    client = get_bigquery_client()
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+
+    try:
+        return client.query(sql, job_config=job_config).total_bytes_processed
+    except (GoogleAPICallError, TypeError, ValueError):
+        return None
+
+
+def record_job_submission(bq_job: Any, estimated_bytes: Optional[int], step_name: Optional[str] = None):
+    """
+    Store a newly submitted job's step name and dry run estimate, to be included in its ledger entry once it
+    completes. The step is captured at submission, because jobs may be awaited elsewhere (e.g. in a worker thread).
+
+    :param bq_job: BigQuery job object
+    :type bq_job: Any
+    :param estimated_bytes: estimated bytes processed (see estimate_query_bytes)
+    :type estimated_bytes: Optional[int]
+    :param step_name: step name tag; defaults to None (see get_ledger_step_name). Pass the submitting script's step
+        when submitting from a worker thread.
+    :type step_name: Optional[str]
+    """
+    if _ledger_fp is None:
+        return
+
+    if step_name is None:
+        step_name = get_ledger_step_name()
+
+    with _ledger_lock:
+        _job_steps[bq_job.job_id] = step_name
+
+        if estimated_bytes is not None:
+            _dry_run_estimates[bq_job.job_id] = estimated_bytes
+
+
+def make_ledger_entry(bq_job: Any, step_name: str) -> dict[str, Any]:
+    """
+    Make ledger entry from a completed BigQuery job. Cost fields only apply to query jobs, and are None for others.
+
+    :param bq_job: completed BigQuery job object
+    :type bq_job: Any
+    :param step_name: step name tag
+    :type step_name: str
+    :return: ledger entry dict
+    :rtype: dict[str, Any]
+    """
+    with _ledger_lock:
+        estimated_bytes = _dry_run_estimates.pop(bq_job.job_id, None)
+
+    if bq_job.started and bq_job.ended:
+        elapsed_seconds = (bq_job.ended - bq_job.started).total_seconds()
+    else:
+        elapsed_seconds = None
+
+    query = getattr(bq_job, 'query', None)
+    destination = getattr(bq_job, 'destination', None)
+
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'run_id': _ledger_run_id,
+        'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+        'step': step_name,
+        'job_id': bq_job.job_id,
+        'job_type': bq_job.job_type,
+        'statement_type': getattr(bq_job, 'statement_type', None),
+        'destination': str(destination) if destination is not None else None,
+        'estimated_bytes': estimated_bytes,
+        'total_bytes_processed': getattr(bq_job, 'total_bytes_processed', None),
+        'total_bytes_billed': getattr(bq_job, 'total_bytes_billed', None),
+        'slot_millis': getattr(bq_job, 'slot_millis', None),
+        'cache_hit': getattr(bq_job, 'cache_hit', None),
+        'elapsed_seconds': elapsed_seconds,
+        'error': bq_job.error_result['message'] if bq_job.error_result else None,
+        'query': " ".join(query.split())[:MAX_QUERY_SNIPPET_LENGTH] if query else None
+    }
+
+
+def record_job_in_ledger(bq_job: Any):
+    """
+    Append completed job's entry to the ledger file, if the ledger is enabled.
+
+    :param bq_job: completed BigQuery job object
+    :type bq_job: Any
+    """
+    if _ledger_fp is None:
+        return
+
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.query_ledger')
+
+    with _ledger_lock:
+        step_name = _job_steps.pop(bq_job.job_id, None)
+
+    ledger_entry = make_ledger_entry(bq_job, step_name if step_name else get_ledger_step_name())
+
+    with _ledger_lock:
+        _ledger_entries.append(ledger_entry)
+
+        try:
+            # each entry is written in a single append, so processes can share a ledger file
+            with open(_ledger_fp, mode='a') as ledger_file:
+                ledger_file.write(json.dumps(ledger_entry) + '\n')
+        except OSError as err:
+            logger.warning(f"Couldn't write to query ledger {_ledger_fp}: {err}")
+
+
+def read_query_ledger(ledger_fp: str, run_id: Optional[str] = None) -> list[dict[str, Any]]:
+    """
+    Read ledger entries from file.
+
+    :param ledger_fp: ledger file path
+    :type ledger_fp: str
+    :param run_id: if specified, only return entries with this run id; defaults to None
+    :type run_id: Optional[str]
+    :return: list of ledger entries
+    :rtype: list[dict[str, Any]]
+    """
+    if not os.path.exists(ledger_fp):
+        return list()
+
+    with open(ledger_fp, mode='r') as ledger_file:
+        ledger_entries = [json.loads(line) for line in ledger_file if line.strip()]
+
+    if run_id:
+        return [ledger_entry for ledger_entry in ledger_entries if ledger_entry['run_id'] == run_id]
+
+    return ledger_entries
+
+
+def format_query_ledger_summary(ledger_entries: list[dict[str, Any]], top_n: int = 10) -> str:
+    """
+    Format summary of ledger entries: totals, totals per script step, and the top_n jobs by bytes billed and by
+    elapsed time.
+
+    :param ledger_entries: ledger entries
+    :type ledger_entries: list[dict[str, Any]]
+    :param top_n: number of jobs to list in each ranking; defaults to 10
+    :type top_n: int
+    :return: formatted summary
+    :rtype: str
+    """
+    def format_gib(num_bytes: Optional[int]) -> str:
+        return f"{(num_bytes or 0) / 1024 ** 3:.2f} GiB"
+
+    def format_entry(ledger_entry: dict[str, Any]) -> str:
+        return (f"    {format_gib(ledger_entry['total_bytes_billed'])} billed, "
+                f"{ledger_entry['elapsed_seconds'] or 0:.1f}s, {(ledger_entry['slot_millis'] or 0) / 1000:.0f} slot-s "
+                f"[{ledger_entry['script']}:{ledger_entry['step']}] {ledger_entry['job_id']}: "
+                f"{(ledger_entry['query'] or '')[:100]}")
+
+    step_totals = dict()
+
+    for ledger_entry in ledger_entries:
+        step_key = f"{ledger_entry['script']}:{ledger_entry['step']}"
+
+        if step_key not in step_totals:
+            step_totals[step_key] = {'jobs': 0, 'bytes_billed': 0, 'slot_millis': 0, 'seconds': 0.0}
+
+        step_totals[step_key]['jobs'] += 1
+        step_totals[step_key]['bytes_billed'] += ledger_entry['total_bytes_billed'] or 0
+        step_totals[step_key]['slot_millis'] += ledger_entry['slot_millis'] or 0
+        step_totals[step_key]['seconds'] += ledger_entry['elapsed_seconds'] or 0.0
+
+    total_bytes_billed = sum(totals['bytes_billed'] for totals in step_totals.values())
+    cache_hits = sum(1 for ledger_entry in ledger_entries if ledger_entry['cache_hit'])
+
+    lines = [f"Query ledger: {len(ledger_entries)} jobs, {format_gib(total_bytes_billed)} billed, "
+             f"{cache_hits} cache hits",
+             "  By step (bytes billed):"]
+
+    for step_key, totals in sorted(step_totals.items(), key=lambda item: item[1]['bytes_billed'], reverse=True):
+        lines.append(f"    {format_gib(totals['bytes_billed'])} billed, {totals['seconds']:.1f}s, "
+                     f"{totals['slot_millis'] / 1000:.0f} slot-s, {totals['jobs']} jobs: {step_key}")
+
+    lines.append(f"  Top {top_n} jobs by bytes billed:")
+    lines.extend(format_entry(ledger_entry) for ledger_entry in sorted(
+        ledger_entries, key=lambda entry: entry['total_bytes_billed'] or 0, reverse=True)[:top_n])
+
+    lines.append(f"  Top {top_n} jobs by elapsed time:")
+    lines.extend(format_entry(ledger_entry) for ledger_entry in sorted(
+        ledger_entries, key=lambda entry: entry['elapsed_seconds'] or 0, reverse=True)[:top_n])
+
+    return "\n".join(lines)
+
+
+def log_query_ledger_summary(ledger_entries: Optional[list[dict[str, Any]]] = None, top_n: int = 10):
+    """
+    Log summary of ledger entries (see format_query_ledger_summary).
+
+    :param ledger_entries: ledger entries; defaults to None (entries recorded by this process)
+    :type ledger_entries: Optional[list[dict[str, Any]]]
+    :param top_n: number of jobs to list in each ranking; defaults to 10
+    :type top_n: int
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.query_ledger')
+
+    if ledger_entries is None:
+        with _ledger_lock:
+            ledger_entries = list(_ledger_entries)
+
+    if ledger_entries:
+        logger.info(format_query_ledger_summary(ledger_entries, top_n))
+
+
+# summarize this process's jobs when the script exits (does nothing unless entries were recorded)
+atexit.register(log_query_ledger_summary)
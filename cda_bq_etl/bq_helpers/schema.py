@@ -18,7 +18,7 @@
 import json
 import logging
 import sys
-from typing import Optional
+from typing import Any, Optional
 
 from google.cloud import bigquery
 from google.cloud.bigquery import SchemaField
@@ -28,7 +28,9 @@ from cda_bq_etl.custom_typing import Params, JSONList, SchemaFieldFormat, RowDic
 from cda_bq_etl.utils import (get_filename, get_scratch_fp, get_filepath)
 from cda_bq_etl.gcs_helpers import download_from_bucket, upload_to_bucket
 from cda_bq_etl.data_helpers import (recursively_detect_object_structures, get_column_list_tsv,
-                                     aggregate_column_data_types_tsv, resolve_type_conflicts, resolve_type_conflict)
+                                     aggregate_column_data_types_tsv, resolve_type_conflicts, resolve_type_conflict,
+                                     infer_column_types_tsv, sample_column_data_types_tsv,
+                                     detect_object_structures_from_jsonl)
 
 
 def create_and_upload_schema_for_tsv(params: Params,
@@ -37,7 +39,11 @@ def create_and_upload_schema_for_tsv(params: Params,
                                      skip_rows: int = 0,
                                      schema_fp: Optional[str] = None,
                                      delete_local: bool = True,
-                                     sample_interval: int = 1):
+                                     sample_interval: int = 1,
+                                     block_size: Optional[int] = None,
+                                     early_exit: bool = False,
+                                     sample_size: Optional[int] = None,
+                                     min_confidence: float = 0.95):
     """
     Create and upload schema for a file in tsv format.
 
@@ -55,6 +61,17 @@ def create_and_upload_schema_for_tsv(params: Params,
     :type delete_local: bool
     :param sample_interval: how many rows to skip between column type checks; defaults to 1
     :type sample_interval: int
+    :param block_size: if supplied, infer column types by classifying blocks of block_size rows at a time
+                       (see infer_column_types_tsv); defaults to None (value-by-value type checking)
+    :type block_size: Optional[int]
+    :param early_exit: if True, stop type checking columns once their type is settled; defaults to False
+    :type early_exit: bool
+    :param sample_size: if supplied, infer column types from a stratified random sample of sample_size rows, fully
+                        scanning only columns with a type conflict or low confidence (see sample_column_data_types_tsv);
+                        takes precedence over sample_interval and block_size; defaults to None
+    :type sample_size: Optional[int]
+    :param min_confidence: when sampling, columns with a lower confidence are fully scanned; defaults to 0.95
+    :type min_confidence: float
     """
     logger = logging.getLogger('base_script.cda_bq_etl.bq_helpers.schema')
 
@@ -66,10 +83,70 @@ def create_and_upload_schema_for_tsv(params: Params,
         logger.critical("Header row not excluded by skip_rows.")
         sys.exit(-1)
 
-    data_types_dict = aggregate_column_data_types_tsv(tsv_fp, column_headers, skip_rows, sample_interval)
+    if sample_size:
+        data_types_dict, _ = sample_column_data_types_tsv(tsv_fp, column_headers, skip_rows, sample_size, min_confidence)
+        data_type_dict = resolve_type_conflicts(data_types_dict)
+    elif block_size:
+        data_type_dict = infer_column_types_tsv(tsv_fp, column_headers, skip_rows, sample_interval, block_size,
+                                                early_exit=early_exit)
+    else:
+        data_types_dict = aggregate_column_data_types_tsv(tsv_fp, column_headers, skip_rows, sample_interval,
+                                                          early_exit=early_exit)
+        data_type_dict = resolve_type_conflicts(data_types_dict)
+
+    write_and_upload_schema(params, column_headers, data_type_dict, schema_fp, delete_local)
+
+
+def create_and_upload_schema_from_column_types(params: Params,
+                                               column_headers: list[str],
+                                               data_types_dict: dict[str, set[str]],
+                                               schema_fp: Optional[str] = None,
+                                               delete_local: bool = True) -> list[SchemaField]:
+    """
+    Create and upload schema using column data types aggregated elsewhere, e.g. by create_normalized_tsv_and_profile,
+    rather than by re-reading the data file.
 
+    :param params: params supplied in yaml config
+    :type params: Params
+    :param column_headers: list of column names, in file order
+    :type column_headers: list[str]
+    :param data_types_dict: dict of column keys, with value sets representing all data types found for that column
+    :type data_types_dict: dict[str, set[str]]
+    :param schema_fp: path to schema location on local vm; defaults to None
+    :type schema_fp: Optional[str]
+    :param delete_local: delete local file after uploading to cloud bucket; defaults to True
+    :type delete_local: bool
+    :return: list of SchemaField objects for BigQuery ingestion
+    :rtype: list[SchemaField]
+    """
     data_type_dict = resolve_type_conflicts(data_types_dict)
 
+    schema_obj = write_and_upload_schema(params, column_headers, data_type_dict, schema_fp, delete_local)
+
+    return generate_bq_schema_fields(schema_obj['fields'])
+
+
+def write_and_upload_schema(params: Params,
+                            column_headers: list[str],
+                            data_type_dict: dict[str, str],
+                            schema_fp: Optional[str] = None,
+                            delete_local: bool = True) -> SchemaFieldFormat:
+    """
+    Create schema object from resolved column data types, write it to a local json file and upload to cloud bucket.
+
+    :param params: params supplied in yaml config
+    :type params: Params
+    :param column_headers: list of column names, in file order
+    :type column_headers: list[str]
+    :param data_type_dict: dict of column keys and their resolved BigQuery data types
+    :type data_type_dict: dict[str, str]
+    :param schema_fp: path to schema location on local vm; defaults to None
+    :type schema_fp: Optional[str]
+    :param delete_local: delete local file after uploading to cloud bucket; defaults to True
+    :type delete_local: bool
+    :return: schema object, as written to file
+    :rtype: SchemaFieldFormat
+    """
     schema_obj = create_schema_object(column_headers, data_type_dict)
 
     if not schema_fp:
@@ -81,6 +158,8 @@ def create_and_upload_schema_for_tsv(params: Params,
 
     upload_to_bucket(params, schema_fp, delete_local=delete_local)
 
+    return schema_obj
+
 
 def create_and_upload_schema_for_json(params: Params,
                                       record_list: JSONList,
@@ -89,7 +168,9 @@ def create_and_upload_schema_for_json(params: Params,
                                       release: Optional[str] = None,
                                       schema_fp: Optional[str] = None,
                                       delete_local: bool = True,
-                                      reorder_nesting: bool = False):
+                                      reorder_nesting: bool = False,
+                                      early_exit: bool = False,
+                                      num_processes: int = 1):
     """
     Create a schema object by recursively detecting the object structure and data types, storing result,
     and converting that to a Schema dict for BQ ingestion.
@@ -111,10 +192,105 @@ def create_and_upload_schema_for_json(params: Params,
     :type delete_local: bool
     :param reorder_nesting: whether the data_types_dict should be reordered, defaults to False
     :type reorder_nesting: bool
+    :param early_exit: if True, skip type checking for fields once their type is settled; defaults to False
+    :type early_exit: bool
+    :param num_processes: if greater than 1, shard the records across a pool of num_processes worker processes and
+                          merge their partial structures; defaults to 1
+    :type num_processes: int
     """
 
-    data_types_dict = recursively_detect_object_structures(record_list)
+    data_types_dict = recursively_detect_object_structures(record_list, early_exit=early_exit,
+                                                           num_processes=num_processes)
+
+    create_and_upload_schema_from_object_structure(params,
+                                                   data_types_dict=data_types_dict,
+                                                   table_name=table_name,
+                                                   include_release=include_release,
+                                                   release=release,
+                                                   schema_fp=schema_fp,
+                                                   delete_local=delete_local,
+                                                   reorder_nesting=reorder_nesting)
+
+
+def create_and_upload_schema_for_jsonl(params: Params,
+                                       jsonl_fp: str,
+                                       table_name: str,
+                                       include_release: bool = False,
+                                       release: Optional[str] = None,
+                                       schema_fp: Optional[str] = None,
+                                       delete_local: bool = True,
+                                       reorder_nesting: bool = False,
+                                       early_exit: bool = False,
+                                       num_processes: int = 1):
+    """
+    Create a schema object by detecting the object structure and data types of a jsonl file's records, reading a
+    single record at a time, and converting that to a Schema dict for BQ ingestion.
 
+    :param params: params supplied in yaml config
+    :type params: Params
+    :param jsonl_fp: path to local jsonl data file, parsed to create schema
+    :type jsonl_fp: str
+    :param table_name: table for which the schema is being generated
+    :type table_name: str
+    :param include_release: if true, includes release in schema file name; defaults to False
+    :type include_release: bool
+    :param release: custom release value; defaults to None, in which case the value is derived from the yaml config
+    :type release: Optional[str]
+    :param schema_fp: path to schema location on local vm, defaults to None, in which case the value is derived from
+                      the yaml config
+    :type schema_fp: Optional[str]
+    :param delete_local: delete local file after uploading to cloud bucket
+    :type delete_local: bool
+    :param reorder_nesting: whether the data_types_dict should be reordered, defaults to False
+    :type reorder_nesting: bool
+    :param early_exit: if True, skip type checking for fields once their type is settled; defaults to False
+    :type early_exit: bool
+    :param num_processes: if greater than 1, shard the records across a pool of num_processes worker processes and
+                          merge their partial structures; defaults to 1
+    :type num_processes: int
+    """
+    data_types_dict = detect_object_structures_from_jsonl(jsonl_fp, early_exit=early_exit, num_processes=num_processes)
+
+    create_and_upload_schema_from_object_structure(params,
+                                                   data_types_dict=data_types_dict,
+                                                   table_name=table_name,
+                                                   include_release=include_release,
+                                                   release=release,
+                                                   schema_fp=schema_fp,
+                                                   delete_local=delete_local,
+                                                   reorder_nesting=reorder_nesting)
+
+
+def create_and_upload_schema_from_object_structure(params: Params,
+                                                   data_types_dict: dict[str, Any],
+                                                   table_name: str,
+                                                   include_release: bool = False,
+                                                   release: Optional[str] = None,
+                                                   schema_fp: Optional[str] = None,
+                                                   delete_local: bool = True,
+                                                   reorder_nesting: bool = False):
+    """
+    Convert a detected object structure (as returned by recursively_detect_object_structures, or accumulated using
+    update_object_structure and merge_object_structures) to a Schema dict for BQ ingestion, then store and upload it.
+
+    :param params: params supplied in yaml config
+    :type params: Params
+    :param data_types_dict: object structure and data types of the table's records
+    :type data_types_dict: dict[str, Any]
+    :param table_name: table for which the schema is being generated
+    :type table_name: str
+    :param include_release: if true, includes release in schema file name; defaults to False
+    :type include_release: bool
+    :param release: custom release value; defaults to None, in which case the value is derived from the yaml config
+    :type release: Optional[str]
+    :param schema_fp: path to schema location on local vm, defaults to None, in which case the value is derived from
+                      the yaml config
+    :type schema_fp: Optional[str]
+    :param delete_local: delete local file after uploading to cloud bucket
+    :type delete_local: bool
+    :param reorder_nesting: whether the data_types_dict should be reordered, defaults to False
+    :type reorder_nesting: bool
+    """
     if reorder_nesting:
         data_types_dict = reorder_data_types_dict(params, data_types_dict)
 
@@ -145,7 +321,8 @@ def retrieve_bq_schema_object(params: Params,
                               schema_filename: Optional[str] = None,
                               schema_dir: Optional[str] = None) -> list[SchemaField]:
     """
-    Retrieve schema file from GDC bucket and convert into list of SchemaField objects.
+    Retrieve schema file from GDC bucket and convert into list of SchemaField objects. If ENABLE_DOWNLOAD_CACHE is set,
+    schema files are retrieved via the local download cache, so unchanged files aren't downloaded again.
 
     :param params: params supplied in yaml config
     :type params: Params
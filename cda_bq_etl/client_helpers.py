@@ -0,0 +1,146 @@
+# Copyright 2023-2025, Institute for Systems Biology
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Shared, process-wide BigQuery and Cloud Storage clients."""
+
+import os
+import threading
+from typing import Any, Callable, Optional
+
+from google.cloud import bigquery, storage
+
+# registry of {(client type, process id, project, location): client}. Reusing clients avoids repeated credential
+# lookups, and keeps each client's HTTP connection pool warm. Keying by process id ensures that worker processes
+# (which may be forked from a process holding open connections) create their own clients.
+_client_registry: dict[tuple, Any] = dict()
+_client_registry_lock = threading.Lock()
+# set CDA_BQ_ETL_DISABLE_CLIENT_REGISTRY=1 (e.g. in tests) to create a new client on every call
+_client_registry_enabled = os.environ.get('CDA_BQ_ETL_DISABLE_CLIENT_REGISTRY', '').lower() not in ('1', 'true', 'yes')
+
+
+def get_bigquery_client(project: Optional[str] = None, location: Optional[str] = None) -> bigquery.Client:
+    """
+    Get a BigQuery client for project and location, reusing an existing client if one was previously created.
+
+    :param project: project used for jobs created by the client; defaults to None (project inferred from environment)
+    :type project: Optional[str]
+    :param location: default location for jobs created by the client; defaults to None
+    :type location: Optional[str]
+    :return: BigQuery Client object
+    :rtype: bigquery.Client
+    """
+    def create_client() -> bigquery.Client:
+        client_kwargs = dict()
+
+        if project is not None:
+            client_kwargs['project'] = project
+        if location is not None:
+            client_kwargs['location'] = location
+
+        return bigquery.Client(**client_kwargs)
+
+    return get_registered_client('bigquery', project, location, create_client)
+
+
+def get_storage_client(project: Optional[str] = None) -> storage.Client:
+    """
+    Get a Cloud Storage client for project, reusing an existing client if one was previously created.
+
+    :param project: project used by the client (may be an empty string, for buckets which don't require a project);
+        defaults to None (project inferred from environment)
+    :type project: Optional[str]
+    :return: Storage Client object
+    :rtype: storage.Client
+    """
+    def create_client() -> storage.Client:
+        # storage.Client treats project=None differently from an omitted project
+        if project is None:
+            return storage.Client()
+
+        return storage.Client(project=project)
+
+    return get_registered_client('storage', project, None, create_client)
+
+
+def get_bigquery_storage_client() -> Optional[Any]:
+    """
+    Get a BigQuery Storage Read API client, used to download large query results as parallel Arrow streams, reusing
+    an existing client if one was previously created. The Storage API is optional; requires the
+    google-cloud-bigquery-storage package.
+
+    :return: BigQueryReadClient object, or None if google-cloud-bigquery-storage isn't installed
+    :rtype: Optional[Any]
+    """
+    try:
+        from google.cloud import bigquery_storage
+    except ImportError:
+        return None
+
+    return get_registered_client('bigquery_storage', None, None, bigquery_storage.BigQueryReadClient)
+
+
+def get_registered_client(client_type: str, project: Any, location: Optional[str], create_client: Callable[[], Any]):
+    """
+    Retrieve client from registry, creating and registering it if it doesn't exist (or if registry is disabled,
+    create and return a new client).
+
+    :param client_type: client type, used as part of the registry key
+    :type client_type: str
+    :param project: client project, used as part of the registry key
+    :type project: Any
+    :param location: client location, used as part of the registry key
+    :type location: Optional[str]
+    :param create_client: function which creates a new client
+    :type create_client: Callable[[], Any]
+    :return: client object
+    """
+    if not _client_registry_enabled:
+        return create_client()
+
+    registry_key = (client_type, os.getpid(), project, location)
+
+    with _client_registry_lock:
+        if registry_key not in _client_registry:
+            _client_registry[registry_key] = create_client()
+
+        return _client_registry[registry_key]
+
+
+def set_client_registry_enabled(enabled: bool):
+    """
+    Enable or disable client reuse. When disabled, a new client is created for every call (the previous behavior),
+    and any registered clients are discarded.
+
+    :param enabled: if True, reuse clients; otherwise create a new client on every call
+    :type enabled: bool
+    """
+    global _client_registry_enabled
+
+    _client_registry_enabled = enabled
+
+    if not enabled:
+        clear_client_registry()
+
+
+def clear_client_registry():
+    """
+    Discard all registered clients, closing their HTTP connection pools.
+    """
+    with _client_registry_lock:
+        for client in _client_registry.values():
+            if hasattr(client, 'close'):
+                client.close()
+
+        _client_registry.clear()
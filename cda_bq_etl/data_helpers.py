@@ -15,9 +15,18 @@
 
 """Normalize and transform raw data."""
 
+import atexit
 import sys
 import math
-from typing import Any, Optional
+import itertools
+import functools
+import concurrent.futures
+import copy
+import locale
+import os
+import random
+import shutil
+from typing import Any, Optional, Iterable, TextIO
 
 import json
 import re
@@ -27,10 +36,26 @@ import logging
 import csv
 from distutils import util
 
-from cda_bq_etl.gcs_helpers import upload_to_bucket
+from cda_bq_etl.gcs_helpers import open_bucket_writer, upload_to_bucket
+from cda_bq_etl.profiling import enable_profiling, is_profiling_enabled, log_profile_report, profiled
 from cda_bq_etl.utils import sanitize_file_prefix, get_scratch_fp, make_string_bq_friendly
 from cda_bq_etl.custom_typing import ColumnTypes, RowDict, JSONList, Params
 
+# BigQuery's canonical date/time formats, compiled once rather than for every value passed to check_value_type
+# (see https://cloud.google.com/bigquery/docs/reference/standard-sql/data-types)
+DATE_RE_STR = r"[0-9]{4}-(0[1-9]|1[0-2]|[0-9])-(0[1-9]|[1-2][0-9]|[3][0-1]|[1-9])"
+TIME_RE_STR = r"([0-1][0-9]|[2][0-3]|[0-9]{1}):([0-5][0-9]|[0-9]{1}):([0-5][0-9]|[0-9]{1}])(\.[0-9]{1,6}|)"
+DATE_PATTERN = re.compile(DATE_RE_STR)
+TIME_PATTERN = re.compile(TIME_RE_STR)
+TIMESTAMP_PATTERN = re.compile(DATE_RE_STR + r'( |T)' + TIME_RE_STR + r"([ \-:A-Za-z0-9]*)")
+
+# opt-in, size-bounded value -> (normalized value, data type) cache; see enable_value_cache()
+_value_cache = None
+# value cache hits and misses counted before this process's last stats reset (or fork), and those merged from worker
+# processes; see collect_value_cache_stats()
+_value_cache_stats_baseline = {'hits': 0, 'misses': 0}
+_worker_value_cache_stats = {'hits': 0, 'misses': 0}
+
 
 def create_tsv_row(row_list: list[Any], null_marker: str = "None") -> str:
     """
@@ -56,30 +81,60 @@ def create_tsv_row(row_list: list[Any], null_marker: str = "None") -> str:
     return print_str
 
 
-def write_list_to_jsonl(jsonl_fp: str, json_obj_list: JSONList, mode: str = 'w'):
+def write_list_to_jsonl(jsonl_fp: str,
+                        json_obj_list: Iterable[RowDict],
+                        mode: str = 'w',
+                        data_types_dict: Optional[dict[str, Any]] = None):
     """
     Create a jsonl file for uploading data into BigQuery from a list<dict> obj.
 
     :param jsonl_fp: local VM jsonl filepath
     :type jsonl_fp: str
-    :param json_obj_list: list of dicts representing json objects
-    :type json_obj_list: JSONList
+    :param json_obj_list: list (or other iterable, such as a generator) of dicts representing json objects
+    :type json_obj_list: Iterable[RowDict]
     :param mode: 'a' if appending to a file that's being built iteratively;
                  'w' if file data is written in a single call to the function
                  (in which case any existing data is overwritten)
     :type mode: str
+    :param data_types_dict: optional object structure accumulator (see update_object_structure). If supplied, each
+                            record is normalized and its structure added to data_types_dict as it's written; the
+                            normalized records are written to file. Defaults to None (write records as-is)
+    :type data_types_dict: Optional[dict[str, Any]]
     """
     with open(jsonl_fp, mode) as file_obj:
-        for line in json_obj_list:
-            json.dump(obj=line, fp=file_obj, default=json_datetime_to_str_converter)
-            file_obj.write('\n')
+        write_jsonl_records(file_obj, json_obj_list, data_types_dict=data_types_dict)
+
+
+def write_jsonl_records(file_obj: TextIO,
+                        json_obj_list: Iterable[RowDict],
+                        data_types_dict: Optional[dict[str, Any]] = None):
+    """
+    Write records to an open text stream (a local file, or a bucket stream opened by open_bucket_writer) as jsonl.
+
+    :param file_obj: writable text stream
+    :type file_obj: TextIO
+    :param json_obj_list: list (or other iterable, such as a generator) of dicts representing json objects
+    :type json_obj_list: Iterable[RowDict]
+    :param data_types_dict: optional object structure accumulator (see write_list_to_jsonl); defaults to None
+    :type data_types_dict: Optional[dict[str, Any]]
+    """
+    for line in json_obj_list:
+        if data_types_dict is not None:
+            line = update_object_structure(data_types_dict, line)
 
+        json.dump(obj=line, fp=file_obj, default=json_datetime_to_str_converter)
+        file_obj.write('\n')
 
+
+@profiled(rows_from_arg='record_list')
 def write_list_to_jsonl_and_upload(params: Params,
                                    prefix: str,
-                                   record_list: JSONList,
+                                   record_list: Iterable[RowDict],
                                    release: Optional[str] = None,
-                                   local_filepath: Optional[str] = None):
+                                   local_filepath: Optional[str] = None,
+                                   data_types_dict: Optional[dict[str, Any]] = None,
+                                   compress: bool = False,
+                                   stream_to_bucket: bool = False):
     """
     Write joined_record_list to file name specified by prefix and uploads to scratch Google Cloud bucket.
 
@@ -87,12 +142,21 @@ def write_list_to_jsonl_and_upload(params: Params,
     :type params: Params
     :param prefix: string representing base file name (release string is appended to generate filename)
     :type prefix: str
-    :param record_list: list of record objects to insert into jsonl file
-    :type record_list: JSONList
+    :param record_list: list (or other iterable, such as a generator) of record objects to insert into jsonl file
+    :type record_list: Iterable[RowDict]
     :param release: Optional custom release, if different from what is provided in shared config yaml
     :type release: Optional[str]
     :param local_filepath: VM path where jsonl file is stored prior to upload
     :type local_filepath: Optional[str]
+    :param data_types_dict: optional object structure accumulator; if supplied, records are normalized and profiled
+                            while being written (see write_list_to_jsonl); defaults to None
+    :type data_types_dict: Optional[dict[str, Any]]
+    :param compress: if True, gzip-compress the file while uploading it (see upload_to_bucket); defaults to False
+    :type compress: bool
+    :param stream_to_bucket: if True, write records directly to the bucket (see open_bucket_writer), rather than
+                             writing a local file and then uploading it; also enabled by setting STREAM_TO_BUCKET in
+                             params. Blob name is the same either way. Defaults to False
+    :type stream_to_bucket: bool
     """
     if not local_filepath:
         if not release:
@@ -102,11 +166,18 @@ def write_list_to_jsonl_and_upload(params: Params,
 
         local_filepath = get_scratch_fp(params, jsonl_filename)
 
-    write_list_to_jsonl(local_filepath, record_list)
-    upload_to_bucket(params, local_filepath, delete_local=True)
+    if stream_to_bucket or ('STREAM_TO_BUCKET' in params and params['STREAM_TO_BUCKET']):
+        with open_bucket_writer(params, os.path.basename(local_filepath), compress=compress) as file_obj:
+            write_jsonl_records(file_obj, record_list, data_types_dict=data_types_dict)
+    else:
+        write_list_to_jsonl(local_filepath, record_list, data_types_dict=data_types_dict)
+        upload_to_bucket(params, local_filepath, delete_local=True, compress=compress)
 
 
-def recursively_detect_object_structures(nested_obj: JSONList | RowDict) -> JSONList | RowDict:
+@profiled(rows_from_arg='nested_obj')
+def recursively_detect_object_structures(nested_obj: JSONList | RowDict,
+                                         early_exit: bool = False,
+                                         num_processes: int = 1) -> JSONList | RowDict:
     """
     Traverse a dict or list of objects, analyzing the structure. Order not guaranteed (if anything, it'll be
     backwards)--Not for use with TSV data. Works for arbitrary nesting, even if object structure varies from record to
@@ -115,10 +186,20 @@ def recursively_detect_object_structures(nested_obj: JSONList | RowDict) -> JSON
 
     :param nested_obj: object to traverse
     :type nested_obj: JSONList | RowDict
+    :param early_exit: if True, skip type checking for fields whose type is already settled (see has_settled_type).
+        Values are still normalized in place; defaults to False
+    :type early_exit: bool
+    :param num_processes: if greater than 1 and nested_obj is a list, split the records into shards and analyze them
+        in a pool of num_processes worker processes (see detect_object_structures_parallel). Records are then replaced
+        by normalized copies rather than being normalized in place; defaults to 1
+    :type num_processes: int
     :return: data types dict--key is the field name, value is the set of BigQuery column data types returned
     when analyzing data using check_value_type ({<field_name>: {<data_type_set>}})
     :rtype: JSONList | RowDict
     """
+    if num_processes > 1 and isinstance(nested_obj, list):
+        return detect_object_structures_parallel(nested_obj, num_processes, early_exit)
+
     # stores the dict of {fields: value types}
     data_types_dict = dict()
 
@@ -148,6 +229,9 @@ def recursively_detect_object_structures(nested_obj: JSONList | RowDict) -> JSON
 
                 _obj[k] = normalize_value(_obj[k])
 
+                if early_exit and has_settled_type(k, _data_types_dict[k]):
+                    continue
+
                 val_type = check_value_type(_obj[k])
 
                 if val_type:
@@ -162,6 +246,242 @@ def recursively_detect_object_structures(nested_obj: JSONList | RowDict) -> JSON
     return data_types_dict
 
 
+def update_object_structure(data_types_dict: dict[str, Any], record: RowDict, early_exit: bool = False) -> RowDict:
+    """
+    Add a single record's structure and data types to data_types_dict (an accumulator in the format returned by
+    recursively_detect_object_structures). Unlike recursively_detect_object_structures, the record isn't modified;
+    a normalized copy is returned instead. This allows object structures to be detected while records stream past,
+    e.g. from a generator or jsonl file, without holding every record in memory.
+
+    :param data_types_dict: object structure accumulator, updated in place; start with an empty dict
+    :type data_types_dict: dict[str, Any]
+    :param record: record to analyze
+    :type record: RowDict
+    :param early_exit: if True, skip type checking for fields whose type is already settled (see has_settled_type).
+        Values are still normalized; defaults to False
+    :type early_exit: bool
+    :return: normalized copy of record
+    :rtype: RowDict
+    """
+    normalized_record = dict()
+
+    for k, v in record.items():
+        if isinstance(v, dict):
+            if k not in data_types_dict:
+                # this is a dict, so use dict to nest values
+                data_types_dict[k] = dict()
+
+            normalized_record[k] = update_object_structure(data_types_dict[k], v, early_exit)
+        elif isinstance(v, list) and len(v) > 0 and isinstance(v[0], dict):
+            if k not in data_types_dict:
+                # this is a dict, so use dict to nest values
+                data_types_dict[k] = dict()
+
+            normalized_record[k] = [update_object_structure(data_types_dict[k], _record, early_exit) for _record in v]
+        elif not isinstance(v, list) or len(v) > 0:
+            # create set of Data type values
+            if k not in data_types_dict:
+                data_types_dict[k] = set()
+
+            if early_exit and has_settled_type(k, data_types_dict[k]):
+                normalized_record[k] = normalize_value_cached(v)
+                continue
+
+            normalized_record[k], val_type = normalize_and_check_value(v)
+
+            if val_type:
+                data_types_dict[k].add(val_type)
+        else:
+            # empty list--not normalized or included in object structure
+            normalized_record[k] = v
+
+    return normalized_record
+
+
+def detect_object_structures_from_records(records: Iterable[RowDict], early_exit: bool = False) -> dict[str, Any]:
+    """
+    Detect the object structure and data types of a stream of records, one record at a time. Records aren't modified
+    or retained, so the records may be supplied by a generator.
+
+    :param records: iterable of records to analyze
+    :type records: Iterable[RowDict]
+    :param early_exit: if True, skip type checking for fields whose type is already settled; defaults to False
+    :type early_exit: bool
+    :return: data types dict--key is the field name, value is the set of BigQuery column data types returned
+    when analyzing data using check_value_type ({<field_name>: {<data_type_set>}})
+    :rtype: dict[str, Any]
+    """
+    data_types_dict = dict()
+
+    for record in records:
+        update_object_structure(data_types_dict, record, early_exit)
+
+    return data_types_dict
+
+
+def detect_object_structures_from_jsonl(jsonl_fp: str,
+                                        early_exit: bool = False,
+                                        num_processes: int = 1) -> dict[str, Any]:
+    """
+    Detect the object structure and data types of the records in a jsonl file, reading a single line at a time.
+
+    :param jsonl_fp: local VM jsonl filepath
+    :type jsonl_fp: str
+    :param early_exit: if True, skip type checking for fields whose type is already settled; defaults to False
+    :type early_exit: bool
+    :param num_processes: if greater than 1, split the file into newline-aligned byte ranges and analyze them in a pool
+        of num_processes worker processes, merging the partial structures (see merge_object_structures); defaults to 1
+    :type num_processes: int
+    :return: data types dict--key is the field name, value is the set of BigQuery column data types returned
+    when analyzing data using check_value_type ({<field_name>: {<data_type_set>}})
+    :rtype: dict[str, Any]
+    """
+    if num_processes > 1:
+        byte_ranges = get_newline_aligned_offsets(jsonl_fp, num_chunks=num_processes)
+        data_types_dict = dict()
+
+        # workers read their own byte range, so only the (small) partial structures are passed between processes
+        with concurrent.futures.ProcessPoolExecutor(max_workers=num_processes) as executor:
+            futures = [executor.submit(detect_object_structures_from_jsonl_range, jsonl_fp, start, end, early_exit)
+                       for start, end in byte_ranges]
+
+            for future in futures:
+                merge_object_structures(data_types_dict, future.result())
+
+        return data_types_dict
+
+    with open(jsonl_fp, mode='r') as jsonl_file:
+        records = (json.loads(line) for line in jsonl_file if line.strip())
+
+        return detect_object_structures_from_records(records, early_exit)
+
+
+def detect_object_structures_from_jsonl_range(jsonl_fp: str,
+                                              start: int,
+                                              end: int,
+                                              early_exit: bool = False) -> dict[str, Any]:
+    """
+    Detect the object structure and data types of the records within a newline-aligned byte range of a jsonl file.
+    Used as a detect_object_structures_from_jsonl worker.
+
+    :param jsonl_fp: local VM jsonl filepath
+    :type jsonl_fp: str
+    :param start: byte offset of the first line in the range
+    :type start: int
+    :param end: byte offset immediately following the last line in the range
+    :type end: int
+    :param early_exit: if True, skip type checking for fields whose type is already settled; defaults to False
+    :type early_exit: bool
+    :return: partial data types dict for the records in the byte range
+    :rtype: dict[str, Any]
+    """
+    def read_range_records():
+        position = start
+
+        with open(jsonl_fp, mode='rb') as jsonl_file:
+            jsonl_file.seek(start)
+
+            while position < end:
+                line = jsonl_file.readline()
+
+                if not line:
+                    break
+
+                position += len(line)
+
+                if line.strip():
+                    yield json.loads(line)
+
+    return detect_object_structures_from_records(read_range_records(), early_exit)
+
+
+def detect_object_structures_parallel(records: JSONList,
+                                      num_processes: int,
+                                      early_exit: bool = False) -> dict[str, Any]:
+    """
+    Detect the object structure and data types of a list of records using a pool of worker processes. The list is split
+    into num_processes contiguous shards; each worker returns a partial structure and its shard's normalized records.
+    Partial structures are merged (see merge_object_structures), so type conflicts are resolved exactly as they would
+    be for a serial traversal. As with recursively_detect_object_structures, the list is normalized: each record is
+    replaced by its normalized copy.
+    Each shard, its normalized records and its partial structure are pickled between processes, so this only pays off
+    when per-record work is large (e.g. wide or deeply nested records); for small records, the serial traversal is
+    usually faster. Records already written to a jsonl file are better analyzed with
+    detect_object_structures_from_jsonl, whose workers read their own byte ranges. See
+    scripts/bench/benchmark_json_schema_inference.py.
+
+    :param records: list of records to analyze
+    :type records: JSONList
+    :param num_processes: number of worker processes (and record shards)
+    :type num_processes: int
+    :param early_exit: if True, skip type checking for fields whose type is already settled; defaults to False
+    :type early_exit: bool
+    :return: data types dict--key is the field name, value is the set of BigQuery column data types returned
+    when analyzing data using check_value_type ({<field_name>: {<data_type_set>}})
+    :rtype: dict[str, Any]
+    """
+    shard_size = max(1, math.ceil(len(records) / num_processes))
+    shard_starts = range(0, len(records), shard_size)
+    data_types_dict = dict()
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_processes) as executor:
+        futures = [executor.submit(detect_record_shard_structure, records[shard_start:shard_start + shard_size],
+                                   early_exit)
+                   for shard_start in shard_starts]
+
+        for shard_start, future in zip(shard_starts, futures):
+            shard_data_types_dict, normalized_shard = future.result()
+            merge_object_structures(data_types_dict, shard_data_types_dict)
+            records[shard_start:shard_start + len(normalized_shard)] = normalized_shard
+
+    return data_types_dict
+
+
+def detect_record_shard_structure(records: JSONList, early_exit: bool = False) -> tuple[dict[str, Any], JSONList]:
+    """
+    Detect the object structure and data types of a shard of records. Used as a detect_object_structures_parallel
+    worker.
+
+    :param records: list of records to analyze
+    :type records: JSONList
+    :param early_exit: if True, skip type checking for fields whose type is already settled; defaults to False
+    :type early_exit: bool
+    :return: tuple containing the shard's partial data types dict and its normalized records
+    :rtype: tuple[dict[str, Any], JSONList]
+    """
+    data_types_dict = dict()
+    normalized_records = [update_object_structure(data_types_dict, record, early_exit) for record in records]
+
+    return data_types_dict, normalized_records
+
+
+def merge_object_structures(data_types_dict: dict[str, Any], other_data_types_dict: dict[str, Any]) -> dict[str, Any]:
+    """
+    Merge a partial object structure (e.g. one produced by another worker process) into data_types_dict. Nested
+    structures are merged recursively, and data type sets are combined.
+
+    :param data_types_dict: object structure accumulator, updated in place
+    :type data_types_dict: dict[str, Any]
+    :param other_data_types_dict: object structure to merge into data_types_dict; not modified
+    :type other_data_types_dict: dict[str, Any]
+    :return: data_types_dict, for convenience
+    :rtype: dict[str, Any]
+    """
+    for k, v in other_data_types_dict.items():
+        if k not in data_types_dict:
+            data_types_dict[k] = copy.deepcopy(v)
+        elif isinstance(data_types_dict[k], dict) and isinstance(v, dict):
+            merge_object_structures(data_types_dict[k], v)
+        elif isinstance(data_types_dict[k], set) and isinstance(v, set):
+            data_types_dict[k] |= v
+        else:
+            logger = logging.getLogger('base_script.cda_bq_etl.data_helpers')
+            logger.critical(f"Cannot merge object structures, field {k} is both nested and non-nested.")
+            sys.exit(-1)
+
+    return data_types_dict
+
+
 def get_column_list_tsv(header_list: Optional[list[str]] = None,
                         tsv_fp: Optional[str] = None,
                         header_row_index: Optional[int] = None) -> list[str]:
@@ -217,10 +537,13 @@ def get_column_list_tsv(header_list: Optional[list[str]] = None,
     return column_list
 
 
+@profiled()
 def aggregate_column_data_types_tsv(tsv_fp: str,
                                     column_headers: list[str],
                                     skip_rows: int,
-                                    sample_interval: int = 1) -> dict[str, set[str]]:
+                                    sample_interval: int = 1,
+                                    early_exit: bool = False,
+                                    columns: Optional[list[str]] = None) -> dict[str, set[str]]:
     """
     Open tsv file and aggregate data types for each column.
 
@@ -233,6 +556,12 @@ def aggregate_column_data_types_tsv(tsv_fp: str,
     :param sample_interval: sampling interval, used to skip rows in large datasets; defaults to checking every row
         ex.: sample_interval == 10 will sample every 10th row
     :type sample_interval: int
+    :param early_exit: if True, stop type checking a column once its type is settled (see has_settled_type), and stop
+        reading the file once every column is settled; defaults to False
+    :type early_exit: bool
+    :param columns: optional subset of column_headers to type check; other columns' sets are left empty; defaults to
+        None (check every column)
+    :type columns: Optional[list[str]]
     :return: dict of column keys, with value sets representing all data types found for that column
     :rtype: dict[str, set[str]]
     """
@@ -242,6 +571,13 @@ def aggregate_column_data_types_tsv(tsv_fp: str,
     for column in column_headers:
         data_types_dict[column] = set()
 
+    # indices of columns which still need type checking--with early_exit, settled columns are dropped from the scan
+    unsettled_indices = [idx for idx, column in enumerate(column_headers) if columns is None or column in columns]
+
+    if early_exit:
+        unsettled_indices = [idx for idx in unsettled_indices
+                             if not has_settled_type(column_headers[idx], data_types_dict[column_headers[idx]])]
+
     with open(tsv_fp, 'r') as tsv_file:
         for i in range(skip_rows):
             tsv_file.readline()
@@ -249,15 +585,18 @@ def aggregate_column_data_types_tsv(tsv_fp: str,
         count = 0
 
         while True:
+            if not unsettled_indices:
+                logger.info(f"All column types settled after {count} rows, skipping remainder of {tsv_fp}")
+                break
+
             row = tsv_file.readline()
 
             if not row:
                 break
 
             if count % sample_interval == 0:
-                row_list = row.split('\t')
-
-                if len(row_list) != len(column_headers):
+                if row.count('\t') + 1 != len(column_headers):
+                    row_list = row.split('\t')
                     logger.critical("Cannot aggregate column types, lengths don't match")
                     logger.critical(f"len row_list: {len(row_list)}")
                     logger.critical(f"row_list: {row_list}")
@@ -265,18 +604,271 @@ def aggregate_column_data_types_tsv(tsv_fp: str,
                     logger.critical(f"column_headers: {column_headers}")
                     sys.exit(-1)
 
-                for idx, value in enumerate(row_list):
-                    value = value.strip()
+                # only tokenize as far as the last column that still needs checking
+                row_list = row.split('\t', unsettled_indices[-1] + 1)
+                settled_indices = set()
+
+                for idx in unsettled_indices:
+                    value = row_list[idx].strip()
                     # convert non-standard null or boolean value to None, "True" or "False", otherwise return original
-                    value = normalize_value(value)
-                    value_type = check_value_type(value)
+                    value, value_type = normalize_and_check_value(value)
                     data_types_dict[column_headers[idx]].add(value_type)
 
+                    if early_exit and value_type == "STRING":
+                        settled_indices.add(idx)
+
+                if settled_indices:
+                    unsettled_indices = [idx for idx in unsettled_indices if idx not in settled_indices]
+
             count += 1
 
     return data_types_dict
 
 
+def sample_column_data_types_tsv(tsv_fp: str,
+                                 column_headers: list[str],
+                                 skip_rows: int,
+                                 sample_size: int = 10000,
+                                 min_confidence: float = 0.95,
+                                 seed: Optional[int] = None) -> tuple[dict[str, set[str]], dict[str, float]]:
+    """
+    Aggregate data types for each column using a stratified random sample of rows, rather than reading the whole file.
+    The data portion of the file is divided into sample_size equal byte ranges; a random offset is chosen within each
+    range, and the first complete row starting at or after that offset is type checked. Inference time therefore
+    depends on sample_size rather than on file size.
+
+    Per-column confidence is estimated using the "rule of three": if n non-null sampled values all fit the observed
+    type(s), the share of the column's values which don't is, with 95% confidence, below 3/n; confidence is 1 - 3/n.
+    Columns whose sampled type is already settled (see has_settled_type) have a confidence of 1. Columns with a type
+    conflict (more than one non-null type sampled) or with confidence below min_confidence are then fully scanned
+    (only those columns are type checked), and their confidence becomes 1.
+
+    :param tsv_fp: tsv dataset filepath used to analyze the data types
+    :type tsv_fp: str
+    :param column_headers: list of ordered column headers
+    :type column_headers: list[str]
+    :param skip_rows: number of (header) rows to skip before starting analysis
+    :type skip_rows: int
+    :param sample_size: number of rows to sample; defaults to 10000
+    :type sample_size: int
+    :param min_confidence: columns with a lower confidence are fully scanned; defaults to 0.95
+    :type min_confidence: float
+    :param seed: optional random seed, used to make sampling reproducible; defaults to None
+    :type seed: Optional[int]
+    :return: tuple containing dict of column keys, with value sets representing all data types found for that column,
+        and dict of column keys and their confidence values
+    :rtype: tuple[dict[str, set[str]], dict[str, float]]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.data_helpers')
+    rng = random.Random(seed)
+    # decode using the same default encoding used by aggregate_column_data_types_tsv's open() call
+    encoding = locale.getpreferredencoding(False)
+
+    data_types_dict = dict()
+    non_null_counts = dict()
+
+    for column in column_headers:
+        data_types_dict[column] = set()
+        non_null_counts[column] = 0
+
+    with open(tsv_fp, mode="rb") as tsv_file:
+        for i in range(skip_rows):
+            tsv_file.readline()
+
+        data_start = tsv_file.tell()
+        data_size = os.path.getsize(tsv_fp) - data_start
+        stratum_size = data_size / sample_size if sample_size > 0 else 0
+
+        sampled_offsets = set()
+
+        for stratum in range(sample_size if data_size > 0 else 0):
+            offset = data_start + int(stratum * stratum_size + rng.random() * stratum_size)
+
+            # discard the remainder of the line containing offset - 1, so that the sampled row is the first one
+            # starting at or after offset
+            if offset > data_start:
+                tsv_file.seek(offset - 1)
+                tsv_file.readline()
+            else:
+                tsv_file.seek(data_start)
+
+            row_offset = tsv_file.tell()
+
+            # strata smaller than a row often land in the same row, don't check it twice
+            if row_offset in sampled_offsets:
+                continue
+
+            row = tsv_file.readline().decode(encoding)
+
+            if not row:
+                continue
+
+            sampled_offsets.add(row_offset)
+
+            row_list = row.split('\t')
+
+            if len(row_list) != len(column_headers):
+                logger.critical("Cannot aggregate column types, lengths don't match")
+                logger.critical(f"len row_list: {len(row_list)}")
+                logger.critical(f"row_list: {row_list}")
+                logger.critical(f"len column_headers: {len(column_headers)}")
+                logger.critical(f"column_headers: {column_headers}")
+                sys.exit(-1)
+
+            for column, value in zip(column_headers, row_list):
+                value, value_type = normalize_and_check_value(value.strip())
+                data_types_dict[column].add(value_type)
+
+                if value_type is not None:
+                    non_null_counts[column] += 1
+
+    confidence_dict = dict()
+    rescan_columns = list()
+
+    for column in column_headers:
+        types_set = data_types_dict[column]
+
+        if has_settled_type(column, types_set):
+            confidence_dict[column] = 1.0
+            continue
+
+        non_null_count = non_null_counts[column]
+        confidence_dict[column] = max(0.0, 1 - 3 / non_null_count) if non_null_count else 0.0
+
+        if len(types_set - {None}) > 1 or confidence_dict[column] < min_confidence:
+            rescan_columns.append(column)
+
+    logger.info(f"Sampled {len(sampled_offsets)} rows from {tsv_fp}; "
+                f"{len(rescan_columns)} of {len(column_headers)} columns require a full scan")
+
+    if rescan_columns:
+        scanned_types_dict = aggregate_column_data_types_tsv(tsv_fp, column_headers, skip_rows,
+                                                             early_exit=True, columns=rescan_columns)
+
+        for column in rescan_columns:
+            # the full scan saw every sampled row, unless early exit stopped it, so keep both sets of types
+            data_types_dict[column] |= scanned_types_dict[column]
+            confidence_dict[column] = 1.0
+
+    return data_types_dict, confidence_dict
+
+
+def classify_column_block(values: Iterable[Any]) -> set[str | None]:
+    """
+    Classify a block of values from a single column, returning the set of BigQuery data types found. Each distinct
+    value is normalized and type-checked once, so repetitive (categorical, boolean, null-heavy) columns are cheap.
+
+    :param values: block of raw column values
+    :type values: Iterable[Any]
+    :return: set of BigQuery data types found in the block (includes None if block contains null values)
+    :rtype: set[str | None]
+    """
+    types_set = set()
+
+    for value in set(values):
+        if isinstance(value, str):
+            value = value.strip()
+
+        types_set.add(normalize_and_check_value(value)[1])
+
+    return types_set
+
+
+def infer_column_types_tsv(tsv_fp: str,
+                           column_headers: list[str],
+                           skip_rows: int,
+                           sample_interval: int = 1,
+                           block_size: int = 100000,
+                           early_exit: bool = False) -> dict[str, str]:
+    """
+    Infer BigQuery column data types for a tsv file, classifying a block of rows per column at a time rather than
+    value-by-value. Produces the same result as running aggregate_column_data_types_tsv followed by
+    resolve_type_conflicts.
+
+    :param tsv_fp: tsv dataset filepath used to analyze the data types
+    :type tsv_fp: str
+    :param column_headers: list of ordered column headers
+    :type column_headers: list[str]
+    :param skip_rows: number of (header) rows to skip before starting analysis
+    :type skip_rows: int
+    :param sample_interval: sampling interval, used to skip rows in large datasets; defaults to checking every row
+        ex.: sample_interval == 10 will sample every 10th row
+    :type sample_interval: int
+    :param block_size: number of rows read into memory and classified per block; defaults to 100000
+    :type block_size: int
+    :param early_exit: if True, skip column blocks once the column's type is settled (see has_settled_type), and stop
+        reading the file once every column is settled; defaults to False
+    :type early_exit: bool
+    :return: dict containing the column name and its BigQuery data type
+    :rtype: dict[str, str]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.data_helpers')
+    data_types_dict = dict()
+
+    for column in column_headers:
+        data_types_dict[column] = set()
+
+    with open(tsv_fp, 'r') as tsv_file:
+        for i in range(skip_rows):
+            tsv_file.readline()
+
+        row_index = 0
+
+        while True:
+            if early_exit and all(has_settled_type(column, types) for column, types in data_types_dict.items()):
+                logger.info(f"All column types settled after {row_index} rows, skipping remainder of {tsv_fp}")
+                break
+
+            row_block = list(itertools.islice(tsv_file, block_size))
+
+            if not row_block:
+                break
+
+            # drop rows that fall outside the sample interval, keeping the interval consistent across blocks
+            first_sampled_idx = (-row_index) % sample_interval
+            row_index += len(row_block)
+            row_block = row_block[first_sampled_idx::sample_interval]
+
+            row_lists = [row.split('\t') for row in row_block]
+
+            for row_list in row_lists:
+                if len(row_list) != len(column_headers):
+                    logger.critical("Cannot infer column types, lengths don't match")
+                    logger.critical(f"len row_list: {len(row_list)}")
+                    logger.critical(f"row_list: {row_list}")
+                    logger.critical(f"len column_headers: {len(column_headers)}")
+                    logger.critical(f"column_headers: {column_headers}")
+                    sys.exit(-1)
+
+            # transpose the block of rows into column blocks
+            for column, column_block in zip(column_headers, zip(*row_lists)):
+                if early_exit and has_settled_type(column, data_types_dict[column]):
+                    continue
+
+                data_types_dict[column] |= classify_column_block(column_block)
+
+    return resolve_type_conflicts(data_types_dict)
+
+
+def has_settled_type(field: str, types_set: set[str] | ColumnTypes) -> bool:
+    """
+    Determine whether a column's type can no longer change as more values are scanned. Types only move up the
+    lattice (NULL -> BOOL -> INT64 -> FLOAT64 -> DATE/TIME/TIMESTAMP -> STRING); once a column resolves to STRING,
+    either because a STRING value was found or because the "_id" rule in resolve_type_conflict applies, further values
+    can't alter its type.
+    Note: for json data, this means a later ARRAY or RECORD value in a settled column won't trigger
+    resolve_type_conflict's invalid combination error.
+
+    :param field: field name
+    :type field: str
+    :param types_set: set of BigQuery data types found so far
+    :type types_set: set[str] | ColumnTypes
+    :return: True if column type is settled, False otherwise
+    :rtype: bool
+    """
+    return "_id" in field or "STRING" in types_set
+
+
 def resolve_type_conflicts(types_dict: dict[str, set[Any]]) -> dict[str, str]:
     """
     Iteratively resolve data type conflicts for non-nested type dicts (e.g. if there is more than one data type found,
@@ -486,7 +1078,150 @@ def normalize_value(value: Any, is_tsv: bool = False) -> Any:
         return value
 
 
-def create_normalized_tsv(raw_tsv_fp: str, normalized_tsv_fp: str):
+def normalize_and_check_value(value: Any) -> tuple[Any, str | None]:
+    """
+    Normalize value (see normalize_value) and check its BigQuery data type (see check_value_type). If the value cache
+    is enabled (see enable_value_cache), hashable values are served from the cache after their first occurrence.
+
+    :param value: value to normalize and type check
+    :type value: Any
+    :return: tuple containing the normalized value and its BigQuery data type
+    :rtype: tuple[Any, str | None]
+    """
+    if _value_cache is None or isinstance(value, (list, dict, set)):
+        return _normalize_and_check_value(value)
+
+    return _value_cache(value)
+
+
+def normalize_value_cached(value: Any, is_tsv: bool = False) -> Any:
+    """
+    Normalize value (see normalize_value), using the value cache if it's enabled (see enable_value_cache).
+
+    :param value: value to convert
+    :type value: Any
+    :param is_tsv: If True, null value is converted to a TSV-safe form (empty string); otherwise converted to None
+    :type is_tsv: bool
+    :return: normalized (or original) value
+    :rtype: Any
+    """
+    if _value_cache is None:
+        return normalize_value(value, is_tsv=is_tsv)
+
+    normalized_value = normalize_and_check_value(value)[0]
+
+    if is_tsv and normalized_value is None and value is not None:
+        # can't use None in the TSV files, it's interpreted as a string
+        return ''
+
+    return normalized_value
+
+
+def _normalize_and_check_value(value: Any) -> tuple[Any, str | None]:
+    """Normalize value and check its BigQuery data type, without using the value cache."""
+    normalized_value = normalize_value(value)
+    return normalized_value, check_value_type(normalized_value)
+
+
+def enable_value_cache(max_size: int = 2 ** 18):
+    """
+    Enable the size-bounded (least recently used) value cache used by normalize_and_check_value and
+    normalize_value_cached, which is shared by create_normalized_tsv, aggregate_column_data_types_tsv,
+    infer_column_types_tsv and normalize_flat_json_values.
+    Categorical columns repeat a small set of values many times, so most lookups skip normalization and type checking.
+    Any existing cache (and its statistics) is discarded.
+
+    :param max_size: maximum number of distinct values held in the cache; defaults to 2^18
+    :type max_size: int
+    """
+    global _value_cache
+    # typed, so that 1, 1.0 and True are cached separately
+    _value_cache = functools.lru_cache(maxsize=max_size, typed=True)(_normalize_and_check_value)
+    _reset_value_cache_stats()
+
+
+def disable_value_cache():
+    """Disable and discard the value cache."""
+    global _value_cache
+    _value_cache = None
+
+
+def _reset_value_cache_stats():
+    """Start counting value cache hits and misses from zero, without discarding the cached values."""
+    cache_info = _value_cache.cache_info() if _value_cache is not None else None
+
+    _value_cache_stats_baseline['hits'] = cache_info.hits if cache_info else 0
+    _value_cache_stats_baseline['misses'] = cache_info.misses if cache_info else 0
+    _worker_value_cache_stats['hits'] = 0
+    _worker_value_cache_stats['misses'] = 0
+
+
+# forked worker processes inherit the parent's cache and its counters; count only the worker's own lookups, so that
+# merge_value_cache_stats doesn't count the parent's lookups twice
+os.register_at_fork(after_in_child=_reset_value_cache_stats)
+
+
+def collect_value_cache_stats(reset: bool = False) -> dict[str, int]:
+    """
+    Return the number of value cache hits and misses counted by this process, including those merged from worker
+    processes (see merge_value_cache_stats). Each process has its own copy of the value cache, so worker processes
+    return these stats to their parent process.
+
+    :param reset: if True, start counting from zero after collecting the stats; defaults to False
+    :type reset: bool
+    :return: dict containing hits and misses
+    :rtype: dict[str, int]
+    """
+    cache_info = _value_cache.cache_info() if _value_cache is not None else None
+
+    value_cache_stats = {
+        'hits': _worker_value_cache_stats['hits'],
+        'misses': _worker_value_cache_stats['misses']
+    }
+
+    if cache_info:
+        value_cache_stats['hits'] += cache_info.hits - _value_cache_stats_baseline['hits']
+        value_cache_stats['misses'] += cache_info.misses - _value_cache_stats_baseline['misses']
+
+    if reset:
+        _reset_value_cache_stats()
+
+    return value_cache_stats
+
+
+def merge_value_cache_stats(value_cache_stats: Optional[dict[str, int]]):
+    """
+    Add the value cache hits and misses returned by a worker process (see collect_value_cache_stats) to this process's
+    stats.
+
+    :param value_cache_stats: dict containing hits and misses; ignored if None
+    :type value_cache_stats: Optional[dict[str, int]]
+    """
+    if not value_cache_stats:
+        return
+
+    _worker_value_cache_stats['hits'] += value_cache_stats['hits']
+    _worker_value_cache_stats['misses'] += value_cache_stats['misses']
+
+
+def log_value_cache_stats():
+    """Log value cache hit rate statistics (including worker processes' lookups), if the value cache is enabled."""
+    if _value_cache is None:
+        return
+
+    logger = logging.getLogger('base_script.cda_bq_etl.data_helpers')
+    cache_info = _value_cache.cache_info()
+    value_cache_stats = collect_value_cache_stats()
+    lookups = value_cache_stats['hits'] + value_cache_stats['misses']
+    hit_rate = value_cache_stats['hits'] / lookups if lookups else 0.0
+
+    logger.info(f"Value cache: {lookups} lookups, {value_cache_stats['hits']} hits, "
+                f"{value_cache_stats['misses']} misses (hit rate {hit_rate:.1%}); "
+                f"{cache_info.currsize} of {cache_info.maxsize} entries used (in this process)")
+
+
+@profiled(rows_from_result=lambda row_count: row_count)
+def create_normalized_tsv(raw_tsv_fp: str, normalized_tsv_fp: str, num_processes: int = 1) -> int:
     """
     Opens a raw tsv file, normalizes its data, then writes to new tsv file.
 
@@ -494,31 +1229,86 @@ def create_normalized_tsv(raw_tsv_fp: str, normalized_tsv_fp: str):
     :type raw_tsv_fp: str
     :param normalized_tsv_fp: destination file for normalized data
     :type normalized_tsv_fp: str
+    :param num_processes: if greater than 1, split the file into newline-aligned chunks and normalize them in a pool of
+        num_processes worker processes; defaults to 1 (normalize on a single core)
+    :type num_processes: int
+    :return: number of rows written to normalized file, including the header row
+    :rtype: int
+    """
+    normalized_row_count, _, _ = normalize_tsv_file(raw_tsv_fp, normalized_tsv_fp, num_processes)
+
+    return normalized_row_count
+
+
+@profiled()
+def create_normalized_tsv_and_profile(raw_tsv_fp: str,
+                                      normalized_tsv_fp: str,
+                                      num_processes: int = 1) -> tuple[list[str], dict[str, set[str]]]:
+    """
+    Opens a raw tsv file, normalizes its data, then writes to new tsv file. Aggregates the data types found in each
+    column during the same pass, so the normalized file doesn't need to be re-read in order to generate a schema.
+
+    :param raw_tsv_fp: path to non-normalized data file
+    :type raw_tsv_fp: str
+    :param normalized_tsv_fp: destination file for normalized data
+    :type normalized_tsv_fp: str
+    :param num_processes: if greater than 1, split the file into newline-aligned chunks and normalize them in a pool of
+        num_processes worker processes; defaults to 1 (normalize on a single core)
+    :type num_processes: int
+    :return: tuple containing list of columns with BQ-compatible names (as returned by get_column_list_tsv) and dict of
+        column keys, with value sets representing all data types found for that column (as returned by
+        aggregate_column_data_types_tsv)
+    :rtype: tuple[list[str], dict[str, set[str]]]
     """
-    def normalize_header_row(_header_row) -> list[str]:
-        """Normalize header row (adds a suffix if header row value is a duplicate)."""
-        new_header_row = list()
+    _, header_row, types_list = normalize_tsv_file(raw_tsv_fp, normalized_tsv_fp, num_processes, profile_types=True)
+
+    column_headers = get_column_list_tsv(header_list=header_row)
 
-        for _value in _header_row:
-            _value = _value.lower()
-            test_value = _value
-            suffix_value = 1
+    if len(types_list) != len(column_headers):
+        logger = logging.getLogger('base_script.cda_bq_etl.data_helpers')
+        logger.critical(f"Cannot aggregate column types for {raw_tsv_fp}, row and header lengths don't match")
+        sys.exit(-1)
 
-            # if column header is a duplicate, append numeric suffix
-            # (while loop checks to see if that suffix has already been used)
-            while test_value in new_header_row:
-                test_value = f"{_value}_{str(suffix_value)}"
-                suffix_value += 1
+    data_types_dict = dict()
 
-            if _value != test_value:
-                logger.warning(f"Changing header value {_value} to {test_value} (header value is a duplicate).")
+    for column, types_set in zip(column_headers, types_list):
+        data_types_dict[column] = types_set
 
-            new_header_row.append(test_value)
+    return column_headers, data_types_dict
 
-        return new_header_row
 
+def normalize_tsv_file(raw_tsv_fp: str,
+                       normalized_tsv_fp: str,
+                       num_processes: int = 1,
+                       profile_types: bool = False) -> tuple[int, list[str], list[set[str]] | None]:
+    """
+    Normalize a raw tsv file, optionally aggregating each column's data types in the same pass.
+    Shared implementation for create_normalized_tsv and create_normalized_tsv_and_profile.
+
+    :param raw_tsv_fp: path to non-normalized data file
+    :type raw_tsv_fp: str
+    :param normalized_tsv_fp: destination file for normalized data
+    :type normalized_tsv_fp: str
+    :param num_processes: number of worker processes used for normalization; defaults to 1
+    :type num_processes: int
+    :param profile_types: if True, aggregate the data types found in each column; defaults to False
+    :type profile_types: bool
+    :return: tuple containing the number of rows written (including header row), the normalized header row and, if
+        profile_types, a list of data type sets ordered by column index (otherwise None)
+    :rtype: tuple[int, list[str], list[set[str]] | None]
+    """
     logger = logging.getLogger('base_script.cda_bq_etl.data_helpers')
 
+    if num_processes > 1:
+        parallel_result = create_normalized_tsv_parallel(raw_tsv_fp, normalized_tsv_fp, num_processes, profile_types)
+
+        if parallel_result is not None:
+            return parallel_result
+
+        logger.warning(f"Quoted field(s) in {raw_tsv_fp} span multiple lines, normalizing on a single core instead.")
+
+    types_list = None
+
     with open(normalized_tsv_fp, mode="w", newline="") as normalized_tsv_file:
         tsv_writer = csv.writer(normalized_tsv_file, delimiter="\t")
 
@@ -526,21 +1316,19 @@ def create_normalized_tsv(raw_tsv_fp: str, normalized_tsv_fp: str):
             tsv_reader = csv.reader(tsv_file, delimiter="\t")
 
             raw_row_count = 0
+            header_row = list()
 
             for row in tsv_reader:
-                normalized_record = list()
-
                 if raw_row_count == 0:
                     header_row = normalize_header_row(row)
                     tsv_writer.writerow(header_row)
                     raw_row_count += 1
-                    continue
 
-                for value in row:
-                    new_value = normalize_value(value, is_tsv=True)
-                    normalized_record.append(new_value)
+                    if profile_types:
+                        types_list = [set() for _ in header_row]
+                    continue
 
-                tsv_writer.writerow(normalized_record)
+                tsv_writer.writerow(normalize_tsv_row(row, types_list))
                 raw_row_count += 1
                 if raw_row_count % 500000 == 0:
                     logger.info(f"Normalized {raw_row_count} rows.")
@@ -556,6 +1344,248 @@ def create_normalized_tsv(raw_tsv_fp: str, normalized_tsv_fp: str):
         logger.critical(f"Row count changed. Original: {raw_row_count}; Normalized: {normalized_row_count}")
         sys.exit(-1)
 
+    return normalized_row_count, header_row, types_list
+
+
+def normalize_tsv_row(row: list[str], types_list: Optional[list[set[str]]] = None) -> list[Any]:
+    """
+    Normalize a tsv data row, converting null values to the TSV-safe form (empty string).
+
+    :param row: list of raw row values
+    :type row: list[str]
+    :param types_list: optional list of data type sets, ordered by column index; if supplied, the data type of each
+        normalized value is added to its column's set
+    :type types_list: Optional[list[set[str]]]
+    :return: list of normalized row values
+    :rtype: list[Any]
+    """
+    if types_list is None:
+        return [normalize_value_cached(value, is_tsv=True) for value in row]
+
+    if len(row) != len(types_list):
+        logger = logging.getLogger('base_script.cda_bq_etl.data_helpers')
+        logger.critical("Cannot aggregate column types, lengths don't match")
+        logger.critical(f"len row: {len(row)}")
+        logger.critical(f"row: {row}")
+        logger.critical(f"len header row: {len(types_list)}")
+        sys.exit(-1)
+
+    normalized_record = list()
+
+    for value, types_set in zip(row, types_list):
+        new_value, value_type = normalize_and_check_value(value)
+        types_set.add(value_type)
+        # can't use None in the TSV files, it's interpreted as a string
+        normalized_record.append('' if new_value is None else new_value)
+
+    return normalized_record
+
+
+def create_normalized_tsv_parallel(raw_tsv_fp: str,
+                                   normalized_tsv_fp: str,
+                                   num_processes: int,
+                                   profile_types: bool = False) -> tuple[int, list[str], list[set[str]] | None] | None:
+    """
+    Normalize a raw tsv file using a pool of worker processes. The file is split at newline-aligned byte offsets,
+    each chunk is normalized into its own part file, and the part files are concatenated in order behind the
+    normalized header row. Row counts (and, optionally, column data types) are returned by the workers, so the output
+    isn't re-read.
+    Quoted fields containing newlines can't be safely split; if any are found, the part files are discarded and None is
+    returned, so that the caller can fall back to single-process normalization.
+
+    :param raw_tsv_fp: path to non-normalized data file
+    :type raw_tsv_fp: str
+    :param normalized_tsv_fp: destination file for normalized data
+    :type normalized_tsv_fp: str
+    :param num_processes: number of worker processes (and file chunks)
+    :type num_processes: int
+    :param profile_types: if True, aggregate the data types found in each column; defaults to False
+    :type profile_types: bool
+    :return: tuple containing the number of rows written (including header row), the normalized header row and, if
+        profile_types, a list of data type sets ordered by column index (otherwise None); None if file can't be split
+        safely
+    :rtype: tuple[int, list[str], list[set[str]] | None] | None
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.data_helpers')
+
+    with open(raw_tsv_fp, mode="r", newline="") as tsv_file:
+        header_row = normalize_header_row(next(csv.reader(tsv_file, delimiter="\t")))
+
+    chunk_offsets = get_newline_aligned_offsets(raw_tsv_fp, num_chunks=num_processes, skip_rows=1)
+    part_fps = [f"{normalized_tsv_fp}.part{idx}" for idx in range(len(chunk_offsets))]
+    column_count = len(header_row) if profile_types else None
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_processes) as executor:
+        futures = [executor.submit(normalize_tsv_chunk, raw_tsv_fp, start, end, part_fp, column_count)
+                   for (start, end), part_fp in zip(chunk_offsets, part_fps)]
+        chunk_results = [future.result() for future in futures]
+
+    for _, _, _, chunk_value_cache_stats in chunk_results:
+        merge_value_cache_stats(chunk_value_cache_stats)
+
+    if any(line_count != row_count for line_count, row_count, _, _ in chunk_results):
+        for part_fp in part_fps:
+            os.remove(part_fp)
+        return None
+
+    with open(normalized_tsv_fp, mode="w", newline="") as normalized_tsv_file:
+        csv.writer(normalized_tsv_file, delimiter="\t").writerow(header_row)
+
+    with open(normalized_tsv_fp, mode="ab") as normalized_tsv_file:
+        for part_fp in part_fps:
+            with open(part_fp, mode="rb") as part_file:
+                shutil.copyfileobj(part_file, normalized_tsv_file)
+            os.remove(part_fp)
+
+    normalized_row_count = 1 + sum(row_count for _, row_count, _, _ in chunk_results)
+
+    types_list = None
+
+    if profile_types:
+        # merge each chunk's per-column type sets
+        types_list = [set() for _ in header_row]
+
+        for _, _, chunk_types_list, _ in chunk_results:
+            for types_set, chunk_types_set in zip(types_list, chunk_types_list):
+                types_set |= chunk_types_set
+
+    logger.info(f"Normalized {normalized_row_count} rows ({len(part_fps)} chunks, {num_processes} processes).")
+
+    return normalized_row_count, header_row, types_list
+
+
+def get_newline_aligned_offsets(file_path: str, num_chunks: int, skip_rows: int = 0) -> list[tuple[int, int]]:
+    """
+    Split a file into (roughly) equal byte ranges, each of which begins at the start of a line.
+
+    :param file_path: path to file
+    :type file_path: str
+    :param num_chunks: number of byte ranges to create (fewer are returned for very small files)
+    :type num_chunks: int
+    :param skip_rows: number of (header) lines to exclude from the first byte range; defaults to 0
+    :type skip_rows: int
+    :return: list of (start, end) byte offset tuples
+    :rtype: list[tuple[int, int]]
+    """
+    file_size = os.path.getsize(file_path)
+
+    with open(file_path, mode="rb") as file_obj:
+        for i in range(skip_rows):
+            file_obj.readline()
+
+        data_start = file_obj.tell()
+        chunk_size = max(1, (file_size - data_start) // num_chunks)
+        boundaries = [data_start]
+
+        for idx in range(1, num_chunks):
+            offset = data_start + idx * chunk_size
+
+            if offset <= boundaries[-1]:
+                continue
+
+            file_obj.seek(offset - 1)
+            # read to the end of the line containing offset - 1, so that a boundary never splits a line
+            file_obj.readline()
+            boundary = file_obj.tell()
+
+            if boundary >= file_size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+
+    boundaries.append(file_size)
+
+    return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+
+def normalize_tsv_chunk(raw_tsv_fp: str,
+                        start: int,
+                        end: int,
+                        part_fp: str,
+                        column_count: Optional[int] = None) -> tuple[int, int, list[set[str]] | None, dict[str, int]]:
+    """
+    Normalize the rows found within a newline-aligned byte range of a raw tsv file, writing them to part_fp. Used as a
+    create_normalized_tsv_parallel worker.
+
+    :param raw_tsv_fp: path to non-normalized data file
+    :type raw_tsv_fp: str
+    :param start: byte offset of the first line in the chunk
+    :type start: int
+    :param end: byte offset immediately following the last line in the chunk
+    :type end: int
+    :param part_fp: destination file for normalized chunk data
+    :type part_fp: str
+    :param column_count: if supplied, aggregate the data types found in each of the file's column_count columns
+    :type column_count: Optional[int]
+    :return: tuple containing the number of lines read, the number of rows written, a list of data type sets ordered
+        by column index if column_count is supplied (otherwise None), and the worker's value cache stats (see
+        collect_value_cache_stats)
+    :rtype: tuple[int, int, list[set[str]] | None, dict[str, int]]
+    """
+    # decode using the same default encoding used by create_normalized_tsv's open() calls
+    encoding = locale.getpreferredencoding(False)
+    line_count = 0
+
+    def read_chunk_lines():
+        nonlocal line_count
+        position = start
+
+        with open(raw_tsv_fp, mode="rb") as raw_file:
+            raw_file.seek(start)
+
+            while position < end:
+                line = raw_file.readline()
+
+                if not line:
+                    break
+
+                position += len(line)
+                line_count += 1
+                yield line.decode(encoding)
+
+    types_list = [set() for _ in range(column_count)] if column_count is not None else None
+    row_count = 0
+
+    with open(part_fp, mode="w", newline="") as part_file:
+        tsv_writer = csv.writer(part_file, delimiter="\t")
+
+        for row in csv.reader(read_chunk_lines(), delimiter="\t"):
+            tsv_writer.writerow(normalize_tsv_row(row, types_list))
+            row_count += 1
+
+    return line_count, row_count, types_list, collect_value_cache_stats(reset=True)
+
+
+def normalize_header_row(header_row: list[str]) -> list[str]:
+    """
+    Normalize tsv header row (lowercases column names; adds a suffix if header row value is a duplicate).
+
+    :param header_row: list of raw column names
+    :type header_row: list[str]
+    :return: list of normalized column names
+    :rtype: list[str]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.data_helpers')
+    new_header_row = list()
+
+    for value in header_row:
+        value = value.lower()
+        test_value = value
+        suffix_value = 1
+
+        # if column header is a duplicate, append numeric suffix
+        # (while loop checks to see if that suffix has already been used)
+        while test_value in new_header_row:
+            test_value = f"{value}_{str(suffix_value)}"
+            suffix_value += 1
+
+        if value != test_value:
+            logger.warning(f"Changing header value {value} to {test_value} (header value is a duplicate).")
+
+        new_header_row.append(test_value)
+
+    return new_header_row
+
 
 def normalize_flat_json_values(records: JSONList) -> JSONList:
     """
@@ -571,7 +1601,7 @@ def normalize_flat_json_values(records: JSONList) -> JSONList:
     for record in records:
         normalized_record = dict()
         for key in record.keys():
-            value = normalize_value(record[key])
+            value = normalize_value_cached(record[key])
             normalized_record[key] = value
         normalized_json_list.append(normalized_record)
 
@@ -677,21 +1707,15 @@ def check_value_type(value: Any) -> str | None:
 
     if value.count("-") >= 2 or value.count(":") == 2:
         # Check for BigQuery DATE format: 'YYYY-[M]M-[D]D'
-        date_re_str = r"[0-9]{4}-(0[1-9]|1[0-2]|[0-9])-(0[1-9]|[1-2][0-9]|[3][0-1]|[1-9])"
-        date_pattern = re.compile(date_re_str)
-        if re.fullmatch(date_pattern, value):
+        if DATE_PATTERN.fullmatch(value):
             return "DATE"
 
         # Check for BigQuery TIME format: [H]H:[M]M:[S]S[.DDDDDD]
-        time_re_str = r"([0-1][0-9]|[2][0-3]|[0-9]{1}):([0-5][0-9]|[0-9]{1}):([0-5][0-9]|[0-9]{1}])(\.[0-9]{1,6}|)"
-        time_pattern = re.compile(time_re_str)
-        if re.fullmatch(time_pattern, value):
+        if TIME_PATTERN.fullmatch(value):
             return "TIME"
 
         # Check for BigQuery TIMESTAMP format: YYYY-[M]M-[D]D[( |T)[H]H:[M]M:[S]S[.DDDDDD]][time zone]
-        timestamp_re_str = date_re_str + r'( |T)' + time_re_str + r"([ \-:A-Za-z0-9]*)"
-        timestamp_pattern = re.compile(timestamp_re_str)
-        if re.fullmatch(timestamp_pattern, value):
+        if TIMESTAMP_PATTERN.fullmatch(value):
             return "TIMESTAMP"
 
         return "STRING"
@@ -732,7 +1756,10 @@ def json_datetime_to_str_converter(datetime_obj: datetime) -> str:
         return str(datetime_obj)
 
 
-def initialize_logging(log_filepath: str, name: str = 'base_script', emit_to_console: bool = True) -> logging.Logger:
+def initialize_logging(log_filepath: str,
+                       name: str = 'base_script',
+                       emit_to_console: bool = True,
+                       profile: bool = False) -> logging.Logger:
     """
     Initialize logging.
 
@@ -742,6 +1769,10 @@ def initialize_logging(log_filepath: str, name: str = 'base_script', emit_to_con
     :type name: str
     :param emit_to_console: If True, output to logger to console, otherwise only outputs to log file (default: True)
     :type emit_to_console: bool
+    :param profile: If True, enable profiling (see profiling module); also enabled by setting CDA_BQ_ETL_PROFILE=1.
+                    When enabled, a profile report is logged when the script exits, and written to
+                    {log_filepath}.profile.json (default: False)
+    :type profile: bool
     :return: Logger object
     :rtype: logging.Logger
     """
@@ -775,4 +1806,10 @@ def initialize_logging(log_filepath: str, name: str = 'base_script', emit_to_con
     start_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
     logger.info(f"Logging started: {start_time}")
 
+    if profile:
+        enable_profiling()
+
+    if is_profiling_enabled():
+        atexit.register(log_profile_report, name, f"{log_filepath}.profile.json")
+
     return logger
@@ -15,15 +15,447 @@
 
 """Google Cloud Storage helper functions."""
 
+import base64
+import concurrent.futures
+import contextlib
+import gzip
+import hashlib
+import io
 import logging
 import os
+import shutil
 import sys
-from typing import Optional
-
-from google.cloud import storage, exceptions
-from cda_bq_etl.utils import get_scratch_fp, get_filepath
+import tempfile
+import uuid
+from typing import Iterator, Optional, TextIO
+
+import google_crc32c
+from google.cloud import exceptions, storage
+from cda_bq_etl.client_helpers import get_storage_client
+from cda_bq_etl.utils import get_scratch_fp, get_filepath, calculate_md5sum
 from cda_bq_etl.custom_typing import Params
 
+# size of the buffers used when streaming (de)compressed data to or from a blob
+STREAM_CHUNK_SIZE = 8 * 1024 * 1024
+
+# files of at least two parts are transferred in parallel: downloads as byte-range slices, uploads (if enabled) as
+# composite parts. Override with the PARALLEL_TRANSFER_PART_SIZE and PARALLEL_TRANSFER_WORKERS params.
+PARALLEL_TRANSFER_PART_SIZE = 128 * 1024 * 1024
+PARALLEL_TRANSFER_WORKERS = 8
+# maximum number of source objects per GCS compose request
+MAX_COMPOSE_SOURCES = 32
+
+# set CDA_BQ_ETL_DOWNLOAD_CACHE_DIR to change the download cache location
+DOWNLOAD_CACHE_DIR = os.environ.get('CDA_BQ_ETL_DOWNLOAD_CACHE_DIR',
+                                    os.path.join(os.path.expanduser('~'), '.cache', 'cda_bq_etl', 'download_cache'))
+# the least recently used entries are evicted once the cache exceeds DOWNLOAD_CACHE_MAX_SIZE bytes; blobs larger than
+# DOWNLOAD_CACHE_MAX_FILE_SIZE bytes aren't cached. Override with the params of the same names.
+DOWNLOAD_CACHE_MAX_SIZE = 20 * 1024 * 1024 * 1024
+DOWNLOAD_CACHE_MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024
+
+
+def get_parallel_transfer_settings(params: Params) -> tuple[int, int]:
+    """
+    Get part size and worker count for parallel transfers from params, or module defaults if not set.
+
+    :param params: params from yaml config
+    :type params: Params
+    :return: tuple containing part size (in bytes) and maximum number of worker threads
+    :rtype: tuple[int, int]
+    """
+    part_size = params['PARALLEL_TRANSFER_PART_SIZE'] \
+        if 'PARALLEL_TRANSFER_PART_SIZE' in params else PARALLEL_TRANSFER_PART_SIZE
+    max_workers = params['PARALLEL_TRANSFER_WORKERS'] \
+        if 'PARALLEL_TRANSFER_WORKERS' in params else PARALLEL_TRANSFER_WORKERS
+
+    return part_size, max_workers
+
+
+def get_download_cache_settings(params: Params) -> tuple[int, int]:
+    """
+    Get maximum cache size and maximum cached file size for the download cache from params, or module defaults if not
+    set.
+
+    :param params: params from yaml config
+    :type params: Params
+    :return: tuple containing maximum cache size and maximum cached file size (in bytes)
+    :rtype: tuple[int, int]
+    """
+    max_cache_size = params['DOWNLOAD_CACHE_MAX_SIZE'] \
+        if 'DOWNLOAD_CACHE_MAX_SIZE' in params else DOWNLOAD_CACHE_MAX_SIZE
+    max_file_size = params['DOWNLOAD_CACHE_MAX_FILE_SIZE'] \
+        if 'DOWNLOAD_CACHE_MAX_FILE_SIZE' in params else DOWNLOAD_CACHE_MAX_FILE_SIZE
+
+    return max_cache_size, max_file_size
+
+
+def calculate_crc32c(file_path: str) -> str:
+    """
+    Calculate file's CRC32C checksum, in the format used by GCS object metadata (base64-encoded, big-endian).
+
+    :param file_path: path of file for which to calculate checksum
+    :type file_path: str
+    :return: base64-encoded CRC32C checksum
+    :rtype: str
+    """
+    checksum = google_crc32c.Checksum()
+
+    with open(file_path, 'rb') as file_obj:
+        for chunk in iter(lambda: file_obj.read(STREAM_CHUNK_SIZE), b''):
+            checksum.update(chunk)
+
+    return base64.b64encode(checksum.digest()).decode('utf-8')
+
+
+def verify_crc32c(file_path: str, blob: storage.Blob):
+    """
+    Verify that local file's CRC32C checksum matches blob's; exit if it doesn't.
+
+    :param file_path: path of local file
+    :type file_path: str
+    :param blob: blob whose checksum is compared (metadata must be loaded)
+    :type blob: storage.Blob
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
+
+    file_crc32c = calculate_crc32c(file_path)
+
+    if file_crc32c != blob.crc32c:
+        logger.critical(f"Checksum mismatch for {blob.bucket.name}/{blob.name}: "
+                        f"file {file_path} has CRC32C {file_crc32c}, blob has {blob.crc32c}")
+        sys.exit(-1)
+
+
+def download_blob_sliced(blob: storage.Blob,
+                         file_path: str,
+                         part_size: int = PARALLEL_TRANSFER_PART_SIZE,
+                         max_workers: int = PARALLEL_TRANSFER_WORKERS):
+    """
+    Download blob to file using parallel byte-range requests, each worker writing its slice directly into a
+    preallocated file. Slices are pinned to the blob's generation, and the assembled file's CRC32C checksum is verified
+    against the blob's. Blobs smaller than two parts (or stored with gzip content encoding, which can't be read by
+    range) are downloaded as a single stream, which the client library verifies.
+
+    :param blob: blob to download
+    :type blob: storage.Blob
+    :param file_path: local destination file path
+    :type file_path: str
+    :param part_size: slice size, in bytes; defaults to PARALLEL_TRANSFER_PART_SIZE
+    :type part_size: int
+    :param max_workers: maximum number of concurrent slice downloads; defaults to PARALLEL_TRANSFER_WORKERS
+    :type max_workers: int
+    """
+    blob.reload()
+
+    if blob.size < part_size * 2 or max_workers < 2 or blob.content_encoding == 'gzip':
+        blob.download_to_filename(file_path)
+        return
+
+    slice_ranges = [(start, min(start + part_size, blob.size) - 1) for start in range(0, blob.size, part_size)]
+
+    def download_slice(start: int, end: int):
+        with open(file_path, 'r+b') as slice_file:
+            slice_file.seek(start)
+            # whole-blob checksum is verified once all slices are written
+            blob.download_to_file(slice_file, start=start, end=end, checksum=None,
+                                  if_generation_match=blob.generation)
+
+    with open(file_path, 'wb') as file_obj:
+        file_obj.truncate(blob.size)
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(slice_ranges)),
+                                                   thread_name_prefix='gcs_download') as executor:
+            futures = [executor.submit(download_slice, start, end) for start, end in slice_ranges]
+
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+    except Exception:
+        os.remove(file_path)
+        raise
+
+    verify_crc32c(file_path, blob)
+
+    logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
+    logger.debug(f"Downloaded {blob.name} in {len(slice_ranges)} slices")
+
+
+def upload_file_composite(bucket: storage.Bucket,
+                          blob_name: str,
+                          file_path: str,
+                          part_size: int = PARALLEL_TRANSFER_PART_SIZE,
+                          max_workers: int = PARALLEL_TRANSFER_WORKERS) -> storage.Blob:
+    """
+    Upload file as a parallel composite upload: parts are uploaded concurrently as temporary blobs, then composed
+    server-side into the destination blob (in groups of at most MAX_COMPOSE_SOURCES), and the destination blob's
+    CRC32C checksum is verified against the local file's. Temporary blobs are always deleted. Files smaller than two
+    parts are uploaded as a single stream.
+    Note: composite objects have no MD5 hash, and the bucket must not have a retention policy (or temporary parts
+    can't be deleted).
+
+    :param bucket: destination bucket
+    :type bucket: storage.Bucket
+    :param blob_name: destination blob name
+    :type blob_name: str
+    :param file_path: path of local file to upload
+    :type file_path: str
+    :param part_size: part size, in bytes; defaults to PARALLEL_TRANSFER_PART_SIZE
+    :type part_size: int
+    :param max_workers: maximum number of concurrent part uploads; defaults to PARALLEL_TRANSFER_WORKERS
+    :type max_workers: int
+    :return: destination blob
+    :rtype: storage.Blob
+    """
+    blob = bucket.blob(blob_name)
+    file_size = os.path.getsize(file_path)
+
+    if file_size < part_size * 2 or max_workers < 2:
+        blob.upload_from_filename(file_path, checksum='crc32c')
+        return blob
+
+    temp_prefix = f"{blob_name}.parts-{uuid.uuid4().hex}"
+    part_ranges = [(start, min(part_size, file_size - start)) for start in range(0, file_size, part_size)]
+    temp_blobs = list()
+
+    def upload_part(part_idx: int, start: int, length: int) -> storage.Blob:
+        part_blob = bucket.blob(f"{temp_prefix}/part-{part_idx:05d}")
+
+        with open(file_path, 'rb') as part_file:
+            part_file.seek(start)
+            part_blob.upload_from_file(part_file, size=length, checksum='crc32c', if_generation_match=0)
+
+        return part_blob
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(part_ranges)),
+                                                   thread_name_prefix='gcs_upload') as executor:
+            futures = [executor.submit(upload_part, part_idx, start, length)
+                       for part_idx, (start, length) in enumerate(part_ranges)]
+
+            concurrent.futures.wait(futures)
+
+        # record every uploaded part before raising, so that all are deleted
+        temp_blobs.extend(future.result() for future in futures if future.exception() is None)
+
+        for future in futures:
+            future.result()
+
+        source_blobs = temp_blobs.copy()
+        compose_level = 0
+
+        while len(source_blobs) > MAX_COMPOSE_SOURCES:
+            composed_blobs = list()
+
+            for group_idx, group_start in enumerate(range(0, len(source_blobs), MAX_COMPOSE_SOURCES)):
+                composed_blob = bucket.blob(f"{temp_prefix}/compose-{compose_level}-{group_idx:05d}")
+                composed_blob.compose(source_blobs[group_start:group_start + MAX_COMPOSE_SOURCES])
+                temp_blobs.append(composed_blob)
+                composed_blobs.append(composed_blob)
+
+            source_blobs = composed_blobs
+            compose_level += 1
+
+        blob.compose(source_blobs)
+    finally:
+        bucket.delete_blobs(temp_blobs, on_error=lambda _blob: None)
+
+    blob.reload()
+    verify_crc32c(file_path, blob)
+
+    logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
+    logger.debug(f"Uploaded {blob_name} in {len(part_ranges)} parts")
+
+    return blob
+
+
+def make_download_cache_key(blob: storage.Blob) -> str:
+    """
+    Make download cache key from blob's bucket path, generation and content hash (MD5, or CRC32C for composite
+    objects, which have no MD5), so that a new version of a blob never matches an older entry.
+
+    :param blob: blob, with metadata loaded
+    :type blob: storage.Blob
+    :return: cache key
+    :rtype: str
+    """
+    content_hash = blob.md5_hash if blob.md5_hash else blob.crc32c
+    key_string = f"gs://{blob.bucket.name}/{blob.name}#{blob.generation}:{content_hash}"
+
+    return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+
+
+def is_valid_download_cache_file(cache_fp: str, blob: storage.Blob) -> bool:
+    """
+    Determine whether cached file's content matches blob's MD5 hash (or CRC32C checksum, for composite objects).
+
+    :param cache_fp: cached file path
+    :type cache_fp: str
+    :param blob: blob, with metadata loaded
+    :type blob: storage.Blob
+    :return: True if file matches blob, False otherwise
+    :rtype: bool
+    """
+    if blob.md5_hash:
+        return calculate_md5sum(cache_fp) == base64.b64decode(blob.md5_hash).hex()
+
+    return calculate_crc32c(cache_fp) == blob.crc32c
+
+
+def link_or_copy_file(source_fp: str, destination_fp: str):
+    """
+    Hard link file to destination, copying it if it can't be linked (e.g. destination is on another filesystem).
+
+    :param source_fp: source file path
+    :type source_fp: str
+    :param destination_fp: destination file path (replaced if it exists)
+    :type destination_fp: str
+    """
+    if os.path.exists(destination_fp):
+        os.remove(destination_fp)
+
+    try:
+        os.link(source_fp, destination_fp)
+    except OSError:
+        shutil.copyfile(source_fp, destination_fp)
+
+
+def download_blob_cached(blob: storage.Blob,
+                         file_path: str,
+                         part_size: int = PARALLEL_TRANSFER_PART_SIZE,
+                         max_workers: int = PARALLEL_TRANSFER_WORKERS,
+                         max_cache_size: int = DOWNLOAD_CACHE_MAX_SIZE,
+                         max_file_size: int = DOWNLOAD_CACHE_MAX_FILE_SIZE) -> bool:
+    """
+    Download blob to file via the local content-addressed download cache. Cache entries are keyed by bucket path,
+    generation and content hash, and are verified (see is_valid_download_cache_file) before use, so a file
+    modified after it was linked from the cache is detected and downloaded again. On a hit, only the blob's metadata
+    is retrieved. Blobs larger than max_file_size bypass the cache; after a new entry is added, the least recently
+    used entries are evicted until the cache fits within max_cache_size (see evict_download_cache).
+
+    :param blob: blob to download
+    :type blob: storage.Blob
+    :param file_path: local destination file path
+    :type file_path: str
+    :param part_size: slice size for downloads, in bytes; defaults to PARALLEL_TRANSFER_PART_SIZE
+    :type part_size: int
+    :param max_workers: maximum number of concurrent slice downloads; defaults to PARALLEL_TRANSFER_WORKERS
+    :type max_workers: int
+    :param max_cache_size: maximum total size of cached files, in bytes; defaults to DOWNLOAD_CACHE_MAX_SIZE
+    :type max_cache_size: int
+    :param max_file_size: maximum size of a cached file, in bytes; defaults to DOWNLOAD_CACHE_MAX_FILE_SIZE
+    :type max_file_size: int
+    :return: True if file was retrieved from cache, False if it was downloaded
+    :rtype: bool
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
+
+    blob.reload()
+
+    if blob.size > max_file_size or blob.size > max_cache_size:
+        download_blob_sliced(blob, file_path, part_size=part_size, max_workers=max_workers)
+        return False
+
+    cache_fp = os.path.join(DOWNLOAD_CACHE_DIR, make_download_cache_key(blob))
+
+    if os.path.exists(cache_fp):
+        if is_valid_download_cache_file(cache_fp, blob):
+            # mark entry as recently used (modification time is used, as access times may not be recorded)
+            os.utime(cache_fp)
+            link_or_copy_file(cache_fp, file_path)
+            logger.debug(f"Retrieved {blob.name} from download cache")
+            return True
+
+        logger.warning(f"Cached copy of {blob.name} doesn't match blob; downloading again.")
+        os.remove(cache_fp)
+
+    os.makedirs(DOWNLOAD_CACHE_DIR, exist_ok=True)
+
+    # download to a temporary file, then rename, so that concurrent readers never see a partial entry
+    temp_fd, temp_fp = tempfile.mkstemp(dir=DOWNLOAD_CACHE_DIR, suffix='.tmp')
+    os.close(temp_fd)
+
+    try:
+        download_blob_sliced(blob, temp_fp, part_size=part_size, max_workers=max_workers)
+
+        if not is_valid_download_cache_file(temp_fp, blob):
+            logger.critical(f"Checksum mismatch for downloaded blob {blob.bucket.name}/{blob.name}")
+            sys.exit(-1)
+
+        os.replace(temp_fp, cache_fp)
+    finally:
+        if os.path.exists(temp_fp):
+            os.remove(temp_fp)
+
+    link_or_copy_file(cache_fp, file_path)
+    evict_download_cache(max_cache_size, keep_fp=cache_fp)
+
+    return False
+
+
+def evict_download_cache(max_cache_size: int = DOWNLOAD_CACHE_MAX_SIZE, keep_fp: Optional[str] = None) -> int:
+    """
+    Delete the least recently used download cache entries (by modification time, which is updated on each cache hit)
+    until the cache's total size is no more than max_cache_size. Files linked from the cache aren't affected.
+
+    :param max_cache_size: maximum total size of cached files, in bytes; defaults to DOWNLOAD_CACHE_MAX_SIZE
+    :type max_cache_size: int
+    :param keep_fp: optional cache file path which is never evicted (e.g. the entry which was just added)
+    :type keep_fp: Optional[str]
+    :return: number of entries evicted
+    :rtype: int
+    """
+    if not os.path.exists(DOWNLOAD_CACHE_DIR):
+        return 0
+
+    cache_entries = list()
+
+    for dir_entry in os.scandir(DOWNLOAD_CACHE_DIR):
+        # skip in-progress downloads
+        if dir_entry.name.endswith('.tmp'):
+            continue
+
+        try:
+            stat_result = dir_entry.stat()
+        except FileNotFoundError:
+            # evicted by another process
+            continue
+
+        cache_entries.append((stat_result.st_mtime, stat_result.st_size, dir_entry.path))
+
+    cache_size = sum(file_size for _, file_size, _ in cache_entries)
+    evicted_count = 0
+
+    for _, file_size, cache_fp in sorted(cache_entries):
+        if cache_size <= max_cache_size:
+            break
+        if cache_fp == keep_fp:
+            continue
+
+        try:
+            os.remove(cache_fp)
+            evicted_count += 1
+        except FileNotFoundError:
+            pass
+
+        cache_size -= file_size
+
+    if evicted_count:
+        logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
+        logger.debug(f"Evicted {evicted_count} entries from download cache")
+
+    return evicted_count
+
+
+def clear_download_cache():
+    """
+    Delete all cached downloads.
+    """
+    if not os.path.exists(DOWNLOAD_CACHE_DIR):
+        return
+
+    for file_name in os.listdir(DOWNLOAD_CACHE_DIR):
+        os.remove(os.path.join(DOWNLOAD_CACHE_DIR, file_name))
+
 
 def download_from_external_bucket(uri_path: str,
                                   dir_path: str,
@@ -53,13 +485,15 @@ def download_from_external_bucket(uri_path: str,
         os.remove(file_path)
 
     if project:
-        storage_client = storage.Client(project=project)
+        storage_client = get_storage_client(project=project)
     else:
-        storage_client = storage.Client()
+        storage_client = get_storage_client()
 
-    with open(file_path, 'wb') as file_obj:
-        uri = f"{uri_path}/{filename}"
-        storage_client.download_blob_to_file(blob_or_uri=uri, file_obj=file_obj)
+    uri = f"{uri_path}/{filename}"
+    bucket_name, blob_name = uri.removeprefix('gs://').split('/', 1)
+    blob = storage_client.bucket(bucket_name).blob(blob_name)
+
+    download_blob_sliced(blob, file_path)
 
     logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
 
@@ -73,9 +507,12 @@ def download_from_bucket(params: Params,
                          filename: str,
                          bucket_path: Optional[str] = None,
                          dir_path: Optional[str] = None,
-                         project: str = ""):
+                         project: str = "",
+                         decompress: bool = False):
     """
-    Download file from Google storage bucket onto VM.
+    Download file from Google storage bucket onto VM. If ENABLE_DOWNLOAD_CACHE is set in params, the file is
+    retrieved via the local download cache (see download_blob_cached), limited by the DOWNLOAD_CACHE_MAX_SIZE and
+    DOWNLOAD_CACHE_MAX_FILE_SIZE params.
 
     :param params: params from yaml config, used to retrieve default bucket directory path
     :type params: Params
@@ -88,6 +525,9 @@ def download_from_bucket(params: Params,
     :type dir_path: Optional[str]
     :param project: Optional, defined if project outside the default scope; defaults to empty string
     :type project: str
+    :param decompress: if True, download gzip-compressed blob {filename}.gz (as uploaded by upload_to_bucket with
+                       compress=True), decompressing it on the fly to filename; defaults to False
+    :type decompress: bool
     """
     if not dir_path:
         file_path = get_scratch_fp(params, filename)
@@ -97,24 +537,40 @@ def download_from_bucket(params: Params,
     if os.path.isfile(file_path):
         os.remove(file_path)
 
-    storage_client = storage.Client(project=project)
+    storage_client = get_storage_client(project=project)
 
     if bucket_path:
         blob_name = f"{bucket_path}/{filename}"
     else:
         blob_name = f"{params['WORKING_BUCKET_DIR']}/{filename}"
     bucket = storage_client.bucket(params['WORKING_BUCKET'])
-    blob = bucket.blob(blob_name)
 
-    with open(file_path, 'wb') as file_obj:
-        blob.download_to_file(file_obj)
+    if decompress:
+        blob = bucket.blob(f"{blob_name}.gz")
+
+        with blob.open('rb', chunk_size=STREAM_CHUNK_SIZE) as blob_file, \
+                gzip.GzipFile(fileobj=blob_file, mode='rb') as gzip_file, \
+                open(file_path, 'wb') as file_obj:
+            shutil.copyfileobj(gzip_file, file_obj, STREAM_CHUNK_SIZE)
+    elif 'ENABLE_DOWNLOAD_CACHE' in params and params['ENABLE_DOWNLOAD_CACHE']:
+        part_size, max_workers = get_parallel_transfer_settings(params)
+        max_cache_size, max_file_size = get_download_cache_settings(params)
+        download_blob_cached(bucket.blob(blob_name), file_path, part_size=part_size, max_workers=max_workers,
+                             max_cache_size=max_cache_size, max_file_size=max_file_size)
+    else:
+        part_size, max_workers = get_parallel_transfer_settings(params)
+        download_blob_sliced(bucket.blob(blob_name), file_path, part_size=part_size, max_workers=max_workers)
 
     if os.path.isfile(file_path):
         logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
         logger.info(f"File successfully downloaded from bucket to {file_path}")
 
 
-def upload_to_bucket(params: Params, scratch_fp: str, delete_local: bool = False, verbose: bool = True):
+def upload_to_bucket(params: Params,
+                     scratch_fp: str,
+                     delete_local: bool = False,
+                     verbose: bool = True,
+                     compress: bool = False):
     """
     Upload file to a Google storage bucket (bucket/directory location specified in YAML config).
 
@@ -126,6 +582,12 @@ def upload_to_bucket(params: Params, scratch_fp: str, delete_local: bool = False
     :type delete_local: bool
     :param verbose: if True, log a confirmation for each file uploaded
     :type verbose: bool
+    :param compress: if True, gzip-compress the file while streaming it to the bucket (no compressed copy is written
+                     locally); the blob is named {file name}.gz; defaults to False
+    :type compress: bool
+
+    If PARALLEL_COMPOSITE_UPLOAD is True in params, uncompressed files are uploaded as parallel composite uploads (see
+    upload_file_composite).
     """
     logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
 
@@ -134,15 +596,29 @@ def upload_to_bucket(params: Params, scratch_fp: str, delete_local: bool = False
         sys.exit(-1)
 
     try:
-        storage_client = storage.Client(project="")
+        storage_client = get_storage_client(project="")
 
         output_file = scratch_fp.split('/')[-1]
         bucket_name = params['WORKING_BUCKET']
         bucket = storage_client.bucket(bucket_name)
 
         blob_name = f"{params['WORKING_BUCKET_DIR']}/{output_file}"
-        blob = bucket.blob(blob_name)
-        blob.upload_from_filename(scratch_fp)
+
+        if compress:
+            blob_name += ".gz"
+            blob = bucket.blob(blob_name)
+
+            with open(scratch_fp, 'rb') as file_obj, \
+                    blob.open('wb', chunk_size=STREAM_CHUNK_SIZE, ignore_flush=True,
+                              content_type='application/gzip') as blob_file, \
+                    gzip.GzipFile(filename=output_file, fileobj=blob_file, mode='wb', compresslevel=6) as gzip_file:
+                shutil.copyfileobj(file_obj, gzip_file, STREAM_CHUNK_SIZE)
+        elif 'PARALLEL_COMPOSITE_UPLOAD' in params and params['PARALLEL_COMPOSITE_UPLOAD']:
+            part_size, max_workers = get_parallel_transfer_settings(params)
+            upload_file_composite(bucket, blob_name, scratch_fp, part_size=part_size, max_workers=max_workers)
+        else:
+            blob = bucket.blob(blob_name)
+            blob.upload_from_filename(scratch_fp)
 
         if verbose:
             logger.info(f"Successfully uploaded file to {bucket_name}/{blob_name}.")
@@ -163,13 +639,79 @@ def upload_to_bucket(params: Params, scratch_fp: str, delete_local: bool = False
         sys.exit(-1)
 
 
+@contextlib.contextmanager
+def open_bucket_writer(params: Params,
+                       file_name: str,
+                       compress: bool = False,
+                       verbose: bool = True) -> Iterator[TextIO]:
+    """
+    Open a text stream which writes directly to a blob in the working bucket (bucket/directory location specified in
+    YAML config) via a resumable upload session, without writing a local scratch file. Data is buffered and uploaded
+    in STREAM_CHUNK_SIZE chunks, so memory use doesn't grow with file size. If an exception is raised while writing,
+    the partially uploaded blob is deleted.
+
+    Example:
+        with open_bucket_writer(params, 'file_name.jsonl') as file_obj:
+            file_obj.write(...)
+
+    :param params: bq param object from yaml config
+    :type params: Params
+    :param file_name: name of file to create in bucket
+    :type file_name: str
+    :param compress: if True, gzip-compress the stream; the blob is named {file_name}.gz (as in upload_to_bucket);
+                     defaults to False
+    :type compress: bool
+    :param verbose: if True, log a confirmation once the upload is complete; defaults to True
+    :type verbose: bool
+    :return: writable text stream
+    :rtype: Iterator[TextIO]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
+
+    storage_client = get_storage_client(project="")
+
+    bucket_name = params['WORKING_BUCKET']
+    bucket = storage_client.bucket(bucket_name)
+    blob_name = f"{params['WORKING_BUCKET_DIR']}/{file_name}"
+
+    if compress:
+        blob_name += ".gz"
+
+    blob = bucket.blob(blob_name)
+
+    try:
+        with contextlib.ExitStack() as stack:
+            if compress:
+                blob_file = stack.enter_context(blob.open('wb', chunk_size=STREAM_CHUNK_SIZE, ignore_flush=True,
+                                                          content_type='application/gzip'))
+                gzip_file = stack.enter_context(gzip.GzipFile(filename=file_name, fileobj=blob_file, mode='wb',
+                                                              compresslevel=6))
+                text_file = stack.enter_context(io.TextIOWrapper(gzip_file, encoding='utf-8'))
+            else:
+                text_file = stack.enter_context(blob.open('w', chunk_size=STREAM_CHUNK_SIZE, ignore_flush=True,
+                                                          encoding='utf-8'))
+
+            yield text_file
+    except BaseException:
+        # closing the stream (above) completes the upload, so remove the incomplete blob
+        try:
+            blob.delete()
+        except exceptions.NotFound:
+            pass
+        raise
+
+    if verbose:
+        logger.info(f"Successfully streamed file to {bucket_name}/{blob_name}.")
+
+
 def transfer_between_buckets(params: Params,
                              source_bucket_name: str,
                              bucket_file: str,
                              target_bucket_name: str,
                              target_bucket_file: Optional[str] = None):
     """
-    Transfer file from source bucket to target bucket.
+    Transfer file from source bucket to target bucket. The copy is performed server-side as a rewrite, repeated until
+    complete, so that large objects copied across locations or storage classes don't time out.
 
     :param params: params from YAML config
     :type params: Params
@@ -185,7 +727,7 @@ def transfer_between_buckets(params: Params,
     logger = logging.getLogger('base_script.cda_bq_etl.gcs_helpers')
 
     try:
-        storage_client = storage.Client(project="")
+        storage_client = get_storage_client(project="")
 
         source_bucket = storage_client.bucket(source_bucket_name)
         source_blob = source_bucket.blob(bucket_file)
@@ -195,9 +737,13 @@ def transfer_between_buckets(params: Params,
         if target_bucket_file is None:
             target_bucket_file = bucket_file
 
-        destination_blob = f"{params['WORKING_BUCKET_DIR']}/{target_bucket_file}"
+        destination_blob = destination_bucket.blob(f"{params['WORKING_BUCKET_DIR']}/{target_bucket_file}")
+
+        rewrite_token, bytes_rewritten, total_bytes = destination_blob.rewrite(source_blob)
 
-        source_bucket.copy_blob(source_blob, destination_bucket, destination_blob)
+        while rewrite_token is not None:
+            logger.debug(f"Copied {bytes_rewritten} of {total_bytes} bytes")
+            rewrite_token, bytes_rewritten, total_bytes = destination_blob.rewrite(source_blob, token=rewrite_token)
 
     except exceptions.GoogleCloudError as err:
         logger.critical(f"Failed to upload to bucket.\n{err}")
@@ -0,0 +1,461 @@
+# Copyright 2023-2025, Institute for Systems Biology
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Write typed, compressed Parquet staging files for BigQuery loads. Requires pyarrow."""
+
+import csv
+import datetime
+import decimal
+import logging
+import re
+import sys
+import zoneinfo
+from distutils import util
+from typing import Any, Callable, Iterable, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.cloud.bigquery import SchemaField
+
+from cda_bq_etl.gcs_helpers import upload_to_bucket
+from cda_bq_etl.profiling import profiled
+from cda_bq_etl.utils import sanitize_file_prefix, get_scratch_fp
+from cda_bq_etl.custom_typing import Params, RowDict
+
+# Matches every format check_value_type classifies as DATE or TIMESTAMP (DATE values are merged into DATETIME
+# columns by resolve_type_conflict). The time zone may be Z, a [+-]HH[[:]MM] offset or a time zone name.
+TIMESTAMP_PARSE_PATTERN = re.compile(r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})"
+                                     r"(?:[ T]([0-9]{1,2}):([0-9]{1,2}):([0-9]{1,2})(?:\.([0-9]{1,6}))?)?"
+                                     r"\s*(?:([+\-][0-9]{1,2})(?::?([0-9]{2}))?|([A-Za-z][A-Za-z0-9_/+\-]*))?\s*")
+
+# Time zone abbreviations aren't IANA time zone names, so they're mapped to their fixed UTC offsets (in hours)
+TIMEZONE_ABBREVIATION_OFFSETS = {
+    'Z': 0,
+    'UTC': 0,
+    'GMT': 0,
+    'EST': -5,
+    'EDT': -4,
+    'CST': -6,
+    'CDT': -5,
+    'MST': -7,
+    'MDT': -6,
+    'PST': -8,
+    'PDT': -7
+}
+
+# BigQuery loads Parquet logical types as the matching BigQuery types (timestamps adjusted to UTC load as TIMESTAMP,
+# unadjusted timestamps as DATETIME)
+BQ_TO_ARROW_TYPES = {
+    'STRING': pa.string(),
+    'INT64': pa.int64(),
+    'INTEGER': pa.int64(),
+    'FLOAT64': pa.float64(),
+    'FLOAT': pa.float64(),
+    'NUMERIC': pa.decimal128(38, 9),
+    'BOOL': pa.bool_(),
+    'BOOLEAN': pa.bool_(),
+    'DATE': pa.date32(),
+    'TIME': pa.time64('us'),
+    'DATETIME': pa.timestamp('us'),
+    'TIMESTAMP': pa.timestamp('us', tz='UTC'),
+    'BYTES': pa.binary()
+}
+
+
+def convert_bq_schema_to_arrow_schema(schema: list[SchemaField]) -> pa.Schema:
+    """
+    Convert a BigQuery table schema to an Arrow schema, used to write Parquet files.
+
+    :param schema: list of SchemaField objects
+    :type schema: list[SchemaField]
+    :return: Arrow schema with equivalent field names, types and nullability
+    :rtype: pa.Schema
+    """
+    return pa.schema([convert_bq_schema_field_to_arrow_field(schema_field) for schema_field in schema])
+
+
+def convert_bq_schema_field_to_arrow_field(schema_field: SchemaField) -> pa.Field:
+    """
+    Convert a BigQuery SchemaField (including nested RECORD and REPEATED fields) to an Arrow field.
+
+    :param schema_field: SchemaField object
+    :type schema_field: SchemaField
+    :return: equivalent Arrow field
+    :rtype: pa.Field
+    """
+    if schema_field.field_type in ('RECORD', 'STRUCT'):
+        arrow_type = pa.struct([convert_bq_schema_field_to_arrow_field(child) for child in schema_field.fields])
+    elif schema_field.field_type in BQ_TO_ARROW_TYPES:
+        arrow_type = BQ_TO_ARROW_TYPES[schema_field.field_type]
+    else:
+        logger = logging.getLogger('base_script.cda_bq_etl.parquet_helpers')
+        logger.critical(f"No Parquet type mapping for {schema_field.name} ({schema_field.field_type}).")
+        sys.exit(-1)
+
+    if schema_field.mode == 'REPEATED':
+        return pa.field(schema_field.name, pa.list_(arrow_type), nullable=True)
+
+    return pa.field(schema_field.name, arrow_type, nullable=schema_field.mode != 'REQUIRED')
+
+
+def parse_date_value(value: Any) -> datetime.date:
+    """
+    Convert a DATE value (as matched by check_value_type, which allows unpadded months and days) to a date object.
+
+    :param value: value to convert
+    :type value: Any
+    :return: date object
+    :rtype: datetime.date
+    """
+    if isinstance(value, datetime.date):
+        return value
+
+    year, month, day = str(value).strip().split('-')
+    return datetime.date(int(year), int(month), int(day))
+
+
+def parse_time_value(value: Any) -> datetime.time:
+    """
+    Convert a TIME value (as matched by check_value_type, which allows unpadded values) to a time object.
+
+    :param value: value to convert
+    :type value: Any
+    :return: time object
+    :rtype: datetime.time
+    """
+    if isinstance(value, datetime.time):
+        return value
+
+    hour, minute, second = str(value).strip().split(':')
+    second, _, fraction = second.partition('.')
+    microsecond = int(fraction.ljust(6, '0')[:6]) if fraction else 0
+
+    return datetime.time(int(hour), int(minute), int(second), microsecond)
+
+
+def parse_timezone_value(timezone_name: str) -> datetime.tzinfo:
+    """
+    Convert a time zone name (Z, UTC, a common abbreviation such as PST, or an IANA name such as America/Chicago) to
+    a tzinfo object.
+
+    :param timezone_name: time zone name
+    :type timezone_name: str
+    :return: tzinfo object
+    :rtype: datetime.tzinfo
+    """
+    if timezone_name.upper() in TIMEZONE_ABBREVIATION_OFFSETS:
+        offset_hours = TIMEZONE_ABBREVIATION_OFFSETS[timezone_name.upper()]
+        return datetime.timezone(datetime.timedelta(hours=offset_hours))
+
+    try:
+        return zoneinfo.ZoneInfo(timezone_name)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unrecognized time zone: {timezone_name}")
+
+
+def parse_timestamp_value(value: Any, include_timezone: bool = True) -> datetime.datetime:
+    """
+    Convert a TIMESTAMP (or DATETIME) value to a datetime object. Accepts every format check_value_type classifies
+    as DATE or TIMESTAMP: date-only values are treated as midnight, and values without a time zone are treated as UTC.
+
+    :param value: value to convert
+    :type value: Any
+    :param include_timezone: if True, return a timezone-aware (UTC) datetime, otherwise a naive datetime; defaults to
+        True
+    :type include_timezone: bool
+    :return: datetime object
+    :rtype: datetime.datetime
+    """
+    if isinstance(value, datetime.datetime):
+        timestamp = value
+    elif isinstance(value, datetime.date):
+        timestamp = datetime.datetime(value.year, value.month, value.day)
+    else:
+        match = TIMESTAMP_PARSE_PATTERN.fullmatch(str(value).strip())
+
+        if not match:
+            raise ValueError(f"Unrecognized timestamp format: {value}")
+
+        year, month, day, hour, minute, second, fraction, offset_hours, offset_minutes, timezone_name = match.groups()
+        microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+
+        if offset_hours:
+            offset = datetime.timedelta(hours=abs(int(offset_hours)), minutes=int(offset_minutes or 0))
+            timezone = datetime.timezone(-offset if offset_hours[0] == '-' else offset)
+        elif timezone_name:
+            timezone = parse_timezone_value(timezone_name)
+        else:
+            timezone = datetime.timezone.utc
+
+        timestamp = datetime.datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+                                      int(second or 0), microsecond, tzinfo=timezone)
+
+    if not include_timezone:
+        return timestamp.replace(tzinfo=None)
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=datetime.timezone.utc)
+
+    return timestamp.astimezone(datetime.timezone.utc)
+
+
+def parse_int_value(value: Any) -> int:
+    """
+    Convert an INT64 value to int. Trivial floats (e.g. '100.0') are accepted, matching normalize_value.
+
+    :param value: value to convert
+    :type value: Any
+    :return: int value
+    :rtype: int
+    """
+    if isinstance(value, int):
+        return value
+
+    try:
+        return int(value)
+    except ValueError:
+        float_value = float(value)
+
+        if not float_value.is_integer():
+            raise
+
+        return int(float_value)
+
+
+def parse_bool_value(value: Any) -> bool:
+    """
+    Convert a BOOL value to bool. Accepts the same strings which check_value_type classifies as BOOL (and which
+    BigQuery's text loader accepts): true/false, t/f, yes/no, y/n, on/off and 1/0, in any case.
+
+    :param value: value to convert
+    :type value: Any
+    :return: bool value
+    :rtype: bool
+    """
+    if isinstance(value, bool):
+        return value
+
+    try:
+        return bool(util.strtobool(str(value).strip()))
+    except ValueError:
+        raise ValueError(f"Unrecognized boolean value: {value}")
+
+
+SCALAR_VALUE_PARSERS = {
+    'INT64': parse_int_value,
+    'INTEGER': parse_int_value,
+    'FLOAT64': float,
+    'FLOAT': float,
+    'NUMERIC': lambda value: decimal.Decimal(str(value)),
+    'BOOL': parse_bool_value,
+    'BOOLEAN': parse_bool_value,
+    'DATE': parse_date_value,
+    'TIME': parse_time_value,
+    'DATETIME': lambda value: parse_timestamp_value(value, include_timezone=False),
+    'TIMESTAMP': parse_timestamp_value
+}
+
+
+def create_value_converter(schema_field: SchemaField, exit_on_error: bool = True) -> Callable[[Any], Any]:
+    """
+    Create a function which converts a field's (normalized) values to the Python types expected by its Arrow type.
+    Empty strings are converted to null for all but STRING fields.
+
+    :param schema_field: SchemaField object
+    :type schema_field: SchemaField
+    :param exit_on_error: if True, exit when a value can't be converted, otherwise raise ValueError; defaults to True
+    :type exit_on_error: bool
+    :return: value conversion function
+    :rtype: Callable[[Any], Any]
+    """
+    if schema_field.field_type in ('RECORD', 'STRUCT'):
+        child_converters = [(child.name, create_value_converter(child, exit_on_error)) for child in schema_field.fields]
+
+        def convert_scalar(value):
+            return {name: converter(value.get(name)) for name, converter in child_converters}
+    elif schema_field.field_type in SCALAR_VALUE_PARSERS:
+        parser = SCALAR_VALUE_PARSERS[schema_field.field_type]
+
+        def convert_scalar(value):
+            if value == '':
+                return None
+            try:
+                return parser(value)
+            except (ValueError, TypeError, ArithmeticError) as err:
+                error_str = f"Cannot convert value for {schema_field.name} ({schema_field.field_type}): {err}"
+
+                if not exit_on_error:
+                    raise ValueError(error_str) from err
+
+                logger = logging.getLogger('base_script.cda_bq_etl.parquet_helpers')
+                logger.critical(error_str)
+                sys.exit(-1)
+    elif schema_field.field_type == 'BYTES':
+        def convert_scalar(value):
+            return value if isinstance(value, bytes) else str(value).encode()
+    else:
+        def convert_scalar(value):
+            return value if isinstance(value, str) else str(value)
+
+    if schema_field.mode == 'REPEATED':
+        def convert_value(value):
+            if value is None:
+                return None
+            return [convert_scalar(item) if item is not None else None for item in value]
+    else:
+        def convert_value(value):
+            if value is None:
+                return None
+            return convert_scalar(value)
+
+    return convert_value
+
+
+def write_records_to_parquet(parquet_fp: str,
+                             records: Iterable[RowDict],
+                             schema: list[SchemaField],
+                             row_group_size: int = 100000,
+                             compression: str = 'snappy',
+                             exit_on_error: bool = True) -> int:
+    """
+    Write records to a Parquet file, typed according to a BigQuery table schema. Records are converted and written
+    one row group at a time, so records may be supplied by a generator. Record fields not found in the schema are
+    ignored; schema fields missing from a record are written as null.
+
+    :param parquet_fp: local VM Parquet filepath
+    :type parquet_fp: str
+    :param records: iterable of (normalized) records
+    :type records: Iterable[RowDict]
+    :param schema: list of SchemaField objects (e.g. as returned by retrieve_bq_schema_object)
+    :type schema: list[SchemaField]
+    :param row_group_size: number of records per Parquet row group; defaults to 100000
+    :type row_group_size: int
+    :param compression: Parquet compression codec, e.g. 'snappy', 'gzip' or 'zstd'; defaults to 'snappy'
+    :type compression: str
+    :param exit_on_error: if True, exit when a value can't be converted, otherwise raise ValueError; defaults to True
+    :type exit_on_error: bool
+    :return: number of records written
+    :rtype: int
+    """
+    arrow_schema = convert_bq_schema_to_arrow_schema(schema)
+    field_converters = [(schema_field.name, create_value_converter(schema_field, exit_on_error))
+                        for schema_field in schema]
+
+    record_count = 0
+    row_group = list()
+
+    with pq.ParquetWriter(parquet_fp, arrow_schema, compression=compression) as parquet_writer:
+        for record in records:
+            row_group.append({name: converter(record.get(name)) for name, converter in field_converters})
+
+            if len(row_group) == row_group_size:
+                parquet_writer.write_table(pa.Table.from_pylist(row_group, schema=arrow_schema))
+                record_count += len(row_group)
+                row_group = list()
+
+        if row_group or record_count == 0:
+            parquet_writer.write_table(pa.Table.from_pylist(row_group, schema=arrow_schema))
+            record_count += len(row_group)
+
+    return record_count
+
+
+@profiled(rows_from_result=lambda row_count: row_count)
+def convert_tsv_to_parquet(tsv_fp: str,
+                           parquet_fp: str,
+                           schema: list[SchemaField],
+                           skip_rows: int = 1,
+                           null_marker: str = '',
+                           row_group_size: int = 100000,
+                           compression: str = 'snappy',
+                           exit_on_error: bool = True) -> int:
+    """
+    Convert a (normalized) tsv file to a Parquet file, typed according to a BigQuery table schema. The schema's
+    fields must be in tsv column order (as created by create_and_upload_schema_for_tsv). With exit_on_error=False,
+    a ValueError is raised for values that can't be converted, so the caller can fall back to loading the tsv file.
+
+    :param tsv_fp: local VM tsv filepath
+    :type tsv_fp: str
+    :param parquet_fp: local VM Parquet filepath
+    :type parquet_fp: str
+    :param schema: list of SchemaField objects, in column order
+    :type schema: list[SchemaField]
+    :param skip_rows: number of (header) rows to skip; defaults to 1
+    :type skip_rows: int
+    :param null_marker: tsv value which represents null (matching BigQuery's tsv null_marker); defaults to ''
+    :type null_marker: str
+    :param row_group_size: number of rows per Parquet row group; defaults to 100000
+    :type row_group_size: int
+    :param compression: Parquet compression codec, e.g. 'snappy', 'gzip' or 'zstd'; defaults to 'snappy'
+    :type compression: str
+    :param exit_on_error: if True, exit when a value can't be converted, otherwise raise ValueError; defaults to True
+    :type exit_on_error: bool
+    :return: number of rows written
+    :rtype: int
+    """
+    column_names = [schema_field.name for schema_field in schema]
+
+    def read_tsv_records():
+        with open(tsv_fp, mode="r", newline="") as tsv_file:
+            tsv_reader = csv.reader(tsv_file, delimiter="\t")
+
+            for i in range(skip_rows):
+                next(tsv_reader, None)
+
+            for row in tsv_reader:
+                if len(row) != len(column_names):
+                    logger = logging.getLogger('base_script.cda_bq_etl.parquet_helpers')
+                    logger.critical(f"Cannot convert {tsv_fp} to Parquet, row and schema lengths don't match")
+                    logger.critical(f"row: {row}")
+                    sys.exit(-1)
+
+                yield {name: None if value == null_marker else value for name, value in zip(column_names, row)}
+
+    return write_records_to_parquet(parquet_fp, read_tsv_records(), schema, row_group_size, compression,
+                                    exit_on_error)
+
+
+def write_list_to_parquet_and_upload(params: Params,
+                                     prefix: str,
+                                     record_list: Iterable[RowDict],
+                                     schema: list[SchemaField],
+                                     release: Optional[str] = None,
+                                     local_filepath: Optional[str] = None):
+    """
+    Write records to Parquet file name specified by prefix and upload to scratch Google Cloud bucket. Parquet
+    counterpart of write_list_to_jsonl_and_upload.
+
+    :param params: params supplied in yaml config
+    :type params: Params
+    :param prefix: string representing base file name (release string is appended to generate filename)
+    :type prefix: str
+    :param record_list: list (or other iterable) of record objects to insert into Parquet file
+    :type record_list: Iterable[RowDict]
+    :param schema: list of SchemaField objects used to type the Parquet columns
+    :type schema: list[SchemaField]
+    :param release: Optional custom release, if different from what is provided in shared config yaml
+    :type release: Optional[str]
+    :param local_filepath: VM path where Parquet file is stored prior to upload
+    :type local_filepath: Optional[str]
+    """
+    if not local_filepath:
+        if not release:
+            parquet_filename = f"{sanitize_file_prefix(prefix)}_{params['RELEASE']}.parquet"
+        else:
+            parquet_filename = f"{sanitize_file_prefix(prefix)}_{release}.parquet"
+
+        local_filepath = get_scratch_fp(params, parquet_filename)
+
+    write_records_to_parquet(local_filepath, record_list, schema)
+    upload_to_bucket(params, local_filepath, delete_local=True)
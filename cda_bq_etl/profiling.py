@@ -0,0 +1,328 @@
+# Copyright 2023-2025, Institute for Systems Biology
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Opt-in timing and memory profiling for pipeline hot paths."""
+
+import contextlib
+import functools
+import inspect
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional
+
+# profiling is opt-in: enable with enable_profiling(), by passing profile=True to initialize_logging, or by setting
+# CDA_BQ_ETL_PROFILE=1
+_profiling_enabled = os.environ.get('CDA_BQ_ETL_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+# {profile name: aggregated stats (calls, wall_seconds, cpu_seconds, child_cpu_seconds, peak_rss_mb, rows)}
+_profile_records: dict[str, dict[str, Any]] = dict()
+_profile_records_lock = threading.Lock()
+
+
+def _reset_profile_records_after_fork():
+    global _profile_records_lock
+
+    # forked worker processes start with empty records, so that merge_profile_records doesn't count the parent's
+    # records twice; the lock is replaced in case another thread held it at fork time
+    _profile_records_lock = threading.Lock()
+    _profile_records.clear()
+
+
+os.register_at_fork(after_in_child=_reset_profile_records_after_fork)
+
+
+def enable_profiling(enabled: bool = True):
+    """
+    Enable or disable profiling of functions decorated with profiled, and of profile_block sections.
+
+    :param enabled: if True, record profiles; defaults to True
+    :type enabled: bool
+    """
+    global _profiling_enabled
+
+    _profiling_enabled = enabled
+
+
+def is_profiling_enabled() -> bool:
+    """
+    Determine whether profiling is enabled.
+
+    :return: True if enabled, False otherwise
+    :rtype: bool
+    """
+    return _profiling_enabled
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Get this process's peak resident set size (high-water mark) in MiB.
+
+    :return: peak RSS in MiB
+    :rtype: float
+    """
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_child_cpu_seconds() -> float:
+    """
+    Get CPU time used by this process's completed child processes (e.g. normalization worker pools).
+
+    :return: child process CPU seconds
+    :rtype: float
+    """
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def record_profile(name: str,
+                   wall_seconds: float,
+                   cpu_seconds: float,
+                   child_cpu_seconds: float,
+                   peak_rss_mb: float,
+                   rows: Optional[int] = None):
+    """
+    Add a call's measurements to the profile records.
+
+    :param name: profile name
+    :type name: str
+    :param wall_seconds: elapsed wall time
+    :type wall_seconds: float
+    :param cpu_seconds: process CPU time used
+    :type cpu_seconds: float
+    :param child_cpu_seconds: CPU time used by child processes
+    :type child_cpu_seconds: float
+    :param peak_rss_mb: process peak RSS, in MiB, at end of call
+    :type peak_rss_mb: float
+    :param rows: rows processed, if known; defaults to None
+    :type rows: Optional[int]
+    """
+    with _profile_records_lock:
+        if name not in _profile_records:
+            _profile_records[name] = {
+                'calls': 0,
+                'wall_seconds': 0.0,
+                'cpu_seconds': 0.0,
+                'child_cpu_seconds': 0.0,
+                'peak_rss_mb': 0.0,
+                'rows': None
+            }
+
+        profile_record = _profile_records[name]
+        profile_record['calls'] += 1
+        profile_record['wall_seconds'] += wall_seconds
+        profile_record['cpu_seconds'] += cpu_seconds
+        profile_record['child_cpu_seconds'] += child_cpu_seconds
+        profile_record['peak_rss_mb'] = max(profile_record['peak_rss_mb'], peak_rss_mb)
+
+        if rows is not None:
+            profile_record['rows'] = (profile_record['rows'] or 0) + rows
+
+
+@contextlib.contextmanager
+def profile_block(name: str) -> Iterator[dict[str, Any]]:
+    """
+    Profile a block of code: wall time, CPU time of the calling thread, CPU time of child processes completed during
+    the block, and process peak RSS. Set 'rows' in the yielded dict to record the number of rows processed. Does
+    nothing (beyond yielding a dict) if profiling is disabled.
+
+    Example:
+        with profile_block('build_case_records') as profile:
+            ...
+            profile['rows'] = len(case_records)
+
+    :param name: profile name
+    :type name: str
+    :return: dict in which to set rows processed
+    :rtype: Iterator[dict[str, Any]]
+    """
+    block_stats = {'rows': None}
+
+    if not _profiling_enabled:
+        yield block_stats
+        return
+
+    start_wall_time = time.perf_counter()
+    # thread_time, rather than process_time, so that concurrently profiled threads aren't charged for each other
+    start_cpu_time = time.thread_time()
+    start_child_cpu_time = get_child_cpu_seconds()
+
+    try:
+        yield block_stats
+    finally:
+        record_profile(name,
+                       wall_seconds=time.perf_counter() - start_wall_time,
+                       cpu_seconds=time.thread_time() - start_cpu_time,
+                       child_cpu_seconds=get_child_cpu_seconds() - start_child_cpu_time,
+                       peak_rss_mb=get_peak_rss_mb(),
+                       rows=block_stats['rows'])
+
+
+def profiled(name: Optional[str] = None,
+             rows_from_result: Optional[Callable[[Any], int]] = None,
+             rows_from_arg: Optional[str] = None) -> Callable:
+    """
+    Decorator which profiles each call of a function (see profile_block), when profiling is enabled.
+
+    :param name: profile name; defaults to None (use the function's qualified name)
+    :type name: Optional[str]
+    :param rows_from_result: function which derives rows processed from the return value (e.g. len); defaults to None
+    :type rows_from_result: Optional[Callable[[Any], int]]
+    :param rows_from_arg: name of list argument whose length is the number of rows processed; defaults to None
+    :type rows_from_arg: Optional[str]
+    :return: decorator
+    :rtype: Callable
+    """
+    def decorator(function: Callable) -> Callable:
+        profile_name = name if name else f"{function.__module__}.{function.__qualname__}"
+        signature = inspect.signature(function) if rows_from_arg else None
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _profiling_enabled:
+                return function(*args, **kwargs)
+
+            with profile_block(profile_name) as block_stats:
+                if rows_from_arg:
+                    arg_value = signature.bind(*args, **kwargs).arguments.get(rows_from_arg)
+
+                    if isinstance(arg_value, (list, tuple)):
+                        block_stats['rows'] = len(arg_value)
+
+                result = function(*args, **kwargs)
+
+                if rows_from_result:
+                    block_stats['rows'] = rows_from_result(result)
+
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def collect_profile_records(reset: bool = False) -> dict[str, dict[str, Any]]:
+    """
+    Get a copy of the profile records, e.g. to return them from a worker process to its parent (see
+    merge_profile_records).
+
+    :param reset: if True, clear the records once copied; defaults to False
+    :type reset: bool
+    :return: dict of profile names and aggregated stats
+    :rtype: dict[str, dict[str, Any]]
+    """
+    with _profile_records_lock:
+        profile_records = {name: dict(profile_record) for name, profile_record in _profile_records.items()}
+
+        if reset:
+            _profile_records.clear()
+
+    return profile_records
+
+
+def merge_profile_records(profile_records: dict[str, dict[str, Any]]):
+    """
+    Add profile records collected in another process (see collect_profile_records) to this process's records.
+
+    :param profile_records: dict of profile names and aggregated stats
+    :type profile_records: dict[str, dict[str, Any]]
+    """
+    with _profile_records_lock:
+        for name, other_record in profile_records.items():
+            if name not in _profile_records:
+                _profile_records[name] = dict(other_record)
+                continue
+
+            profile_record = _profile_records[name]
+
+            for stat_name in ('calls', 'wall_seconds', 'cpu_seconds', 'child_cpu_seconds'):
+                profile_record[stat_name] += other_record[stat_name]
+
+            profile_record['peak_rss_mb'] = max(profile_record['peak_rss_mb'], other_record['peak_rss_mb'])
+
+            if other_record['rows'] is not None:
+                profile_record['rows'] = (profile_record['rows'] or 0) + other_record['rows']
+
+
+def get_profile_report() -> list[dict[str, Any]]:
+    """
+    Get profile report: one entry per profile name, sorted by total wall time (descending).
+
+    :return: list of dicts (name, calls, wall_seconds, mean_wall_seconds, cpu_seconds, child_cpu_seconds,
+        peak_rss_mb, rows, rows_per_second)
+    :rtype: list[dict[str, Any]]
+    """
+    profile_report = list()
+
+    for name, profile_record in collect_profile_records().items():
+        wall_seconds = profile_record['wall_seconds']
+        rows = profile_record['rows']
+
+        profile_report.append({
+            'name': name,
+            'calls': profile_record['calls'],
+            'wall_seconds': round(wall_seconds, 3),
+            'mean_wall_seconds': round(wall_seconds / profile_record['calls'], 3),
+            'cpu_seconds': round(profile_record['cpu_seconds'], 3),
+            'child_cpu_seconds': round(profile_record['child_cpu_seconds'], 3),
+            'peak_rss_mb': round(profile_record['peak_rss_mb'], 1),
+            'rows': rows,
+            'rows_per_second': round(rows / wall_seconds, 1) if rows is not None and wall_seconds else None
+        })
+
+    return sorted(profile_report, key=lambda entry: entry['wall_seconds'], reverse=True)
+
+
+def log_profile_report(logger_name: str = 'base_script', report_fp: Optional[str] = None):
+    """
+    Log profile report, and optionally write it to a json file. Does nothing if no profiles were recorded.
+
+    :param logger_name: name of logger used to emit report; defaults to 'base_script'
+    :type logger_name: str
+    :param report_fp: if specified, path of json file to which the report is written; defaults to None
+    :type report_fp: Optional[str]
+    """
+    profile_report = get_profile_report()
+
+    if not profile_report:
+        return
+
+    logger = logging.getLogger(logger_name)
+
+    lines = ["Profile report (sorted by wall time):"]
+
+    for entry in profile_report:
+        line = (f"  {entry['name']}: {entry['calls']} calls, wall {entry['wall_seconds']:.2f}s "
+                f"(mean {entry['mean_wall_seconds']:.2f}s), cpu {entry['cpu_seconds']:.2f}s, "
+                f"child cpu {entry['child_cpu_seconds']:.2f}s, peak rss {entry['peak_rss_mb']:.1f} MiB")
+
+        if entry['rows'] is not None:
+            line += f", {entry['rows']} rows"
+            if entry['rows_per_second'] is not None:
+                line += f" ({entry['rows_per_second']:.0f} rows/s)"
+
+        lines.append(line)
+
+    logger.info("\n".join(lines))
+
+    if report_fp:
+        with open(report_fp, mode='w') as report_file:
+            json.dump(profile_report, report_file, indent=2)
+
+        logger.info(f"Profile report written to {report_fp}")
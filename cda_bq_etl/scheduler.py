@@ -0,0 +1,303 @@
+# Copyright 2023-2025, Institute for Systems Biology
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Run pipeline steps concurrently, in dependency order."""
+
+import concurrent.futures
+import logging
+import sys
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from cda_bq_etl.utils import format_seconds
+
+# Each step is a dict:
+#   name: unique step name
+#   function: callable (taking no arguments) which performs the step
+#   inputs: names of the tables/files the step reads
+#   outputs: names of the tables/files the step writes
+#   estimated_seconds: expected duration, used to find the critical path before any step has run
+Step = dict[str, Any]
+
+
+def make_step(name: str,
+              function: Callable[[], Any],
+              inputs: Optional[Iterable[str]] = None,
+              outputs: Optional[Iterable[str]] = None,
+              estimated_seconds: float = 1.0) -> Step:
+    """
+    Make a pipeline step.
+
+    :param name: unique step name
+    :type name: str
+    :param function: callable (taking no arguments) which performs the step
+    :type function: Callable[[], Any]
+    :param inputs: names of the tables or files read by the step; defaults to None
+    :type inputs: Optional[Iterable[str]]
+    :param outputs: names of the tables or files written by the step; defaults to None
+    :type outputs: Optional[Iterable[str]]
+    :param estimated_seconds: expected duration of the step, used to find the critical path; defaults to 1.0
+    :type estimated_seconds: float
+    :return: step dict
+    :rtype: Step
+    """
+    return {
+        'name': name,
+        'function': function,
+        'inputs': list(inputs) if inputs else list(),
+        'outputs': list(outputs) if outputs else list(),
+        'estimated_seconds': estimated_seconds
+    }
+
+
+def build_step_dependencies(steps: list[Step]) -> dict[str, list[str]]:
+    """
+    Determine which steps each step must wait for. Steps are listed in their sequential (yaml) order, and a step
+    depends on an earlier step if running them out of order could change the result:
+        - the step reads a table/file written by the earlier step
+        - the step writes a table/file written by, or read by, the earlier step
+    Inputs not written by any listed step are assumed to already exist.
+
+    :param steps: steps, in sequential order
+    :type steps: list[Step]
+    :return: dict of step names and the names of the steps they depend on
+    :rtype: dict[str, list[str]]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.scheduler')
+
+    step_names = [step['name'] for step in steps]
+
+    if len(set(step_names)) != len(step_names):
+        logger.critical(f"Step names must be unique: {step_names}")
+        sys.exit(-1)
+
+    # {table/file name: name of step that last wrote it}
+    last_writer = dict()
+    # {table/file name: names of steps which read it since it was last written}
+    readers_since_write = dict()
+    dependencies = dict()
+
+    for step in steps:
+        step_dependencies = set()
+
+        for input_name in step['inputs']:
+            if input_name in last_writer:
+                step_dependencies.add(last_writer[input_name])
+
+        for output_name in step['outputs']:
+            if output_name in last_writer:
+                step_dependencies.add(last_writer[output_name])
+            if output_name in readers_since_write:
+                step_dependencies.update(readers_since_write[output_name])
+
+        step_dependencies.discard(step['name'])
+
+        for input_name in step['inputs']:
+            readers_since_write.setdefault(input_name, set()).add(step['name'])
+
+        for output_name in step['outputs']:
+            last_writer[output_name] = step['name']
+            readers_since_write.pop(output_name, None)
+
+        # keep dependencies in step order, for consistent output
+        dependencies[step['name']] = [name for name in step_names if name in step_dependencies]
+
+    return dependencies
+
+
+def find_critical_path(steps: list[Step],
+                       dependencies: dict[str, list[str]],
+                       step_seconds: Optional[dict[str, float]] = None) -> tuple[list[str], float]:
+    """
+    Find the critical path: the chain of dependent steps with the longest total duration, which is the minimum
+    duration of the pipeline, regardless of the number of workers.
+
+    :param steps: steps, in sequential order
+    :type steps: list[Step]
+    :param dependencies: dict of step names and the names of the steps they depend on (see build_step_dependencies)
+    :type dependencies: dict[str, list[str]]
+    :param step_seconds: dict of step names and durations; steps not included use their estimated_seconds value.
+        Defaults to None
+    :type step_seconds: Optional[dict[str, float]]
+    :return: tuple containing list of step names on the critical path and the path's total duration
+    :rtype: tuple[list[str], float]
+    """
+    if not steps:
+        return list(), 0.0
+
+    # {step name: (finish time if every step starts as soon as its dependencies finish, preceding step on path)}
+    finish_times = dict()
+
+    # dependencies always precede their dependent steps, so a single pass in step order suffices
+    for step in steps:
+        if step_seconds and step['name'] in step_seconds:
+            duration = step_seconds[step['name']]
+        else:
+            duration = step['estimated_seconds']
+
+        start_time = 0.0
+        preceding_step = None
+
+        for dependency in dependencies[step['name']]:
+            if finish_times[dependency][0] > start_time:
+                start_time = finish_times[dependency][0]
+                preceding_step = dependency
+
+        finish_times[step['name']] = (start_time + duration, preceding_step)
+
+    last_step = max(finish_times, key=lambda name: finish_times[name][0])
+    critical_path_seconds = finish_times[last_step][0]
+
+    critical_path = list()
+    step_name = last_step
+
+    while step_name is not None:
+        critical_path.insert(0, step_name)
+        step_name = finish_times[step_name][1]
+
+    return critical_path, critical_path_seconds
+
+
+def format_step_graph(steps: list[Step], dependencies: dict[str, list[str]]) -> str:
+    """
+    Format step dependency graph as text: the steps in each wave (steps which may run concurrently once the previous
+    waves are complete), with their dependencies, inputs and outputs, followed by the critical path.
+
+    :param steps: steps, in sequential order
+    :type steps: list[Step]
+    :param dependencies: dict of step names and the names of the steps they depend on (see build_step_dependencies)
+    :type dependencies: dict[str, list[str]]
+    :return: formatted step graph
+    :rtype: str
+    """
+    # wave number is one more than the highest wave number of the step's dependencies
+    step_waves = dict()
+
+    for step in steps:
+        step_waves[step['name']] = max([step_waves[dependency] + 1 for dependency in dependencies[step['name']]],
+                                       default=0)
+
+    lines = [f"Step graph ({len(steps)} steps):"]
+
+    for wave in range(max(step_waves.values(), default=-1) + 1):
+        lines.append(f"  Wave {wave + 1}:")
+
+        for step in steps:
+            if step_waves[step['name']] != wave:
+                continue
+
+            lines.append(f"    {step['name']} (est. {format_seconds(step['estimated_seconds'])})")
+
+            if dependencies[step['name']]:
+                lines.append(f"      after:   {', '.join(dependencies[step['name']])}")
+            if step['inputs']:
+                lines.append(f"      inputs:  {', '.join(step['inputs'])}")
+            if step['outputs']:
+                lines.append(f"      outputs: {', '.join(step['outputs'])}")
+
+    critical_path, critical_path_seconds = find_critical_path(steps, dependencies)
+    sequential_seconds = sum(step['estimated_seconds'] for step in steps)
+
+    lines.append(f"Critical path (est. {format_seconds(critical_path_seconds)}; "
+                 f"sequential est. {format_seconds(sequential_seconds)}):")
+    lines.append(f"  {' -> '.join(critical_path)}")
+
+    return "\n".join(lines)
+
+
+def run_steps(steps: list[Step], max_workers: int = 4, dry_run: bool = False) -> dict[str, dict[str, Any]]:
+    """
+    Run steps using a pool of worker threads. Each step starts as soon as the steps it depends on (see
+    build_step_dependencies) have completed, so independent steps run concurrently. If a step fails (raises an
+    exception or exits), no further steps are started; running steps are allowed to finish, then failures are logged
+    and the script exits.
+
+    :param steps: steps, in sequential order
+    :type steps: list[Step]
+    :param max_workers: maximum number of steps to run at once; defaults to 4
+    :type max_workers: int
+    :param dry_run: if True, log the step graph and critical path, but don't run any steps; defaults to False
+    :type dry_run: bool
+    :return: dict of step names and run stats (start_time, end_time, elapsed_seconds)
+    :rtype: dict[str, dict[str, Any]]
+    """
+    logger = logging.getLogger('base_script.cda_bq_etl.scheduler')
+
+    dependencies = build_step_dependencies(steps)
+
+    if dry_run:
+        logger.info(f"Dry run; no steps will be run.\n{format_step_graph(steps, dependencies)}")
+        return dict()
+
+    steps_by_name = {step['name']: step for step in steps}
+    pending_step_names = [step['name'] for step in steps]
+    running_futures = dict()
+    completed_step_names = set()
+    failed_steps = dict()
+    step_stats = dict()
+    run_start_time = time.time()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                               thread_name_prefix='scheduler') as executor:
+        while pending_step_names or running_futures:
+            if not failed_steps:
+                ready_step_names = [step_name for step_name in pending_step_names
+                                    if all(dependency in completed_step_names
+                                           for dependency in dependencies[step_name])]
+
+                for step_name in ready_step_names:
+                    pending_step_names.remove(step_name)
+                    logger.info(f"Starting step: {step_name}")
+                    step_stats[step_name] = {'start_time': time.time()}
+                    future = executor.submit(steps_by_name[step_name]['function'])
+                    running_futures[future] = step_name
+
+            if not running_futures:
+                break
+
+            done_futures, _ = concurrent.futures.wait(running_futures,
+                                                      return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done_futures:
+                step_name = running_futures.pop(future)
+                end_time = time.time()
+                step_stats[step_name]['end_time'] = end_time
+                step_stats[step_name]['elapsed_seconds'] = end_time - step_stats[step_name]['start_time']
+
+                # future.exception() also captures SystemExit, which helper functions use to report errors
+                if future.exception() is not None:
+                    failed_steps[step_name] = future.exception()
+                    logger.error(f"Step failed: {step_name}")
+                else:
+                    completed_step_names.add(step_name)
+                    logger.info(f"Step completed: {step_name} "
+                                f"({format_seconds(step_stats[step_name]['elapsed_seconds'])})")
+
+    if failed_steps:
+        for step_name, err in failed_steps.items():
+            logger.critical(f"Step {step_name} failed: {err!r}")
+        if pending_step_names:
+            logger.critical(f"Steps not run: {', '.join(pending_step_names)}")
+        logger.critical("Exiting.")
+        sys.exit(-1)
+
+    step_seconds = {step_name: stats['elapsed_seconds'] for step_name, stats in step_stats.items()}
+    critical_path, critical_path_seconds = find_critical_path(steps, dependencies, step_seconds)
+
+    logger.info(f"{len(steps)} steps completed in {format_seconds(time.time() - run_start_time)} "
+                f"(sequential total: {format_seconds(sum(step_seconds.values()))}).")
+    logger.info(f"Critical path ({format_seconds(critical_path_seconds)}): {' -> '.join(critical_path)}")
+
+    return step_stats
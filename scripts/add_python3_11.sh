@@ -59,4 +59,6 @@ python3.11 -m pip install wget
 python3.11 -m pip install alive_progress
 # used by build_schema:
 python3.11 -m pip install python-dateutil
+# used by cda_bq_etl parquet staging, query result cache and streamed query results:
+python3.11 -m pip install pyarrow
 deactivate
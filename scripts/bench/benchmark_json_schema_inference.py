@@ -0,0 +1,115 @@
+"""
+Copyright 2023, Institute for Systems Biology
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import copy
+import os
+import random
+import sys
+import tempfile
+import time
+
+from cda_bq_etl.data_helpers import (recursively_detect_object_structures, detect_object_structures_from_jsonl,
+                                     write_list_to_jsonl)
+from cda_bq_etl.bq_helpers.schema import convert_object_structure_dict_to_schema_dict
+
+# values seen in CDA/PDC source data, covering each of the detected BigQuery data types
+SAMPLE_VALUES = ['', 'NA', 'not reported', 'True', 'no', '1', '0', '12', '1.5', '100.0', '2022-01-05', '12:30:45',
+                 '2022-11-04T14:22:25.013629-05:00', 'Primary Tumor', '[unknown]', '-5', None, 42, 3.14159]
+
+
+def make_file_metadata_record(rng: random.Random, field_count: int = 45) -> dict:
+    """
+    Make a synthetic nested record, loosely shaped like GDC file metadata (flat fields plus repeated associated
+    entities and a nested analysis object).
+    """
+    record = {f"field_{idx}": rng.choice(SAMPLE_VALUES) for idx in range(field_count)}
+    record['file_id'] = f"{rng.getrandbits(64):016x}"
+    record['associated_entities'] = [
+        {
+            'entity_gdc_id': f"{rng.getrandbits(64):016x}",
+            'entity_type': rng.choice(SAMPLE_VALUES),
+            'case_gdc_id': f"{rng.getrandbits(64):016x}"
+        } for _ in range(rng.randint(0, 4))
+    ]
+    record['analysis'] = {
+        'workflow_type': rng.choice(SAMPLE_VALUES),
+        'updated_datetime': rng.choice(SAMPLE_VALUES),
+        'input_files': [rng.choice(SAMPLE_VALUES) for _ in range(rng.randint(0, 3))]
+    }
+
+    return record
+
+
+def time_call(func, *args, **kwargs):
+    start_time = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start_time
+
+
+def main(args):
+    """
+    Benchmark serial vs parallel JSON schema inference on synthetic records.
+    Usage (from the repository root):
+        python scripts/bench/benchmark_json_schema_inference.py [record_count] [num_processes]
+    """
+    record_count = int(args[1]) if len(args) > 1 else 200000
+    num_processes = int(args[2]) if len(args) > 2 else os.cpu_count()
+
+    rng = random.Random(42)
+    records = [make_file_metadata_record(rng) for _ in range(record_count)]
+
+    print(f"\nJSON schema inference benchmark: {record_count} records, {num_processes} processes "
+          f"({os.cpu_count()} cpus available)\n")
+
+    serial_records = copy.deepcopy(records)
+    parallel_records = copy.deepcopy(records)
+
+    serial_dict, serial_time = time_call(recursively_detect_object_structures, serial_records)
+    parallel_dict, parallel_time = time_call(recursively_detect_object_structures, parallel_records,
+                                             num_processes=num_processes)
+
+    if convert_object_structure_dict_to_schema_dict(serial_dict, list()) != \
+            convert_object_structure_dict_to_schema_dict(parallel_dict, list()):
+        sys.exit("Record list: parallel schema differs from serial schema!")
+    if serial_records != parallel_records:
+        sys.exit("Record list: parallel normalized records differ from serial normalized records!")
+
+    print(f"record list: serial {serial_time:.2f}s, parallel {parallel_time:.2f}s "
+          f"(speedup: {serial_time / parallel_time:.2f}x)")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        jsonl_fp = os.path.join(temp_dir, "benchmark_records.jsonl")
+        write_list_to_jsonl(jsonl_fp, records)
+
+        serial_dict, serial_time = time_call(detect_object_structures_from_jsonl, jsonl_fp)
+        parallel_dict, parallel_time = time_call(detect_object_structures_from_jsonl, jsonl_fp,
+                                                 num_processes=num_processes)
+
+    if convert_object_structure_dict_to_schema_dict(serial_dict, list()) != \
+            convert_object_structure_dict_to_schema_dict(parallel_dict, list()):
+        sys.exit("jsonl: parallel schema differs from serial schema!")
+
+    print(f"jsonl:       serial {serial_time:.2f}s, parallel {parallel_time:.2f}s "
+          f"(speedup: {serial_time / parallel_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from cda_bq_etl.bq_helpers import create_modify, query_ledger
+
+
+class FakeClient:
+    """Runs query jobs instantly; queries containing 'fail' raise an unexpected error."""
+    def query(self, query, job_config=None):
+        if 'fail' in query:
+            raise RuntimeError("unexpected failure")
+
+        return SimpleNamespace(job_id=f"job_{query}", error_result=None, errors=None, total_bytes_processed=10,
+                               slot_millis=5)
+
+    def get_table(self, table_id):
+        return SimpleNamespace(num_rows=3)
+
+
+class TestCreateModify(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (('get_bigquery_client', FakeClient), ('wait_for_job', lambda job: job),
+                            ('clear_cached_dataset_metadata', lambda dataset_id: None)):
+            patcher = mock.patch.object(create_modify, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_run_create_table_query_job_records_unexpected_errors(self):
+        job_stats = create_modify.run_create_table_query_job({}, "project.dataset.table", "fail")
+
+        self.assertEqual(job_stats['error'], "RuntimeError: unexpected failure")
+        self.assertIsNotNone(job_stats['elapsed_seconds'])
+
+    def test_create_tables_from_queries_waits_for_all_jobs(self):
+        table_queries = {"project.dataset.a": "select a", "project.dataset.b": "fail", "project.dataset.c": "select c"}
+
+        with mock.patch.object(create_modify, 'run_create_table_query_job',
+                               wraps=create_modify.run_create_table_query_job) as run_job, \
+                self.assertRaises(SystemExit):
+            create_modify.create_tables_from_queries({}, table_queries, max_workers=2)
+
+        self.assertEqual(run_job.call_count, 3)
+
+        table_job_stats = create_modify.create_tables_from_queries({}, {"project.dataset.a": "select a"})
+        self.assertEqual(table_job_stats["project.dataset.a"]['num_rows'], 3)
+
+    def test_ledger_step_captured_at_submission(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        query_ledger.enable_query_ledger(os.path.join(temp_dir.name, "ledger.jsonl"))
+        self.addCleanup(query_ledger.enable_query_ledger, None)
+        self.addCleanup(query_ledger._ledger_entries.clear)
+
+        ledger_steps = dict()
+
+        def wait_for_job(job):
+            query_ledger.record_job_in_ledger(job)
+            return job
+
+        def make_ledger_entry(job, step_name):
+            ledger_steps[job.job_id] = step_name
+            return {'job_id': job.job_id, 'step': step_name}
+
+        # the script function is only found in the submitting thread's call stack
+        def get_caller_step_name():
+            return 'create_tables' if threading.current_thread() is threading.main_thread() else 'main'
+
+        with mock.patch.object(create_modify, 'wait_for_job', wait_for_job), \
+                mock.patch.object(create_modify, 'estimate_query_bytes', lambda query: 100), \
+                mock.patch.object(query_ledger, 'make_ledger_entry', make_ledger_entry), \
+                mock.patch.object(query_ledger, 'get_caller_step_name', get_caller_step_name):
+            create_modify.create_tables_from_queries({}, {"project.dataset.a": "select a",
+                                                          "project.dataset.b": "select b"}, max_workers=2)
+
+        self.assertEqual(ledger_steps, {"job_select a": 'create_tables', "job_select b": 'create_tables'})
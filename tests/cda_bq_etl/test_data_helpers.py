@@ -0,0 +1,201 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from cda_bq_etl import data_helpers
+
+
+def write_file(file_path: str, content: str):
+    with open(file_path, mode="w", newline="") as file_obj:
+        file_obj.write(content)
+
+
+class TestNewlineAlignedOffsets(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.file_path = os.path.join(self.temp_dir.name, "test.tsv")
+
+    def assert_aligned_ranges(self, content: str, num_chunks: int, skip_rows: int = 0):
+        write_file(self.file_path, content)
+        byte_ranges = data_helpers.get_newline_aligned_offsets(self.file_path, num_chunks, skip_rows)
+        content_bytes = content.encode()
+        data_start = sum(len(line) for line in content_bytes.splitlines(keepends=True)[:skip_rows])
+
+        self.assertLessEqual(len(byte_ranges), num_chunks)
+
+        if data_start == len(content_bytes):
+            self.assertEqual(byte_ranges, [])
+            return
+
+        # ranges are contiguous, non-empty and cover the data portion of the file
+        self.assertEqual(byte_ranges[0][0], data_start)
+        self.assertEqual(byte_ranges[-1][1], len(content_bytes))
+
+        for (start, end), (next_start, _) in zip(byte_ranges, byte_ranges[1:]):
+            self.assertEqual(end, next_start)
+
+        for start, end in byte_ranges:
+            self.assertLess(start, end)
+            # every range begins at the start of a line
+            self.assertTrue(start == data_start or content_bytes[start - 1:start] == b"\n")
+
+        # reassembled lines match the original data lines
+        range_lines = [line for start, end in byte_ranges
+                       for line in content_bytes[start:end].splitlines(keepends=True)]
+        self.assertEqual(range_lines, content_bytes.splitlines(keepends=True)[skip_rows:])
+
+    def test_chunk_boundaries_mid_line(self):
+        # line lengths vary, so most boundaries fall mid-line
+        content = "header\tcol\n" + "".join(f"{'x' * (idx % 7 + 1)}\t{idx}\n" for idx in range(50))
+
+        for num_chunks in (1, 2, 3, 4, 7, 16):
+            with self.subTest(num_chunks=num_chunks):
+                self.assert_aligned_ranges(content, num_chunks, skip_rows=1)
+
+    def test_chunk_boundaries_at_eof(self):
+        content_tuples = [
+            # no trailing newline
+            ("a\tb\n" + "1\t2\n" * 5 + "3\t4", 3),
+            # more chunks than lines
+            ("a\tb\n1\t2\n3\t4\n", 10),
+            # a boundary which falls on the last byte of the file
+            ("a\n" + "bbbb\n" * 3, 4),
+            # header only
+            ("a\tb\n", 4),
+        ]
+
+        for content, num_chunks in content_tuples:
+            with self.subTest(content=content, num_chunks=num_chunks):
+                self.assert_aligned_ranges(content, num_chunks, skip_rows=1)
+                self.assert_aligned_ranges(content, num_chunks, skip_rows=0)
+
+
+class TestCreateNormalizedTsv(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.addCleanup(data_helpers.disable_value_cache)
+        self.raw_tsv_fp = os.path.join(self.temp_dir.name, "raw.tsv")
+
+        rows = ["Case ID\tAge At Diagnosis\tIs Primary\tScore\tDiagnosis Date"]
+
+        for idx in range(500):
+            rows.append(f"case-{idx:04d}\t{'' if idx % 9 == 0 else idx * 10}\t{'True' if idx % 2 else 'false'}\t"
+                        f"{idx / 4 if idx % 5 else 'None'}\t2020-01-{idx % 28 + 1:02d}")
+
+        write_file(self.raw_tsv_fp, "\n".join(rows) + "\n")
+
+    def normalize(self, num_processes: int, profile: bool = False):
+        normalized_tsv_fp = os.path.join(self.temp_dir.name, f"normalized_{num_processes}_{profile}.tsv")
+
+        if profile:
+            result = data_helpers.create_normalized_tsv_and_profile(self.raw_tsv_fp, normalized_tsv_fp,
+                                                                    num_processes=num_processes)
+        else:
+            result = data_helpers.create_normalized_tsv(self.raw_tsv_fp, normalized_tsv_fp,
+                                                        num_processes=num_processes)
+
+        with open(normalized_tsv_fp, mode="rb") as normalized_tsv_file:
+            return result, normalized_tsv_file.read()
+
+    def test_parallel_output_matches_serial(self):
+        serial_row_count, serial_bytes = self.normalize(num_processes=1)
+
+        self.assertEqual(serial_row_count, 501)
+
+        for num_processes in (2, 3):
+            with self.subTest(num_processes=num_processes):
+                self.assertEqual(self.normalize(num_processes=num_processes), (serial_row_count, serial_bytes))
+
+    def test_parallel_profile_matches_serial(self):
+        serial_result = self.normalize(num_processes=1, profile=True)
+        self.assertEqual(self.normalize(num_processes=3, profile=True), serial_result)
+
+    def test_parallel_output_matches_serial_with_value_cache(self):
+        serial_result = self.normalize(num_processes=1)
+
+        data_helpers.enable_value_cache(max_size=100)
+
+        self.assertEqual(self.normalize(num_processes=3), serial_result)
+
+        value_cache_stats = data_helpers.collect_value_cache_stats()
+        self.assertEqual(value_cache_stats['hits'] + value_cache_stats['misses'], 500 * 5)
+
+
+class TestSampleColumnDataTypesTsv(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.tsv_fp = os.path.join(self.temp_dir.name, "normalized.tsv")
+        self.column_headers = ["name", "case_id", "count", "sparse", "mixed", "rare_float"]
+
+        rows = ["\t".join(self.column_headers)]
+
+        for idx in range(2000):
+            sparse_value = str(idx + 10) if idx in (7, 1500) else ""
+            mixed_value = str(idx + 10) if idx % 2 else f"{idx}.5"
+            # a single float in an otherwise integer column is unlikely to be sampled
+            rare_float_value = "3.5" if idx == 1234 else str(idx + 10)
+            rows.append("\t".join([f"name {idx}", f"{idx:05d}", str(idx + 10), sparse_value, mixed_value,
+                                   rare_float_value]))
+
+        write_file(self.tsv_fp, "\n".join(rows) + "\n")
+
+    def sample(self, **kwargs):
+        scanned_columns = list()
+        aggregate_column_data_types_tsv = data_helpers.aggregate_column_data_types_tsv
+
+        def record_scanned_columns(*args, **scan_kwargs):
+            scanned_columns.extend(scan_kwargs['columns'])
+            return aggregate_column_data_types_tsv(*args, **scan_kwargs)
+
+        with mock.patch.object(data_helpers, 'aggregate_column_data_types_tsv', record_scanned_columns):
+            data_types_dict, confidence_dict = data_helpers.sample_column_data_types_tsv(self.tsv_fp,
+                                                                                         self.column_headers,
+                                                                                         skip_rows=1,
+                                                                                         seed=1,
+                                                                                         **kwargs)
+
+        return data_types_dict, confidence_dict, scanned_columns
+
+    def test_stopping_rules(self):
+        data_types_dict, confidence_dict, scanned_columns = self.sample(sample_size=200)
+
+        # settled columns (STRING, or "_id" fields) stop after sampling
+        self.assertEqual(confidence_dict["name"], 1.0)
+        self.assertEqual(confidence_dict["case_id"], 1.0)
+        self.assertEqual(data_types_dict["name"], {"STRING"})
+
+        # a single type found in enough non-null samples: confidence is 1 - 3/n, no full scan
+        self.assertNotIn("count", scanned_columns)
+        self.assertGreaterEqual(confidence_dict["count"], 0.95)
+        self.assertLess(confidence_dict["count"], 1.0)
+        self.assertEqual(data_types_dict["count"], {"INT64"})
+
+        # type conflicts, and columns with too few non-null samples, are fully scanned
+        self.assertEqual(sorted(scanned_columns), ["mixed", "sparse"])
+        self.assertEqual(confidence_dict["mixed"], 1.0)
+        self.assertEqual(confidence_dict["sparse"], 1.0)
+        self.assertEqual(data_types_dict["mixed"] - {None}, {"INT64", "FLOAT64"})
+        self.assertEqual(data_types_dict["sparse"] - {None}, {"INT64"})
+
+    def test_min_confidence(self):
+        # with a confidence requirement the sample can't meet, every unsettled column is fully scanned, so the rare
+        # float value is found
+        data_types_dict, confidence_dict, scanned_columns = self.sample(sample_size=200, min_confidence=1.0)
+
+        self.assertEqual(sorted(scanned_columns), ["count", "mixed", "rare_float", "sparse"])
+        self.assertEqual(data_types_dict["rare_float"], {"INT64", "FLOAT64"})
+        self.assertTrue(all(confidence == 1.0 for confidence in confidence_dict.values()))
+
+    def test_sample_larger_than_file(self):
+        # every row is sampled once
+        data_types_dict, confidence_dict, scanned_columns = self.sample(sample_size=5000)
+
+        self.assertEqual(data_types_dict["rare_float"], {"INT64", "FLOAT64"})
+        self.assertIn("rare_float", scanned_columns)
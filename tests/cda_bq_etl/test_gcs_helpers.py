@@ -0,0 +1,92 @@
+import base64
+import hashlib
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from cda_bq_etl import gcs_helpers
+
+
+class FakeBlob:
+    """Minimal stand-in for storage.Blob, counting downloads."""
+    def __init__(self, name: str, content: bytes):
+        self.name = name
+        self.bucket = SimpleNamespace(name="test-bucket")
+        self.generation = 1
+        self.content = content
+        self.size = len(content)
+        self.md5_hash = base64.b64encode(hashlib.md5(content).digest()).decode()
+        self.crc32c = None
+        self.content_encoding = None
+        self.download_count = 0
+
+    def reload(self):
+        pass
+
+    def download_to_filename(self, file_path: str):
+        self.download_count += 1
+
+        with open(file_path, 'wb') as file_obj:
+            file_obj.write(self.content)
+
+
+class TestDownloadCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        patcher = mock.patch.object(gcs_helpers, 'DOWNLOAD_CACHE_DIR', self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def download(self, blob: FakeBlob, **kwargs) -> bool:
+        return gcs_helpers.download_blob_cached(blob, os.path.join(self.temp_dir.name, blob.name), **kwargs)
+
+    def test_download_blob_cached_hit(self):
+        blob = FakeBlob("a.tsv", b"a" * 100)
+
+        self.assertFalse(self.download(blob))
+        self.assertTrue(self.download(blob))
+        self.assertEqual(blob.download_count, 1)
+
+        with open(os.path.join(self.temp_dir.name, "a.tsv"), 'rb') as file_obj:
+            self.assertEqual(file_obj.read(), blob.content)
+
+    def test_download_blob_cached_max_file_size(self):
+        blob = FakeBlob("large.tsv", b"l" * 100)
+
+        self.assertFalse(self.download(blob, max_file_size=99))
+        self.assertFalse(self.download(blob, max_file_size=99))
+        self.assertEqual(blob.download_count, 2)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_download_blob_cached_evicts_least_recently_used(self):
+        blobs = {name: FakeBlob(f"{name}.tsv", name.encode() * 100) for name in ("a", "b", "c")}
+
+        self.download(blobs["a"], max_cache_size=250)
+        self.download(blobs["b"], max_cache_size=250)
+
+        # make "a" the least recently used entry, then use it again, so that "b" is evicted instead
+        for blob in blobs.values():
+            cache_fp = os.path.join(self.cache_dir, gcs_helpers.make_download_cache_key(blob))
+            if os.path.exists(cache_fp):
+                os.utime(cache_fp, (1, 1))
+        self.assertTrue(self.download(blobs["a"], max_cache_size=250))
+
+        self.download(blobs["c"], max_cache_size=250)
+
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self.assertTrue(self.download(blobs["a"], max_cache_size=250))
+        self.assertTrue(self.download(blobs["c"], max_cache_size=250))
+        self.assertFalse(self.download(blobs["b"], max_cache_size=250))
+        self.assertEqual(blobs["b"].download_count, 2)
+
+    def test_get_download_cache_settings(self):
+        self.assertEqual(gcs_helpers.get_download_cache_settings({}),
+                         (gcs_helpers.DOWNLOAD_CACHE_MAX_SIZE, gcs_helpers.DOWNLOAD_CACHE_MAX_FILE_SIZE))
+        self.assertEqual(gcs_helpers.get_download_cache_settings({'DOWNLOAD_CACHE_MAX_SIZE': 10,
+                                                                  'DOWNLOAD_CACHE_MAX_FILE_SIZE': 5}),
+                         (10, 5))
@@ -0,0 +1,69 @@
+import copy
+import os
+import tempfile
+import unittest
+
+from cda_bq_etl.data_helpers import (recursively_detect_object_structures, detect_object_structures_from_jsonl,
+                                     write_list_to_jsonl)
+from cda_bq_etl.bq_helpers.schema import convert_object_structure_dict_to_schema_dict
+
+# records loosely shaped like GDC file metadata. Field types differ between records (and so between the shards
+# analyzed by each worker process), so partial structures have to be merged. As in the source data, nested fields
+# are never null: a field can't be typed as both nested and non-nested.
+RECORDS = [
+    {'file_id': "f1", 'file_size': '12', 'is_controlled': 'True', 'state': 'released', 'created': '2022-01-05',
+     'associated_entities': [{'entity_gdc_id': "e1", 'entity_type': 'case'}],
+     'analysis': {'workflow_type': 'STAR', 'input_files': ['a.bam', 'b.bam']}},
+    {'file_id': "f2", 'file_size': '1.5', 'is_controlled': 'no', 'state': 'NA', 'created': '12:30:45',
+     'associated_entities': [],
+     'analysis': {'workflow_type': None, 'input_files': []}},
+    {'file_id': "f3", 'file_size': 42, 'is_controlled': None, 'state': '', 'created': None,
+     'associated_entities': [{'entity_gdc_id': "e2", 'entity_type': 'aliquot'},
+                             {'entity_gdc_id': "e3", 'entity_type': '[unknown]'}],
+     'analysis': {'workflow_type': 'not reported', 'input_files': ['c.bam']}},
+    {'file_id': "f4", 'file_size': '-5', 'is_controlled': '0', 'state': 'Primary Tumor',
+     'created': '2022-11-04T14:22:25.013629-05:00',
+     'associated_entities': [{'entity_gdc_id': "e4", 'entity_type': None}],
+     'analysis': {'workflow_type': '100.0', 'input_files': None}},
+    {'file_id': "f5", 'file_size': 3.14159, 'is_controlled': '1', 'state': 'released', 'created': '2023-02-28',
+     'associated_entities': [],
+     'analysis': {'workflow_type': 'BWA', 'input_files': ['d.bam', 'e.bam', 'f.bam']}},
+    {'file_id': "f6", 'file_size': '100.0', 'is_controlled': 'True', 'state': 'not reported', 'created': '',
+     'associated_entities': [{'entity_gdc_id': "e5", 'entity_type': 'case'}],
+     'analysis': {'workflow_type': '', 'input_files': ['g.bam']}},
+]
+
+
+def make_schema(object_structure_dict: dict) -> dict:
+    return convert_object_structure_dict_to_schema_dict(object_structure_dict, list())
+
+
+class TestJsonSchemaInference(unittest.TestCase):
+
+    def setUp(self):
+        self.records = copy.deepcopy(RECORDS)
+
+    def test_parallel_record_list_matches_serial(self):
+        serial_records = copy.deepcopy(self.records)
+        serial_dict = recursively_detect_object_structures(serial_records)
+
+        for num_processes in (2, 3):
+            with self.subTest(num_processes=num_processes):
+                parallel_records = copy.deepcopy(self.records)
+                parallel_dict = recursively_detect_object_structures(parallel_records, num_processes=num_processes)
+
+                self.assertEqual(parallel_dict, serial_dict)
+                self.assertEqual(make_schema(parallel_dict), make_schema(serial_dict))
+                # records are normalized as they would be by the serial traversal
+                self.assertEqual(parallel_records, serial_records)
+
+    def test_parallel_jsonl_matches_serial(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            jsonl_fp = os.path.join(temp_dir, "records.jsonl")
+            write_list_to_jsonl(jsonl_fp, self.records)
+
+            serial_dict = detect_object_structures_from_jsonl(jsonl_fp)
+            parallel_dict = detect_object_structures_from_jsonl(jsonl_fp, num_processes=3)
+
+        self.assertEqual(parallel_dict, serial_dict)
+        self.assertEqual(make_schema(parallel_dict), make_schema(serial_dict))
@@ -0,0 +1,95 @@
+import unittest
+from unittest import mock
+
+from cda_bq_etl.bq_helpers import catalog, lookup
+from cda_bq_etl.bq_helpers.lookup import convert_like_pattern_to_regex, list_tables_in_dataset
+
+DATASET_ID = "project.dataset"
+TABLE_NAMES = ["case_gdc_r40", "case_gdc_r41", "case_pdc_r41", "file_gdc_r41", "casexgdc_r41", "Case_gdc_r41"]
+
+
+class TestLookup(unittest.TestCase):
+
+    def test_convert_like_pattern_to_regex(self):
+        like_pattern_tuples = [
+            # (pattern, matching strings, non-matching strings)
+            ("%", ["", "any_table"], []),
+            ("case_", ["case_", "cases", "case1"], ["case", "case12"]),
+            ("%clinical%", ["clinical", "gdc_clinical_r40", "clinical_"], ["Clinical", "clinica"]),
+            ("r__", ["r40", "r_4"], ["r4", "r400"]),
+            ("gdc%r40", ["gdc_r40", "gdcr40"], ["gdc_r40_old", "pdc_r40"]),
+            # escaped wildcards match literally
+            ("case\\_%", ["case_diagnosis", "case_"], ["cases", "casex_diagnosis"]),
+            ("100\\%", ["100%"], ["1000", "100"]),
+            ("a\\\\b", ["a\\b"], ["ab", "a\\\\b"]),
+            # regex metacharacters match literally
+            ("table.name(1)+", ["table.name(1)+"], ["tablexname(1)+", "table.name11"]),
+            ("[a-z]*", ["[a-z]*"], ["abc"]),
+            # a trailing backslash matches itself
+            ("a\\", ["a\\"], ["a"]),
+            # matches span newlines, as with LIKE
+            ("a%b", ["a\nb"], []),
+        ]
+
+        for like_pattern, matching_strs, non_matching_strs in like_pattern_tuples:
+            regex = convert_like_pattern_to_regex(like_pattern)
+
+            for matching_str in matching_strs:
+                with self.subTest(like_pattern=like_pattern, value=matching_str):
+                    self.assertIsNotNone(regex.fullmatch(matching_str))
+
+            for non_matching_str in non_matching_strs:
+                with self.subTest(like_pattern=like_pattern, value=non_matching_str):
+                    self.assertIsNone(regex.fullmatch(non_matching_str))
+
+
+class TestListTablesInDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.queries = list()
+
+        def query_and_retrieve_result(sql, use_cache=False):
+            self.queries.append(sql)
+            return [(table_name,) for table_name in TABLE_NAMES]
+
+        for target, name, value in ((catalog, 'fetch_dataset_catalog',
+                                     lambda project_dataset_id: {table_name: dict() for table_name in TABLE_NAMES}),
+                                    (lookup, 'query_and_retrieve_result', query_and_retrieve_result)):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        catalog.enable_dataset_catalog()
+        self.addCleanup(catalog.enable_dataset_catalog, False)
+
+    def test_list_tables_in_dataset_filters(self):
+        filter_tuples = [
+            (None, TABLE_NAMES),
+            ([], TABLE_NAMES),
+            ("gdc", ["case_gdc_r40", "case_gdc_r41", "file_gdc_r41", "casexgdc_r41", "Case_gdc_r41"]),
+            (["case", "r41"], ["case_gdc_r41", "case_pdc_r41", "casexgdc_r41"]),
+            # as in the INFORMATION_SCHEMA query's LIKE clause, _ matches any character and matching is case-sensitive
+            ("case_gdc", ["case_gdc_r40", "case_gdc_r41", "casexgdc_r41"]),
+            (["gdc", "pdc"], []),
+        ]
+
+        for filter_terms, expected_table_names in filter_tuples:
+            with self.subTest(filter_terms=filter_terms):
+                self.assertEqual(list_tables_in_dataset(DATASET_ID, filter_terms), expected_table_names)
+
+        # answered from the catalog, without querying INFORMATION_SCHEMA
+        self.assertEqual(self.queries, [])
+
+    def test_list_tables_in_dataset_without_catalog(self):
+        catalog.enable_dataset_catalog(False)
+
+        list_tables_in_dataset(DATASET_ID, ["case", "r41"])
+
+        self.assertEqual(len(self.queries), 1)
+        self.assertIn("WHERE table_name like '%case%' AND table_name like '%r41%'", self.queries[0])
+
+    def test_list_tables_in_dataset_catalog_unavailable(self):
+        with mock.patch.object(catalog, 'fetch_dataset_catalog', lambda project_dataset_id: None):
+            self.assertEqual(list_tables_in_dataset(DATASET_ID), TABLE_NAMES)
+
+        self.assertEqual(len(self.queries), 1)
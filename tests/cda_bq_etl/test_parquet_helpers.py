@@ -0,0 +1,124 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+import pyarrow.parquet as pq
+from google.cloud.bigquery import SchemaField
+
+from cda_bq_etl.data_helpers import check_value_type, resolve_type_conflict
+from cda_bq_etl.parquet_helpers import (convert_tsv_to_parquet, parse_bool_value, parse_timestamp_value,
+                                        SCALAR_VALUE_PARSERS)
+
+UTC = datetime.timezone.utc
+
+
+class TestParquetHelpers(unittest.TestCase):
+
+    def test_parse_timestamp_value(self):
+        # every value is classified as TIMESTAMP by check_value_type, and must be parsable
+        timestamp_tuples = [
+            ("2022-11-04 14:22:25", datetime.datetime(2022, 11, 4, 14, 22, 25, tzinfo=UTC)),
+            ("2022-11-04T14:22:25", datetime.datetime(2022, 11, 4, 14, 22, 25, tzinfo=UTC)),
+            ("2022-1-4 4:2:05", datetime.datetime(2022, 1, 4, 4, 2, 5, tzinfo=UTC)),
+            ("2022-11-04T14:22:25.013629", datetime.datetime(2022, 11, 4, 14, 22, 25, 13629, tzinfo=UTC)),
+            ("2022-11-04T14:22:25.5", datetime.datetime(2022, 11, 4, 14, 22, 25, 500000, tzinfo=UTC)),
+            ("2022-11-04T14:22:25Z", datetime.datetime(2022, 11, 4, 14, 22, 25, tzinfo=UTC)),
+            ("2022-11-04 14:22:25 UTC", datetime.datetime(2022, 11, 4, 14, 22, 25, tzinfo=UTC)),
+            ("2022-11-04T14:22:25.013629-05:00", datetime.datetime(2022, 11, 4, 19, 22, 25, 13629, tzinfo=UTC)),
+            ("2022-11-04T14:22:25-0500", datetime.datetime(2022, 11, 4, 19, 22, 25, tzinfo=UTC)),
+            ("2022-11-04T14:22:25-05", datetime.datetime(2022, 11, 4, 19, 22, 25, tzinfo=UTC)),
+            ("2022-11-04 14:22:25 -5", datetime.datetime(2022, 11, 4, 19, 22, 25, tzinfo=UTC)),
+            ("2022-11-04 14:22:25 PST", datetime.datetime(2022, 11, 4, 22, 22, 25, tzinfo=UTC)),
+            ("2022-11-04 14:22:25 EDT", datetime.datetime(2022, 11, 4, 18, 22, 25, tzinfo=UTC)),
+        ]
+
+        for value, expected in timestamp_tuples:
+            with self.subTest(value=value):
+                self.assertEqual(check_value_type(value), "TIMESTAMP")
+                self.assertEqual(parse_timestamp_value(value), expected)
+
+    def test_parse_bool_value(self):
+        # every value is classified as BOOL by check_value_type, and must be parsable
+        bool_tuples = [
+            ("True", True), ("false", False), ("TRUE", True),
+            ("t", True), ("f", False), ("T", True), ("F", False),
+            ("yes", True), ("no", False), ("y", True), ("n", False), ("Y", True), ("N", False),
+            ("on", True), ("off", False), ("On", True), ("OFF", False),
+        ]
+
+        for value, expected in bool_tuples:
+            with self.subTest(value=value):
+                self.assertEqual(check_value_type(value), "BOOL")
+                self.assertIs(parse_bool_value(value), expected)
+
+        # 1 and 0 only occur in BOOL columns alongside other boolean values
+        self.assertIs(parse_bool_value("1"), True)
+        self.assertIs(parse_bool_value("0"), False)
+        self.assertIs(parse_bool_value(False), False)
+
+        with self.assertRaises(ValueError):
+            parse_bool_value("maybe")
+
+    def test_parse_timestamp_value_timezone_name(self):
+        self.assertEqual(parse_timestamp_value("2022-07-04 12:00:00 America/Chicago"),
+                         datetime.datetime(2022, 7, 4, 17, 0, 0, tzinfo=UTC))
+
+        with self.assertRaises(ValueError):
+            parse_timestamp_value("2022-11-04 14:22:25 notazone")
+
+    def test_parse_datetime_value(self):
+        # DATE and TIMESTAMP values are merged into DATETIME columns
+        self.assertEqual(resolve_type_conflict("date_field", {"DATE", "TIMESTAMP"}), "DATETIME")
+
+        parse_datetime_value = SCALAR_VALUE_PARSERS['DATETIME']
+
+        self.assertEqual(check_value_type("2020-01-02"), "DATE")
+        self.assertEqual(parse_datetime_value("2020-01-02"), datetime.datetime(2020, 1, 2))
+        self.assertEqual(parse_datetime_value("2020-1-2"), datetime.datetime(2020, 1, 2))
+        self.assertEqual(parse_datetime_value("2022-11-04T14:22:25.013629"),
+                         datetime.datetime(2022, 11, 4, 14, 22, 25, 13629))
+        self.assertEqual(parse_datetime_value("2022-11-04 14:22:25 PST"), datetime.datetime(2022, 11, 4, 14, 22, 25))
+        self.assertEqual(parse_datetime_value("2022-11-04T14:22:25-05"), datetime.datetime(2022, 11, 4, 14, 22, 25))
+
+    def test_convert_tsv_to_parquet_bool(self):
+        schema = [SchemaField("id", "STRING"), SchemaField("is_primary", "BOOL")]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tsv_fp = os.path.join(temp_dir, "test.tsv")
+            parquet_fp = os.path.join(temp_dir, "test.parquet")
+
+            with open(tsv_fp, mode="w") as tsv_file:
+                tsv_file.write("id\tis_primary\n")
+                tsv_file.write("a\tt\nb\tf\nc\tY\nd\toff\ne\t\n")
+
+            self.assertEqual(convert_tsv_to_parquet(tsv_fp, parquet_fp, schema), 5)
+            self.assertEqual(pq.read_table(parquet_fp).column("is_primary").to_pylist(),
+                             [True, False, True, False, None])
+
+    def test_convert_tsv_to_parquet(self):
+        schema = [SchemaField("id", "STRING"), SchemaField("event_datetime", "DATETIME")]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tsv_fp = os.path.join(temp_dir, "test.tsv")
+            parquet_fp = os.path.join(temp_dir, "test.parquet")
+
+            with open(tsv_fp, mode="w") as tsv_file:
+                tsv_file.write("id\tevent_datetime\n")
+                tsv_file.write("a\t2020-01-02\n")
+                tsv_file.write("b\t2022-11-04 14:22:25 PST\n")
+                tsv_file.write("c\t\n")
+
+            self.assertEqual(convert_tsv_to_parquet(tsv_fp, parquet_fp, schema), 3)
+            self.assertEqual(pq.read_table(parquet_fp).column("event_datetime").to_pylist(),
+                             [datetime.datetime(2020, 1, 2), datetime.datetime(2022, 11, 4, 14, 22, 25), None])
+
+            with open(tsv_fp, mode="a") as tsv_file:
+                tsv_file.write("d\t2022-11-04 14:22:25 notazone\n")
+
+            # unparsable values raise ValueError so the caller can fall back to loading the tsv file
+            with self.assertRaises(ValueError):
+                convert_tsv_to_parquet(tsv_fp, parquet_fp, schema, exit_on_error=False)
+
+            with self.assertRaises(SystemExit):
+                convert_tsv_to_parquet(tsv_fp, parquet_fp, schema)
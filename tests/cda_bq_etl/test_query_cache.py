@@ -0,0 +1,88 @@
+import datetime
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from google.api_core.exceptions import NotFound
+
+from cda_bq_etl.bq_helpers import query_cache
+
+
+class FakeClient:
+    """Returns table metadata for known table ids; raises NotFound for others."""
+    def __init__(self, tables: dict[str, SimpleNamespace]):
+        self.tables = tables
+        self.get_table_calls = list()
+
+    def get_table(self, table_id):
+        self.get_table_calls.append(table_id)
+
+        if table_id not in self.tables:
+            raise NotFound(table_id)
+
+        return self.tables[table_id]
+
+
+def make_table(table_type: str = 'TABLE', hour: int = 0) -> SimpleNamespace:
+    return SimpleNamespace(table_type=table_type, modified=datetime.datetime(2025, 1, 1, hour))
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeClient({
+            "project.dataset.table_a": make_table(),
+            "project.dataset.table_b": make_table(),
+            "project.dataset.view_c": make_table(table_type='VIEW')
+        })
+        patcher = mock.patch.object(query_cache, 'get_bigquery_client', lambda: self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_find_referenced_table_ids(self):
+        sql_tuples = [
+            ("SELECT a, b FROM `project.dataset.table_a` WHERE a IN (1, 2) GROUP BY a, b",
+             ["project.dataset.table_a"]),
+            ("SELECT * FROM project.dataset.table_b b JOIN `project.dataset.table_a` a USING (id)",
+             ["project.dataset.table_a", "project.dataset.table_b"]),
+            ("select * from project.dataset.table_a left join project.dataset.table_a using (id)",
+             ["project.dataset.table_a"]),
+            ("WITH cte AS (SELECT * FROM project.dataset.table_a) SELECT * FROM cte CROSS JOIN UNNEST(cte.arr) x",
+             ["project.dataset.table_a"]),
+            ("SELECT * FROM (SELECT id FROM `project`.dataset.table_b) q", ["project.dataset.table_b"]),
+            ("SELECT * FROM dataset.table_a", []),
+            ("SELECT * FROM `project.dataset.table_*`", []),
+        ]
+
+        for sql, expected in sql_tuples:
+            with self.subTest(sql=sql):
+                self.assertEqual(query_cache.find_referenced_table_ids(sql), expected)
+
+    def test_make_query_cache_key(self):
+        sql = "SELECT * FROM `project.dataset.table_a` JOIN project.dataset.table_b USING (id)"
+        cache_key = query_cache.make_query_cache_key(sql)
+
+        self.assertIsNotNone(cache_key)
+        # whitespace changes share an entry
+        self.assertEqual(query_cache.make_query_cache_key(f"  {sql.replace(' ', chr(10) + '    ')}\n"), cache_key)
+
+        # a modified source table invalidates the entry
+        self.client.tables["project.dataset.table_b"] = make_table(hour=1)
+        self.assertNotEqual(query_cache.make_query_cache_key(sql), cache_key)
+
+    def test_make_query_cache_key_uncacheable(self):
+        uncacheable_sqls = [
+            "SELECT 1",
+            "SELECT * FROM project.dataset.view_c",
+            "SELECT * FROM project.dataset.missing_table",
+            "SELECT table_name FROM `project.dataset.INFORMATION_SCHEMA.TABLES`",
+            "SELECT * FROM `project.dataset.table_*` WHERE _TABLE_SUFFIX = 'a'",
+            "SELECT * FROM dataset.table_a",
+            "SELECT * FROM project.dataset.table_a JOIN dataset.table_b USING (id)",
+            "SELECT * FROM project.dataset.table_a a, project.dataset.table_b b WHERE a.id = b.id",
+            "SELECT * FROM `project.dataset.table_a`, UNNEST(arr)",
+        ]
+
+        for sql in uncacheable_sqls:
+            with self.subTest(sql=sql):
+                self.assertIsNone(query_cache.make_query_cache_key(sql))
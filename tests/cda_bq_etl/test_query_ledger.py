@@ -0,0 +1,58 @@
+import datetime
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from cda_bq_etl.bq_helpers import query_ledger
+
+
+def make_job(job_id: str) -> SimpleNamespace:
+    started = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+    return SimpleNamespace(job_id=job_id, job_type='query', statement_type='CREATE_TABLE_AS_SELECT',
+                           destination="project.dataset.table", query="SELECT 1", total_bytes_processed=100,
+                           total_bytes_billed=1024, slot_millis=50, cache_hit=False, error_result=None,
+                           started=started, ended=started + datetime.timedelta(seconds=2))
+
+
+class TestQueryLedger(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.ledger_fp = os.path.join(temp_dir.name, "ledger.jsonl")
+
+        query_ledger.enable_query_ledger(self.ledger_fp, run_id="test_run")
+        self.addCleanup(query_ledger.enable_query_ledger, None)
+        self.addCleanup(query_ledger.set_query_ledger_step, None)
+        self.addCleanup(query_ledger._ledger_entries.clear)
+
+    def test_entry_tagged_with_step(self):
+        query_ledger.set_query_ledger_step('create_tables')
+        query_ledger.record_job_in_ledger(make_job("job_a"))
+
+        query_ledger.set_query_ledger_step(None)
+        query_ledger.record_job_in_ledger(make_job("job_b"))
+
+        ledger_entries = query_ledger.read_query_ledger(self.ledger_fp, run_id="test_run")
+
+        self.assertEqual([ledger_entry['job_id'] for ledger_entry in ledger_entries], ["job_a", "job_b"])
+        self.assertEqual(ledger_entries[0]['step'], 'create_tables')
+        self.assertEqual(ledger_entries[0]['elapsed_seconds'], 2.0)
+        # without a step, entries are tagged with the calling script function (none here)
+        self.assertEqual(ledger_entries[1]['step'], 'main')
+
+    def test_step_captured_at_submission(self):
+        # the job is submitted during one step, and completes after the next step is entered
+        query_ledger.set_query_ledger_step('create_program_tables_no_url')
+        bq_job = make_job("job_a")
+        query_ledger.record_job_submission(bq_job, estimated_bytes=200)
+
+        query_ledger.set_query_ledger_step('add_url_to_program_tables')
+        query_ledger.record_job_in_ledger(bq_job)
+
+        ledger_entry = query_ledger.read_query_ledger(self.ledger_fp)[0]
+
+        self.assertEqual(ledger_entry['step'], 'create_program_tables_no_url')
+        self.assertEqual(ledger_entry['estimated_bytes'], 200)
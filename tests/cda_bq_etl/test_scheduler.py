@@ -0,0 +1,75 @@
+import unittest
+
+from cda_bq_etl.scheduler import build_step_dependencies, find_critical_path, make_step
+
+
+def make_steps(*step_tuples) -> list[dict]:
+    return [make_step(name, lambda: None, inputs=inputs, outputs=outputs, estimated_seconds=seconds)
+            for name, inputs, outputs, seconds in step_tuples]
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_read_after_write(self):
+        steps = make_steps(("create_a", ["raw"], ["a"], 1),
+                           ("create_b", ["raw"], ["b"], 1),
+                           ("join_a_b", ["a", "b"], ["joined"], 1))
+
+        self.assertEqual(build_step_dependencies(steps), {
+            "create_a": [],
+            "create_b": [],
+            "join_a_b": ["create_a", "create_b"]
+        })
+
+    def test_write_after_read(self):
+        # replace_a overwrites a, so it must wait for every step which read the earlier version
+        steps = make_steps(("create_a", [], ["a"], 1),
+                           ("read_a_1", ["a"], ["x"], 1),
+                           ("read_a_2", ["a"], ["y"], 1),
+                           ("replace_a", [], ["a"], 1),
+                           ("read_a_3", ["a"], ["z"], 1))
+
+        self.assertEqual(build_step_dependencies(steps), {
+            "create_a": [],
+            "read_a_1": ["create_a"],
+            "read_a_2": ["create_a"],
+            "replace_a": ["create_a", "read_a_1", "read_a_2"],
+            "read_a_3": ["replace_a"]
+        })
+
+    def test_write_after_write(self):
+        steps = make_steps(("create_a", [], ["a"], 1),
+                           ("unrelated", ["raw"], ["b"], 1),
+                           ("modify_a", [], ["a"], 1))
+
+        self.assertEqual(build_step_dependencies(steps)["modify_a"], ["create_a"])
+
+    def test_step_reading_and_writing_same_table(self):
+        steps = make_steps(("create_a", [], ["a"], 1),
+                           ("update_a", ["a"], ["a"], 1),
+                           ("read_a", ["a"], ["b"], 1))
+
+        self.assertEqual(build_step_dependencies(steps), {
+            "create_a": [],
+            "update_a": ["create_a"],
+            "read_a": ["update_a"]
+        })
+
+    def test_duplicate_step_names(self):
+        with self.assertRaises(SystemExit):
+            build_step_dependencies(make_steps(("a", [], [], 1), ("a", [], [], 1)))
+
+    def test_find_critical_path(self):
+        steps = make_steps(("create_a", ["raw"], ["a"], 10),
+                           ("create_b", ["raw"], ["b"], 2),
+                           ("create_c", ["b"], ["c"], 3),
+                           ("join", ["a", "c"], ["joined"], 1),
+                           ("independent", ["raw"], ["d"], 4))
+        dependencies = build_step_dependencies(steps)
+
+        self.assertEqual(find_critical_path(steps, dependencies), (["create_a", "join"], 11))
+
+        # measured durations override estimates
+        self.assertEqual(find_critical_path(steps, dependencies, {"create_b": 20}),
+                         (["create_b", "create_c", "join"], 24))
+        self.assertEqual(find_critical_path([], {}), ([], 0.0))